@@ -0,0 +1,276 @@
+import random
+from bisect import bisect_left, insort
+from typing import Dict, List, Tuple
+from entity.errors import NoSpaceError
+
+
+class AllocationPolicy:
+    """
+    Política de posicionamento do FreeSpaceManager: decide de qual extent
+    livre sai a próxima parte de um pedido e em que bloco dele começa.
+
+    O gerenciador avisa a política de cada extent livre que entra
+    (inserted) ou sai (removed) do índice, para que ela mantenha a sua
+    própria estrutura, e de cada trecho alocado (allocated). pick() só é
+    chamado com pelo menos um extent livre e devolve (início do extent livre,
+    primeiro bloco a alocar dentro dele).
+    """
+
+    name = None
+
+    def reset(self, total_blocks: int):
+        pass
+
+    def inserted(self, start: int, length: int):
+        pass
+
+    def removed(self, start: int, length: int):
+        pass
+
+    def allocated(self, start: int, length: int):
+        pass
+
+    def pick(self, livre, count: int) -> Tuple[int, int]:
+        raise NotImplementedError
+
+
+class SizeClassPolicy(AllocationPolicy):
+    """
+    Classes de tamanho por potência de 2 (o posicionamento original): acha
+    um extent que comporte o pedido em O(log total), preferindo o mais
+    recente, em geral a sobra do pedido anterior.
+    """
+
+    name = 'size-class'
+
+    def reset(self, total_blocks: int):
+        self._classes: List[Dict[int, None]] = [{} for _ in range(total_blocks.bit_length() + 1)]
+
+    def inserted(self, start: int, length: int):
+        self._classes[length.bit_length() - 1][start] = None
+
+    def removed(self, start: int, length: int):
+        del self._classes[length.bit_length() - 1][start]
+
+    def pick(self, livre, count: int) -> Tuple[int, int]:
+        classe = count.bit_length() - 1
+        # Na própria classe de `count` só o extent mais recente é testado (em
+        # geral a sobra do split anterior, o que mantém alocações seguidas
+        # contíguas); qualquer extent de uma classe acima comporta o pedido.
+        if self._classes[classe]:
+            start = next(reversed(self._classes[classe]))
+            if livre._by_start[start] >= count:
+                return start, start
+        for nivel in range(classe + 1, len(self._classes)):
+            if self._classes[nivel]:
+                start = next(reversed(self._classes[nivel]))
+                return start, start
+        # Nenhum extent comporta o pedido inteiro: usa o maior disponível.
+        for nivel in range(classe, -1, -1):
+            if self._classes[nivel]:
+                start = next(reversed(self._classes[nivel]))
+                return start, start
+        raise NoSpaceError("Espaço insuficiente em disco.")
+
+
+class _AddressOrdered(AllocationPolicy):
+    """Base de first-fit e next-fit: os inícios dos extents livres em ordem de endereço."""
+
+    def reset(self, total_blocks: int):
+        self._inicios: List[int] = []
+
+    def inserted(self, start: int, length: int):
+        insort(self._inicios, start)
+
+    def removed(self, start: int, length: int):
+        del self._inicios[bisect_left(self._inicios, start)]
+
+    def _primeiro(self, livre, count: int, de: int) -> Tuple[int, int]:
+        """O primeiro extent que comporta `count` a partir da posição `de` da lista, dando a volta."""
+        inicios = self._inicios
+        n = len(inicios)
+        for i in range(n):
+            start = inicios[(de + i) % n]
+            if livre._by_start[start] >= count:
+                return start, start
+        # Nenhum comporta o pedido: começa pelo primeiro e o resto vem nos próximos.
+        start = inicios[de % n]
+        return start, start
+
+
+class FirstFitPolicy(_AddressOrdered):
+    """O extent de menor endereço que comporta o pedido (varredura em O(extents livres))."""
+
+    name = 'first-fit'
+
+    def pick(self, livre, count: int) -> Tuple[int, int]:
+        return self._primeiro(livre, count, 0)
+
+
+class NextFitPolicy(_AddressOrdered):
+    """Como first-fit, mas a busca continua de onde a alocação anterior terminou."""
+
+    name = 'next-fit'
+
+    def reset(self, total_blocks: int):
+        super().reset(total_blocks)
+        self._cursor = 0
+
+    def allocated(self, start: int, length: int):
+        self._cursor = start + length
+
+    def pick(self, livre, count: int) -> Tuple[int, int]:
+        return self._primeiro(livre, count, bisect_left(self._inicios, self._cursor))
+
+
+class BestFitPolicy(AllocationPolicy):
+    """O menor extent que comporta o pedido, por busca binária nos extents ordenados por tamanho."""
+
+    name = 'best-fit'
+
+    def reset(self, total_blocks: int):
+        self._por_tamanho: List[Tuple[int, int]] = []
+
+    def inserted(self, start: int, length: int):
+        insort(self._por_tamanho, (length, start))
+
+    def removed(self, start: int, length: int):
+        del self._por_tamanho[bisect_left(self._por_tamanho, (length, start))]
+
+    def pick(self, livre, count: int) -> Tuple[int, int]:
+        i = bisect_left(self._por_tamanho, (count, -1))
+        # Se nenhum comporta o pedido, o maior deixa o arquivo em menos pedaços.
+        _, start = self._por_tamanho[i] if i < len(self._por_tamanho) else self._por_tamanho[-1]
+        return start, start
+
+
+class BuddyPolicy(BestFitPolicy):
+    """
+    Posicionamento do alocador buddy: um pedido de n blocos começa num bloco
+    alinhado a 2^ceil(log2 n), no menor extent livre que contenha uma janela
+    alinhada desse tamanho. Sem janela assim, cai no best-fit. Os blocos
+    alocados e a coalescência continuam exatos (sem arredondar o pedido).
+    """
+
+    name = 'buddy'
+
+    def pick(self, livre, count: int) -> Tuple[int, int]:
+        janela = 1 << (count - 1).bit_length()
+        for i in range(bisect_left(self._por_tamanho, (janela, -1)), len(self._por_tamanho)):
+            tamanho, start = self._por_tamanho[i]
+            alinhado = (start + janela - 1) & -janela
+            if alinhado + janela <= start + tamanho:
+                return start, alinhado
+        return super().pick(livre, count)
+
+
+class RandomPolicy(AllocationPolicy):
+    """
+    Um extent livre sorteado (o embaralhamento da lista livre de antes):
+    entre alguns sorteados, o primeiro que comporta o pedido. Espalha os
+    arquivos pelo disco de propósito, como referência de pior caso.
+    """
+
+    name = 'random'
+    TENTATIVAS = 16
+
+    def __init__(self, seed: int = 0):
+        self._rng = random.Random(seed)
+
+    def reset(self, total_blocks: int):
+        self._lista: List[int] = []
+        self._posicao: Dict[int, int] = {}
+
+    def inserted(self, start: int, length: int):
+        self._posicao[start] = len(self._lista)
+        self._lista.append(start)
+
+    def removed(self, start: int, length: int):
+        i = self._posicao.pop(start)
+        ultimo = self._lista.pop()
+        if ultimo != start:
+            self._lista[i] = ultimo
+            self._posicao[ultimo] = i
+
+    def pick(self, livre, count: int) -> Tuple[int, int]:
+        for _ in range(self.TENTATIVAS):
+            start = self._rng.choice(self._lista)
+            if livre._by_start[start] >= count:
+                break
+        return start, start
+
+
+POLICIES = {politica.name: politica for politica in
+            (SizeClassPolicy, FirstFitPolicy, NextFitPolicy, BestFitPolicy, BuddyPolicy, RandomPolicy)}
+
+
+def make_policy(policy) -> AllocationPolicy:
+    """Aceita uma AllocationPolicy pronta ou o nome de uma das POLICIES."""
+    if isinstance(policy, AllocationPolicy):
+        return policy
+    if policy not in POLICIES:
+        raise ValueError(f"Política de alocação inválida: '{policy}'. Use uma de {tuple(POLICIES)}.")
+    return POLICIES[policy]()
+
+
+class LayoutStats:
+    """
+    Disposição dos arquivos no disco, mantida a cada mudança em vez de
+    recalculada: arquivos com blocos, trechos contíguos (extents) e a soma
+    das distâncias, em blocos, entre o fim de um trecho e o início do
+    seguinte dentro do mesmo arquivo. Cada backend chama add/remove com os
+    extents do arquivo antes e depois de mudá-lo, e grow quando só acrescenta
+    blocos ao fim.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.files = 0
+        self.runs = 0
+        self.blocks = 0
+        self.gap_sum = 0
+
+    def _somar(self, extents, sinal: int):
+        fim = None
+        trechos = saltos = blocos = 0
+        for inicio, tamanho in extents:
+            if inicio != fim:
+                trechos += 1
+                if fim is not None:
+                    saltos += abs(inicio - fim)
+            fim = inicio + tamanho
+            blocos += tamanho
+        if trechos:
+            self.files += sinal
+            self.runs += sinal * trechos
+            self.blocks += sinal * blocos
+            self.gap_sum += sinal * saltos
+
+    def add(self, extents):
+        self._somar(extents, 1)
+
+    def remove(self, extents):
+        self._somar(extents, -1)
+
+    def grow(self, last_block, extents):
+        """Blocos acrescentados ao fim de um arquivo cujo último bloco era `last_block` (None se vazio)."""
+        if last_block is None:
+            self.add(extents)
+            return
+        fim = last_block + 1
+        for inicio, tamanho in extents:
+            if inicio != fim:
+                self.runs += 1
+                self.gap_sum += abs(inicio - fim)
+            fim = inicio + tamanho
+            self.blocks += tamanho
+
+    def stats(self) -> dict:
+        saltos = self.runs - self.files
+        return {
+            'files': self.files,
+            'extents_per_file': self.runs / self.files if self.files else 0.0,
+            'average_gap': self.gap_sum / saltos if saltos else 0.0,
+        }
@@ -0,0 +1,117 @@
+import contextlib
+import gc
+import io
+import math
+import statistics
+import time
+
+REPETICOES = 50
+AQUECIMENTO = 3
+# Duração alvo de cada amostra na calibração: bem acima da resolução do
+# perf_counter, então o ruído do relógio some na média do laço interno.
+TEMPO_AMOSTRA = 0.002
+LIMITE_LACO = 1 << 20
+Z_95 = 1.96
+
+
+class _Silencio(io.TextIOBase):
+    """stdout que descarta tudo sem nem chegar a um arquivo."""
+
+    def write(self, texto: str) -> int:
+        return len(texto)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silencia stdout e desliga o coletor de lixo, restaurando os dois no fim."""
+    ligado = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        with contextlib.redirect_stdout(_Silencio()):
+            yield
+    finally:
+        if ligado:
+            gc.enable()
+
+
+def _percentil(ordenadas: list, p: float) -> float:
+    """Percentil com interpolação linear entre as amostras vizinhas."""
+    pos = (len(ordenadas) - 1) * p
+    baixo = math.floor(pos)
+    alto = min(baixo + 1, len(ordenadas) - 1)
+    return ordenadas[baixo] + (ordenadas[alto] - ordenadas[baixo]) * (pos - baixo)
+
+
+def summarize(amostras: list) -> dict:
+    """
+    Estatísticas de uma lista de tempos em ms. O intervalo de confiança de
+    95% é o da mediana, pelas estatísticas de ordem (não supõe distribuição
+    normal, o que tempos de execução quase nunca são).
+
+    Returns:
+        {'samples', 'median_ms', 'mean_ms', 'stdev_ms', 'min_ms', 'max_ms',
+         'p95_ms', 'p99_ms', 'ci_low_ms', 'ci_high_ms'}
+    """
+    ordenadas = sorted(amostras)
+    n = len(ordenadas)
+    margem = Z_95 * math.sqrt(n) / 2
+    return {
+        'samples': n,
+        'median_ms': statistics.median(ordenadas),
+        'mean_ms': statistics.fmean(ordenadas),
+        'stdev_ms': statistics.stdev(ordenadas) if n > 1 else 0.0,
+        'min_ms': ordenadas[0],
+        'max_ms': ordenadas[-1],
+        'p95_ms': _percentil(ordenadas, 0.95),
+        'p99_ms': _percentil(ordenadas, 0.99),
+        'ci_low_ms': ordenadas[max(0, math.floor(n / 2 - margem))],
+        'ci_high_ms': ordenadas[min(n - 1, math.ceil(n / 2 + margem) - 1)],
+    }
+
+
+def measure(fn, setup=None, repeat: int = REPETICOES, warmup: int = AQUECIMENTO, inner: int = None,
+            target: float = TEMPO_AMOSTRA) -> dict:
+    """
+    Mede fn com aquecimento, laço interno calibrado e várias repetições.
+
+    Cada amostra chama fn `inner` vezes seguidas entre um par de
+    perf_counter e vale o tempo médio por chamada. Sem `inner`, ele dobra até
+    uma amostra durar pelo menos `target` segundos. Com `setup`, cada amostra
+    começa por setup(inner), fora da medição, e fn é chamada com cada item
+    da lista devolvida (ex.: os nomes dos arquivos que ela vai apagar).
+    Durante tudo, stdout é descartado e o coletor de lixo fica desligado.
+
+    Returns:
+        summarize() das amostras, mais 'inner' e 'repeat'
+    """
+    def amostra(n: int) -> float:
+        if setup is None:
+            inicio = time.perf_counter()
+            for _ in range(n):
+                fn()
+            return time.perf_counter() - inicio
+        itens = setup(n)
+        inicio = time.perf_counter()
+        for item in itens:
+            fn(item)
+        return time.perf_counter() - inicio
+
+    with quiet():
+        for _ in range(warmup):
+            amostra(inner or 1)
+        if inner is None:
+            inner = 1
+            while inner < LIMITE_LACO and amostra(inner) < target:
+                inner *= 2
+        tempos = [amostra(inner) * 1000 / inner for _ in range(repeat)]
+    resultado = summarize(tempos)
+    resultado.update(inner=inner, repeat=repeat)
+    return resultado
+
+
+def describe(r: dict, casas: int = 6) -> str:
+    """Resumo de uma linha de um resultado de measure() para os REPLs."""
+    return (f"mediana {r['median_ms']:.{casas}f} ms "
+            f"(IC95 {r['ci_low_ms']:.{casas}f}-{r['ci_high_ms']:.{casas}f}) | "
+            f"p99 {r['p99_ms']:.{casas}f} ms")
@@ -0,0 +1,239 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Set
+
+CACHE_LINES = 1024
+LINE_BLOCKS = 64
+
+
+class BlockDevice:
+    """
+    Dispositivo de blocos simulado sobre um BlockStore.
+
+    Cada transferência custa `access_us` de latência fixa e, quando não
+    começa onde a anterior terminou, mais `seek_us` de busca. O custo é
+    acumulado em `simulated_us` e, com `real_delay`, também gasto de verdade
+    (espera ativa), para que benchmarks com perf_counter o enxerguem.
+    """
+
+    def __init__(self, store, access_us: float = 0.0, seek_us: float = 0.0, real_delay: bool = True):
+        self.store = store
+        self.total_blocks = store.total_blocks
+        self.block_size = store.block_size
+        self.access_us = access_us
+        self.seek_us = seek_us
+        self.real_delay = real_delay
+        self.reads = 0
+        self.writes = 0
+        self.seeks = 0
+        self.simulated_us = 0.0
+        self._head = 0
+
+    def _charge(self, start: int, count: int):
+        custo = self.access_us
+        if start != self._head:
+            custo += self.seek_us
+            self.seeks += 1
+        self._head = start + count
+        if not custo:
+            return
+        self.simulated_us += custo
+        if self.real_delay:
+            fim = time.perf_counter() + custo / 1e6
+            while time.perf_counter() < fim:
+                pass
+
+    def read(self, start: int, count: int) -> bytearray:
+        self.reads += 1
+        self._charge(start, count)
+        return bytearray(self.store.read_extent(start, count))
+
+    def write(self, start: int, payload):
+        self.writes += 1
+        self._charge(start, len(payload) // self.block_size)
+        self.store.write_at(start, 0, payload)
+
+    def discard(self, start: int, count: int):
+        """Descarta (zera) blocos liberados, como um TRIM: não conta como acesso."""
+        self.store.clear_extent(start, count)
+
+
+class BufferCache:
+    """
+    Cache de blocos LRU com write-back na frente de um BlockDevice.
+
+    O cache guarda linhas de `line_blocks` blocos alinhados (com blocos de
+    8 bytes, uma linha por bloco tornaria cada leitura uma chamada Python por
+    bloco). Escritas só marcam a linha como suja; ela vai para o dispositivo
+    quando é despejada ou em flush(). Oferece a mesma interface de leitura e
+    escrita do BlockStore, então os sistemas de arquivos o usam no lugar dele.
+    As memoryviews devolvidas apontam para a linha em cache e deixam de
+    refletir escritas posteriores se a linha for despejada e recarregada.
+    """
+
+    def __init__(self, device: BlockDevice, capacity_lines: int = CACHE_LINES, line_blocks: int = LINE_BLOCKS):
+        self.device = device
+        self.total_blocks = device.total_blocks
+        self.block_size = device.block_size
+        self.capacity_lines = capacity_lines
+        self.line_blocks = line_blocks
+        self.line_bytes = line_blocks * self.block_size
+        self.lines: Dict[int, memoryview] = OrderedDict()
+        self.dirty: Set[int] = set()
+        # Chamado antes de qualquer linha suja ir para o dispositivo; com um
+        # diário, confirma os registros pendentes antes dos dados (regra do WAL).
+        self.before_writeback = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writebacks = 0
+        # Blocos pedidos ao cache (acertos ou não), para as métricas de E/S.
+        self.blocks_read = 0
+        self.blocks_written = 0
+
+    def _count_read(self, blocks: int):
+        self.blocks_read += blocks
+
+    def _line(self, numero: int, fetch: bool = True) -> memoryview:
+        linha = self.lines.get(numero)
+        if linha is not None:
+            self.hits += 1
+            self.lines.move_to_end(numero)
+            return linha
+        self.misses += 1
+        inicio = numero * self.line_blocks
+        quantidade = min(self.line_blocks, self.total_blocks - inicio)
+        if fetch:
+            linha = memoryview(self.device.read(inicio, quantidade))
+        else:
+            linha = memoryview(bytearray(quantidade * self.block_size))
+        self.lines[numero] = linha
+        if len(self.lines) > self.capacity_lines:
+            self._evict()
+        return linha
+
+    def _evict(self):
+        numero, linha = self.lines.popitem(last=False)
+        self.evictions += 1
+        if numero in self.dirty:
+            if self.before_writeback is not None:
+                self.before_writeback()
+            self.dirty.discard(numero)
+            self.device.write(numero * self.line_blocks, linha)
+            self.writebacks += 1
+
+    def _trechos(self, start: int, length: int):
+        """Divide o extent em trechos (linha, inicio, fim) contidos em uma linha."""
+        if start < 0 or start + length > self.total_blocks:
+            raise ValueError(f"Extent ({start}, {length}) fora do disco.")
+        bloco = start
+        fim_extent = start + length
+        while bloco < fim_extent:
+            numero, primeiro = divmod(bloco, self.line_blocks)
+            quantidade = min(fim_extent - bloco, self.line_blocks - primeiro)
+            yield numero, primeiro * self.block_size, (primeiro + quantidade) * self.block_size
+            bloco += quantidade
+
+    def touch(self, block: int):
+        """Acessa o bloco sem copiar nada (ex.: ler o ponteiro guardado nele)."""
+        self._count_read(1)
+        self._line(block // self.line_blocks)
+
+    def view_block(self, block: int) -> memoryview:
+        self._count_read(1)
+        numero, primeiro = divmod(block, self.line_blocks)
+        inicio = primeiro * self.block_size
+        return self._line(numero)[inicio:inicio + self.block_size]
+
+    def iter_views(self, start: int, length: int):
+        self._count_read(length)
+        for numero, inicio, fim in self._trechos(start, length):
+            yield self._line(numero)[inicio:fim]
+
+    def read_block(self, block: int) -> bytes:
+        return bytes(self.view_block(block))
+
+    def read_extent(self, start: int, length: int) -> bytes:
+        return b''.join(self.iter_views(start, length))
+
+    def write_block(self, block: int, payload: bytes):
+        self.write_extent(block, 1, payload)
+
+    def write_extent(self, start: int, length: int, payload: bytes):
+        """Grava `payload` a partir do bloco `start`, zerando o restante do extent."""
+        if len(payload) > length * self.block_size:
+            raise ValueError("Dados maiores que o extent de destino.")
+        payload = memoryview(payload)
+        self.blocks_written += length
+        deslocamento = 0
+        for numero, inicio, fim in self._trechos(start, length):
+            # Uma linha sobrescrita por inteiro não precisa ser lida do dispositivo.
+            linha = self._line(numero, fetch=fim - inicio != self.line_bytes)
+            pedaco = payload[deslocamento:deslocamento + fim - inicio]
+            deslocamento += len(pedaco)
+            meio = inicio + len(pedaco)
+            linha[inicio:meio] = pedaco
+            linha[meio:fim] = bytes(fim - meio)
+            self.dirty.add(numero)
+
+    def write_at(self, block: int, offset: int, payload: bytes):
+        payload = memoryview(payload)
+        blocos = (offset + len(payload) + self.block_size - 1) // self.block_size
+        self.blocks_written += blocos
+        deslocamento = 0
+        for numero, inicio, fim in self._trechos(block, blocos):
+            inicio += offset
+            offset = 0
+            pedaco = payload[deslocamento:deslocamento + fim - inicio]
+            self._line(numero)[inicio:inicio + len(pedaco)] = pedaco
+            deslocamento += len(pedaco)
+            self.dirty.add(numero)
+
+    def clear_extent(self, start: int, length: int):
+        if self.before_writeback is not None:
+            # Com diário, um discard direto chegaria ao disco antes do registro
+            # que libera os blocos: os zeros viram linhas sujas, que só vão para
+            # o dispositivo depois de before_writeback.
+            for numero, inicio, fim in self._trechos(start, length):
+                linha = self._line(numero, fetch=fim - inicio != self.line_bytes)
+                linha[inicio:fim] = bytes(fim - inicio)
+                self.dirty.add(numero)
+            return
+        self.device.discard(start, length)
+        for numero, inicio, fim in self._trechos(start, length):
+            linha = self.lines.get(numero)
+            if linha is not None:
+                linha[inicio:fim] = bytes(fim - inicio)
+
+    def flush(self):
+        """Grava no dispositivo todas as linhas sujas, em ordem de endereço."""
+        if self.dirty and self.before_writeback is not None:
+            self.before_writeback()
+        for numero in sorted(self.dirty):
+            self.device.write(numero * self.line_blocks, self.lines[numero])
+            self.writebacks += 1
+        self.dirty.clear()
+
+    def drop(self):
+        """flush() e esvazia o cache, para medições com cache frio."""
+        self.flush()
+        self.lines.clear()
+
+    def materialized_bytes(self) -> int:
+        return self.device.store.materialized_bytes() + len(self.lines) * self.line_bytes
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'writebacks': self.writebacks,
+            'blocks_read': self.blocks_read,
+            'blocks_written': self.blocks_written,
+            'dirty_lines': len(self.dirty),
+            'cached_lines': len(self.lines),
+            'device_reads': self.device.reads,
+            'device_writes': self.device.writes,
+            'device_seeks': self.device.seeks,
+            'simulated_ms': self.device.simulated_us / 1000,
+        }
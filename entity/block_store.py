@@ -0,0 +1,185 @@
+import struct
+from array import array
+from typing import Dict
+
+PAGE_BLOCKS = 4096
+
+
+class BlockStore:
+    """
+    Área de dados do disco, paginada e materializada sob demanda.
+
+    O bloco b ocupa os bytes [b * block_size, (b + 1) * block_size) do disco
+    lógico. O disco é dividido em páginas de `page_blocks` blocos, cada uma um
+    bytearray contíguo criado apenas na primeira escrita; páginas nunca
+    escritas são lidas como zeros. Assim a criação é O(1) e a memória usada é
+    proporcional aos blocos gravados, não ao tamanho do disco.
+
+    Os métodos view_* / iter_views devolvem memoryviews sobre o próprio buffer
+    (sem cópia); elas refletem escritas posteriores no mesmo bloco, então quem
+    precisar de uma cópia estável deve usar read_*.
+    """
+
+    def __init__(self, total_blocks: int, block_size: int, page_blocks: int = PAGE_BLOCKS):
+        self.total_blocks = total_blocks
+        self.block_size = block_size
+        self.page_blocks = page_blocks
+        self.page_bytes = page_blocks * block_size
+        self.pages: Dict[int, memoryview] = {}
+        self._zero_page = memoryview(bytes(self.page_bytes))
+
+    def materialized_bytes(self) -> int:
+        return len(self.pages) * self.page_bytes
+
+    def _page(self, numero: int) -> memoryview:
+        pagina = self.pages.get(numero)
+        if pagina is None:
+            pagina = memoryview(bytearray(self.page_bytes))
+            self.pages[numero] = pagina
+        return pagina
+
+    def _trechos(self, start: int, length: int):
+        """Divide o extent em trechos (pagina, inicio, fim) contidos em uma página."""
+        if start < 0 or start + length > self.total_blocks:
+            raise ValueError(f"Extent ({start}, {length}) fora do disco.")
+        bloco = start
+        fim_extent = start + length
+        while bloco < fim_extent:
+            numero, primeiro = divmod(bloco, self.page_blocks)
+            quantidade = min(fim_extent - bloco, self.page_blocks - primeiro)
+            yield numero, primeiro * self.block_size, (primeiro + quantidade) * self.block_size
+            bloco += quantidade
+
+    def _read_page(self, numero: int) -> memoryview:
+        return self.pages.get(numero, self._zero_page)
+
+    def _is_zero(self, numero: int) -> bool:
+        """Se a página inteira é sabidamente zero (nunca foi escrita)."""
+        return numero not in self.pages
+
+    def view_block(self, block: int) -> memoryview:
+        numero, primeiro = divmod(block, self.page_blocks)
+        pagina = self._read_page(numero)
+        inicio = primeiro * self.block_size
+        return pagina[inicio:inicio + self.block_size]
+
+    def iter_views(self, start: int, length: int):
+        """Gera memoryviews que cobrem o extent, uma por página tocada."""
+        for numero, inicio, fim in self._trechos(start, length):
+            yield self._read_page(numero)[inicio:fim]
+
+    def read_block(self, block: int) -> bytes:
+        return bytes(self.view_block(block))
+
+    def read_extent(self, start: int, length: int) -> bytes:
+        return b''.join(self.iter_views(start, length))
+
+    def write_block(self, block: int, payload: bytes):
+        self.write_extent(block, 1, payload)
+
+    def write_extent(self, start: int, length: int, payload: bytes):
+        """Grava `payload` a partir do bloco `start`, zerando o restante do extent."""
+        if len(payload) > length * self.block_size:
+            raise ValueError("Dados maiores que o extent de destino.")
+        payload = memoryview(payload)
+        deslocamento = 0
+        for numero, inicio, fim in self._trechos(start, length):
+            pedaco = payload[deslocamento:deslocamento + fim - inicio]
+            deslocamento += len(pedaco)
+            if not pedaco and self._is_zero(numero):
+                continue
+            pagina = self._page(numero)
+            meio = inicio + len(pedaco)
+            pagina[inicio:meio] = pedaco
+            pagina[meio:fim] = bytes(fim - meio)
+
+    def write_at(self, block: int, offset: int, payload: bytes):
+        """
+        Grava `payload` a partir do byte `offset` do bloco `block`, sem zerar o
+        resto dos blocos; os blocos tocados devem ser fisicamente contíguos.
+        """
+        payload = memoryview(payload)
+        blocos = (offset + len(payload) + self.block_size - 1) // self.block_size
+        deslocamento = 0
+        for numero, inicio, fim in self._trechos(block, blocos):
+            inicio += offset
+            offset = 0
+            pedaco = payload[deslocamento:deslocamento + fim - inicio]
+            self._page(numero)[inicio:inicio + len(pedaco)] = pedaco
+            deslocamento += len(pedaco)
+
+    def clear_extent(self, start: int, length: int):
+        for numero, inicio, fim in self._trechos(start, length):
+            if numero not in self.pages:
+                continue
+            if fim - inicio == self.page_bytes:
+                del self.pages[numero]
+            else:
+                self.pages[numero][inicio:fim] = bytes(fim - inicio)
+
+
+class PagedArray:
+    """Array de inteiros ('q') paginado; posições nunca escritas valem `default`."""
+
+    def __init__(self, length: int, default: int = 0, page_items: int = PAGE_BLOCKS):
+        self.length = length
+        self.default = default
+        self.page_items = page_items
+        self.pages: Dict[int, array] = {}
+
+    def materialized_bytes(self) -> int:
+        return len(self.pages) * self.page_items * 8
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index: int) -> int:
+        pagina = self.pages.get(index // self.page_items)
+        if pagina is None:
+            return self.default
+        return pagina[index % self.page_items]
+
+    def __setitem__(self, index: int, value: int):
+        numero, posicao = divmod(index, self.page_items)
+        pagina = self.pages.get(numero)
+        if pagina is None:
+            if value == self.default:
+                return
+            # setdefault: duas threads criando a mesma página ficam com uma só.
+            pagina = self.pages.setdefault(numero, array('q', [self.default]) * self.page_items)
+        pagina[posicao] = value
+
+    def tobytes(self) -> bytes:
+        """Serializa só as páginas materializadas: (quantidade, [número, itens]...)."""
+        partes = [struct.pack('<I', len(self.pages))]
+        for numero in sorted(self.pages):
+            partes.append(struct.pack('<I', numero))
+            partes.append(self.pages[numero].tobytes())
+        return b''.join(partes)
+
+    def load(self, data, pos: int = 0) -> int:
+        """Substitui as páginas pelas serializadas em `data[pos:]`; devolve a posição seguinte."""
+        (quantidade,) = struct.unpack_from('<I', data, pos)
+        pos += 4
+        tamanho = self.page_items * 8
+        self.pages = {}
+        for _ in range(quantidade):
+            (numero,) = struct.unpack_from('<I', data, pos)
+            pos += 4
+            pagina = array('q')
+            pagina.frombytes(data[pos:pos + tamanho])
+            self.pages[numero] = pagina
+            pos += tamanho
+        return pos
+
+    def set_range(self, start: int, values):
+        """Grava `values` (um array('q')) a partir de `start`, uma fatia por página."""
+        deslocamento = 0
+        while deslocamento < len(values):
+            numero, posicao = divmod(start + deslocamento, self.page_items)
+            quantidade = min(len(values) - deslocamento, self.page_items - posicao)
+            pagina = self.pages.get(numero)
+            if pagina is None:
+                pagina = self.pages.setdefault(numero, array('q', [self.default]) * self.page_items)
+            pagina[posicao:posicao + quantidade] = values[deslocamento:deslocamento + quantidade]
+            deslocamento += quantidade
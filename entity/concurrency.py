@@ -0,0 +1,359 @@
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict
+from entity.block_device import BufferCache
+from entity.free_space import FreeSpaceManager
+from entity.allocation import LayoutStats
+from entity.inode_table import InodeTable
+from entity.metrics import Metrics
+
+
+class Session:
+    """Diretório atual de um cliente (uma thread, uma conexão): cada sessão navega sozinha."""
+    __slots__ = ('cwd', 'path')
+
+    def __init__(self, cwd, path: str = "/"):
+        self.cwd = cwd
+        self.path = path
+
+
+class Sessions:
+    """Modo normal: uma sessão só, a mesma para todas as threads."""
+
+    def __init__(self, factory):
+        self.current = factory()
+
+
+class ThreadSessions(threading.local):
+    """Modo concorrente: cada thread ganha a sua sessão, na raiz, no primeiro acesso."""
+
+    def __init__(self, factory):
+        self.current = factory()
+
+
+class SharedLock:
+    """
+    Trava compartilhada/exclusiva (leitores/escritor). Várias threads entram
+    juntas no modo compartilhado; o exclusivo espera todas saírem e segura as
+    novas. A thread que tem a trava exclusiva pode entrar de novo em
+    qualquer um dos dois modos.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._leitores = 0
+        self._dono = None
+        self._profundidade = 0
+
+    def acquire_shared(self):
+        eu = threading.get_ident()
+        with self._cond:
+            while self._dono is not None and self._dono != eu:
+                self._cond.wait()
+            self._leitores += 1
+
+    def release_shared(self):
+        with self._cond:
+            self._leitores -= 1
+            if not self._leitores:
+                self._cond.notify_all()
+
+    def acquire_exclusive(self):
+        eu = threading.get_ident()
+        with self._cond:
+            if self._dono != eu:
+                while self._dono is not None or self._leitores:
+                    self._cond.wait()
+                self._dono = eu
+            self._profundidade += 1
+
+    def release_exclusive(self):
+        with self._cond:
+            self._profundidade -= 1
+            if not self._profundidade:
+                self._dono = None
+                self._cond.notify_all()
+
+    def idle(self) -> bool:
+        with self._cond:
+            return not self._leitores and self._dono is None
+
+    @contextmanager
+    def shared(self):
+        self.acquire_shared()
+        try:
+            yield
+        finally:
+            self.release_shared()
+
+    @contextmanager
+    def exclusive(self):
+        self.acquire_exclusive()
+        try:
+            yield
+        finally:
+            self.release_exclusive()
+
+
+class Concurrency:
+    """
+    Coordenação do modo concorrente de um sistema de arquivos.
+
+    Cada nó (diretório ou arquivo) tem uma SharedLock própria, criada sob
+    demanda. Uma operação resolve os nós de que precisa como pares (número,
+    exclusivo): criar ou remover uma entrada trava o diretório em modo
+    exclusivo, ler ou escrever um arquivo trava o diretório em modo
+    compartilhado e o arquivo no modo da operação. Depois de travar, a
+    operação resolve de novo: se algo mudou no meio (o arquivo foi removido
+    ou movido), solta tudo e tenta outra vez. As travas são sempre pegas em
+    ordem crescente de número, o que evita deadlock, e só a operação mais
+    externa de uma thread trava; as que ela chama por dentro (write_file ->
+    create_file) já estão cobertas. Checkpoints pedidos durante uma operação
+    rodam depois dela, com a trava geral exclusiva.
+    """
+
+    def __init__(self):
+        self.gate = SharedLock()
+        self.checkpoint = None
+        self.checkpoint_due = False
+        self._travas: Dict[int, SharedLock] = {}
+        self._local = threading.local()
+
+    def nested(self) -> bool:
+        return getattr(self._local, 'depth', 0) > 0
+
+    def lock(self, numero: int) -> SharedLock:
+        trava = self._travas.get(numero)
+        if trava is None:
+            trava = self._travas.setdefault(numero, SharedLock())
+        return trava
+
+    def idle(self, numero: int) -> bool:
+        """Nenhuma thread segura a trava do nó (nem um handle aberto do arquivo)."""
+        trava = self._travas.get(numero)
+        return trava is None or trava.idle()
+
+    def acquire(self, resolve) -> list:
+        """
+        Trava os nós devolvidos por resolve() até a resolução se repetir e
+        devolve a lista de (trava, exclusivo) para release().
+        """
+        pares = resolve()
+        while True:
+            modos: Dict[int, bool] = {}
+            for numero, exclusivo in pares:
+                if numero is not None:
+                    modos[numero] = modos.get(numero, False) or exclusivo
+            travas = [(self.lock(numero), modos[numero]) for numero in sorted(modos)]
+            for trava, exclusivo in travas:
+                if exclusivo:
+                    trava.acquire_exclusive()
+                else:
+                    trava.acquire_shared()
+            atuais = resolve()
+            if atuais == pares:
+                return travas
+            self.release(travas)
+            pares = atuais
+
+    def release(self, travas: list):
+        for trava, exclusivo in reversed(travas):
+            if exclusivo:
+                trava.release_exclusive()
+            else:
+                trava.release_shared()
+
+    @contextmanager
+    def _entrar(self, modo):
+        profundidade = getattr(self._local, 'depth', 0)
+        self._local.depth = profundidade + 1
+        try:
+            with modo():
+                yield
+        finally:
+            self._local.depth = profundidade
+        if not profundidade and self.checkpoint_due:
+            with self.gate.exclusive():
+                if self.checkpoint_due:
+                    self.checkpoint_due = False
+                    self.checkpoint()
+
+    def operation(self):
+        return self._entrar(self.gate.shared)
+
+    def exclusive(self):
+        return self._entrar(self.gate.exclusive)
+
+
+def locked(resolver: str):
+    """
+    Decora uma operação para o modo concorrente: `resolver` é o nome do
+    método que, com os mesmos argumentos, devolve os pares (número do nó,
+    exclusivo) a travar.
+    """
+    def decorador(metodo):
+        @wraps(metodo)
+        def wrapper(self, *args, **kwargs):
+            c = self._concurrency
+            if c is None or c.nested():
+                return metodo(self, *args, **kwargs)
+            resolve = getattr(self, resolver)
+            with c.operation():
+                travas = c.acquire(lambda: resolve(*args, **kwargs))
+                try:
+                    return metodo(self, *args, **kwargs)
+                finally:
+                    c.release(travas)
+        return wrapper
+    return decorador
+
+
+def exclusive(metodo):
+    """Decora uma operação que precisa do sistema inteiro parado (lotes, sync)."""
+    @wraps(metodo)
+    def wrapper(self, *args, **kwargs):
+        c = self._concurrency
+        if c is None or c.nested():
+            return metodo(self, *args, **kwargs)
+        with c.exclusive():
+            return metodo(self, *args, **kwargs)
+    return wrapper
+
+
+class LockedFreeSpace(FreeSpaceManager):
+    """Mapa livre com uma trava: alocações e liberações de threads diferentes não se misturam."""
+
+    def __init__(self, total_blocks: int, policy='size-class'):
+        super().__init__(total_blocks, policy)
+        self._trava = threading.RLock()
+
+    def transaction(self):
+        return self._trava
+
+    def allocate(self, count: int, hint: int = None):
+        with self._trava:
+            return super().allocate(count, hint)
+
+    def free(self, start: int, length: int):
+        with self._trava:
+            super().free(start, length)
+
+    def free_extents(self, extents):
+        with self._trava:
+            super().free_extents(extents)
+
+    def stats(self) -> dict:
+        with self._trava:
+            return super().stats()
+
+    def reserve(self, start: int, count: int):
+        with self._trava:
+            super().reserve(start, count)
+
+    def lowest_fit(self, count: int):
+        with self._trava:
+            return super().lowest_fit(count)
+
+    def first_hole(self):
+        with self._trava:
+            return super().first_hole()
+
+
+class LockedBufferCache(BufferCache):
+    """
+    Cache de blocos com uma trava. Escritas ficam inteiras dentro dela, para
+    que a linha não seja despejada entre ser obtida e ser alterada; leituras
+    só travam para obter cada linha.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._trava = threading.RLock()
+
+    def _line(self, numero: int, fetch: bool = True) -> memoryview:
+        with self._trava:
+            return super()._line(numero, fetch)
+
+    def _count_read(self, blocks: int):
+        with self._trava:
+            self.blocks_read += blocks
+
+    def write_extent(self, start: int, length: int, payload: bytes):
+        with self._trava:
+            super().write_extent(start, length, payload)
+
+    def write_at(self, block: int, offset: int, payload: bytes):
+        with self._trava:
+            super().write_at(block, offset, payload)
+
+    def clear_extent(self, start: int, length: int):
+        with self._trava:
+            super().clear_extent(start, length)
+
+    def flush(self):
+        with self._trava:
+            super().flush()
+
+    def drop(self):
+        with self._trava:
+            super().drop()
+
+
+class LockedInodeTable(InodeTable):
+    """Tabela de inodes cujas inserções e remoções (lista de livres) são atômicas."""
+
+    def __init__(self):
+        super().__init__()
+        self._trava = threading.Lock()
+
+    def add(self, node) -> int:
+        with self._trava:
+            return super().add(node)
+
+    def __delitem__(self, number: int):
+        with self._trava:
+            super().__delitem__(number)
+
+
+class LockedLayoutStats(LayoutStats):
+    """Contadores de disposição atualizados por threads diferentes sem perder somas."""
+
+    def __init__(self):
+        self._trava = threading.RLock()
+        super().__init__()
+
+    def add(self, extents):
+        with self._trava:
+            super().add(extents)
+
+    def remove(self, extents):
+        with self._trava:
+            super().remove(extents)
+
+    def grow(self, last_block, extents):
+        with self._trava:
+            super().grow(last_block, extents)
+
+
+class LockedMetrics(Metrics):
+    """
+    Métricas registradas por threads diferentes. Anexar às pendentes já é
+    atômico; só a passagem para o histograma e os erros usam a trava.
+    """
+
+    def __init__(self):
+        self._trava = threading.RLock()
+        super().__init__()
+
+    def _fold(self, op: str):
+        with self._trava:
+            super()._fold(op)
+
+    def _count_error(self, op: str):
+        with self._trava:
+            super()._count_error(op)
+
+    def snapshot(self) -> dict:
+        with self._trava:
+            return super().snapshot()
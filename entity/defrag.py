@@ -0,0 +1,138 @@
+import time
+from collections import deque
+from itertools import accumulate
+
+
+def fragmentation(layout, free_space) -> dict:
+    """Retrato da fragmentação: a disposição dos arquivos (LayoutStats) e a do espaço livre."""
+    livre = free_space.stats()
+    return dict(layout.stats(), free_extents=livre['free_extents'], largest_free=livre['largest_free'])
+
+
+def describe_layout(r: dict) -> str:
+    """Resumo de uma linha de fragmentation() para status e desfragmentação."""
+    return (f"{r['extents_per_file']:.2f} extents por arquivo | salto médio {r['average_gap']:.1f} blocos | "
+            f"maior trecho livre {r['largest_free']} blocos em {r['free_extents']} trechos livres")
+
+
+class Defragmenter:
+    """
+    Desfragmentador incremental, comum aos dois backends.
+
+    Cada run() faz movimentos até esgotar o orçamento e guarda onde parou,
+    então pode rodar aos poucos entre as operações normais. Uma passada tem
+    duas fases:
+
+    1. arquivos: cada arquivo com mais de um extent é copiado inteiro para o
+       extent livre de menor endereço que o comporte, se houver;
+    2. compactação: o extent logo depois do buraco livre de menor endereço
+       desce para o início do buraco, que assim sobe pelo disco fundindo-se
+       aos seguintes, até o espaço livre ser um trecho só no fim do disco.
+
+    Uma passada que não moveu nada encerra o trabalho. O backend fornece
+    `files()`, com os números dos arquivos; `extents_of(numero)`, com os
+    extents do arquivo em ordem lógica (None se o número não é mais um
+    arquivo ou se ele não pode ser movido agora); e
+    `relocate(numero, extents, destinos)`, que move cada extent i para
+    começar em destinos[i], liberando os blocos antigos antes de reservar os
+    novos (na compactação o destino sobrepõe o próprio extent).
+    """
+
+    def __init__(self, free_space, files, extents_of, relocate):
+        self.free_space = free_space
+        self._files = files
+        self._extents_of = extents_of
+        self._relocate = relocate
+        # Arquivos ainda não examinados na fase 1; None começa uma passada nova.
+        self._fila = None
+        self._mudou = False
+        # Início de cada extent -> arquivo, para achar quem está depois de um
+        # buraco. Refeito quando a consulta encontra uma entrada velha.
+        self._donos = {}
+
+    def _mover(self, numero: int, extents: list, destinos: list) -> int:
+        self._relocate(numero, extents, destinos)
+        blocos = 0
+        for (inicio, tamanho), destino in zip(extents, destinos):
+            if destino != inicio:
+                self._donos.pop(inicio, None)
+                self._donos[destino] = numero
+                blocos += tamanho
+        self._mudou = True
+        return blocos
+
+    def _juntar_arquivo(self):
+        while self._fila:
+            numero = self._fila.popleft()
+            extents = self._extents_of(numero)
+            if extents is None or len(extents) < 2:
+                continue
+            destino = self.free_space.lowest_fit(sum(tamanho for _, tamanho in extents))
+            if destino is None:
+                continue
+            deslocamentos = accumulate((tamanho for _, tamanho in extents[:-1]), initial=0)
+            return self._mover(numero, extents, [destino + d for d in deslocamentos])
+        return None
+
+    def _dono(self, bloco: int):
+        """(arquivo, extents) do extent que começa em `bloco`, ou (None, None)."""
+        for tentativa in range(2):
+            numero = self._donos.get(bloco)
+            if numero is not None:
+                extents = self._extents_of(numero)
+                if extents is not None and any(inicio == bloco for inicio, _ in extents):
+                    return numero, extents
+            if not tentativa:
+                self._donos = {inicio: numero for numero in self._files()
+                               for inicio, _ in self._extents_of(numero) or ()}
+        return None, None
+
+    def _compactar(self):
+        buraco = self.free_space.first_hole()
+        if buraco is None:
+            return None
+        inicio, tamanho = buraco
+        numero, extents = self._dono(inicio + tamanho)
+        if numero is None:
+            # O extent seguinte não pode ser movido agora (ex.: arquivo aberto).
+            return None
+        destinos = [inicio if e == inicio + tamanho else e for e, _ in extents]
+        return self._mover(numero, extents, destinos)
+
+    def _passo(self):
+        """Faz um movimento e devolve quantos blocos copiou, ou None se não há mais nada a fazer."""
+        while True:
+            if self._fila is None:
+                self._fila = deque(self._files())
+                self._mudou = False
+            blocos = self._juntar_arquivo()
+            if blocos is None:
+                blocos = self._compactar()
+            if blocos is not None:
+                return blocos
+            self._fila = None
+            if not self._mudou:
+                return None
+
+    def run(self, max_blocks: int = None, max_ms: float = None) -> dict:
+        """
+        Move extents até copiar `max_blocks` blocos ou passar `max_ms` ms,
+        conferidos antes de cada movimento (um arquivo grande pode passar um
+        pouco do orçamento). Sem nenhum dos dois, vai até o fim.
+
+        Returns:
+            {'moves', 'moved_blocks', 'seconds', 'done'}
+        """
+        inicio = time.perf_counter()
+        prazo = inicio + max_ms / 1000 if max_ms is not None else None
+        movimentos = blocos = 0
+        concluido = False
+        while (max_blocks is None or blocos < max_blocks) and (prazo is None or time.perf_counter() < prazo):
+            movidos = self._passo()
+            if movidos is None:
+                concluido = True
+                break
+            movimentos += 1
+            blocos += movidos
+        return {'moves': movimentos, 'moved_blocks': blocos, 'seconds': time.perf_counter() - inicio,
+                'done': concluido}
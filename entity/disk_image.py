@@ -0,0 +1,176 @@
+import mmap
+import os
+import struct
+import zlib
+from entity.block_store import BlockStore, PAGE_BLOCKS
+from entity.errors import NotMountedError
+
+MAGIC = b'SISARQ01'
+# magic, tipo do sistema, tamanho do bloco, total de blocos,
+# início e tamanho da área de metadados, crc32 dos metadados e
+# lsn do último registro do diário já incluído nesta imagem
+HEADER = struct.Struct('<8s2sIQQQIQ')
+HEADER_BYTES = max(mmap.ALLOCATIONGRANULARITY, mmap.PAGESIZE)
+
+
+class MappedStore(BlockStore):
+    """
+    Área de dados do disco mapeada de um arquivo de imagem com mmap.
+
+    Páginas não ficam em memória: cada leitura é uma fatia do mapa e o sistema
+    operacional traz do arquivo só o que é tocado. `pages` guarda apenas as
+    páginas escritas desde o último sync, que é o que sync() manda para o
+    arquivo. Depois de close(), qualquer acesso levanta NotMountedError.
+    """
+
+    def __init__(self, mapa: mmap.mmap, total_blocks: int, block_size: int, page_blocks: int = PAGE_BLOCKS):
+        super().__init__(total_blocks, block_size, page_blocks)
+        self._mapa = mapa
+        self._dados = memoryview(mapa)[HEADER_BYTES:HEADER_BYTES + total_blocks * block_size]
+
+    def materialized_bytes(self) -> int:
+        return 0
+
+    def _read_page(self, numero: int) -> memoryview:
+        pagina = self.pages.get(numero)
+        if pagina is None:
+            if self._dados is None:
+                raise NotMountedError("Imagem desmontada.")
+            pagina = self._dados[numero * self.page_bytes:(numero + 1) * self.page_bytes]
+        return pagina
+
+    def _page(self, numero: int) -> memoryview:
+        pagina = self.pages.get(numero)
+        if pagina is None:
+            if self._dados is None:
+                raise NotMountedError("Imagem desmontada.")
+            pagina = self._dados[numero * self.page_bytes:(numero + 1) * self.page_bytes]
+            self.pages[numero] = pagina
+        return pagina
+
+    def _is_zero(self, numero: int) -> bool:
+        return False
+
+    def clear_extent(self, start: int, length: int):
+        for numero, inicio, fim in self._trechos(start, length):
+            self._page(numero)[inicio:fim] = bytes(fim - inicio)
+
+    def sync(self) -> int:
+        """Grava no arquivo só as páginas sujas; devolve quantas foram gravadas."""
+        sujas = len(self.pages)
+        for numero in sorted(self.pages):
+            inicio = HEADER_BYTES + numero * self.page_bytes
+            alinhado = inicio - inicio % mmap.PAGESIZE
+            self._mapa.flush(alinhado, inicio - alinhado + len(self.pages[numero]))
+            self.pages[numero].release()
+        self.pages.clear()
+        return sujas
+
+    def close(self):
+        for pagina in self.pages.values():
+            pagina.release()
+        self.pages.clear()
+        self._dados.release()
+        self._dados = None
+
+
+class DiskImage:
+    """
+    Arquivo de imagem de disco: cabeçalho (superbloco), área de dados e, no
+    fim, a área de metadados serializada pelo sistema de arquivos.
+
+    A área de dados é mapeada com mmap e criada esparsa, então criar ou montar
+    uma imagem de vários GB custa O(metadados), não O(blocos). Os metadados são
+    regravados inteiros a cada sync, sempre fora da cópia atual, e só depois de
+    estarem no disco o cabeçalho passa a apontar para eles: uma queda no meio
+    de um sync deixa a imagem com os metadados anteriores, que continuam
+    íntegros.
+    """
+
+    def __init__(self, path: str, kind: bytes, block_size: int, total_blocks: int):
+        self.path = path
+        self.kind = kind
+        existe = os.path.exists(path) and os.path.getsize(path) > 0
+        self._arquivo = open(path, 'r+b' if existe else 'w+b')
+        if existe:
+            cabecalho = self._arquivo.read(HEADER.size)
+            if len(cabecalho) < HEADER.size:
+                self._arquivo.close()
+                raise ValueError(f"Imagem '{path}' truncada.")
+            magic, tipo, block_size, total_blocks, self.meta_offset, self.meta_length, self.meta_crc, \
+                self.lsn = HEADER.unpack(cabecalho)
+            if magic != MAGIC:
+                self._arquivo.close()
+                raise ValueError(f"'{path}' não é uma imagem de disco.")
+            if tipo != kind:
+                self._arquivo.close()
+                raise ValueError(f"Imagem '{path}' é de outro tipo de sistema de arquivos ({tipo.decode()}).")
+        else:
+            self.meta_offset = self._fim_dos_dados(block_size, total_blocks)
+            self.meta_length = 0
+            self.meta_crc = 0
+            self.lsn = 0
+            self._arquivo.truncate(self.meta_offset)
+            self._write_header(block_size, total_blocks)
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+        self.block_size = block_size
+        self.total_blocks = total_blocks
+        self._inicio_metadados = self._fim_dos_dados(block_size, total_blocks)
+        self._mapa = mmap.mmap(self._arquivo.fileno(), self._inicio_metadados)
+        self.store = MappedStore(self._mapa, total_blocks, block_size)
+
+    @staticmethod
+    def _fim_dos_dados(block_size: int, total_blocks: int) -> int:
+        """Primeiro byte depois da área de dados, alinhado a página: onde a área de metadados começa."""
+        dados = total_blocks * block_size
+        return HEADER_BYTES + dados + (-dados) % mmap.PAGESIZE
+
+    def _write_header(self, block_size: int, total_blocks: int):
+        self._arquivo.seek(0)
+        self._arquivo.write(HEADER.pack(MAGIC, self.kind, block_size, total_blocks,
+                                        self.meta_offset, self.meta_length, self.meta_crc, self.lsn))
+
+    def read_metadata(self) -> bytes:
+        """Devolve os metadados gravados (b'' numa imagem nova)."""
+        if not self.meta_length:
+            return b''
+        self._arquivo.seek(self.meta_offset)
+        dados = self._arquivo.read(self.meta_length)
+        if len(dados) != self.meta_length or zlib.crc32(dados) != self.meta_crc:
+            raise ValueError(f"Metadados da imagem '{self.path}' corrompidos.")
+        return dados
+
+    def sync(self, metadata: bytes, lsn: int = None) -> int:
+        """
+        Grava as páginas de dados sujas e os metadados, e atualiza o cabeçalho
+        (com `lsn`, se dado). Devolve o número de páginas de dados gravadas.
+        """
+        sujas = self.store.sync()
+        # A cópia nova vai para o início da área de metadados se couber antes
+        # da atual, senão logo depois dela; nunca por cima.
+        inicio = self._inicio_metadados
+        if self.meta_offset == inicio or len(metadata) > self.meta_offset - inicio:
+            fim_atual = self.meta_offset + self.meta_length
+            inicio = fim_atual + (-fim_atual) % mmap.PAGESIZE
+        self._arquivo.seek(inicio)
+        self._arquivo.write(metadata)
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+
+        if lsn is not None:
+            self.lsn = lsn
+        self.meta_offset = inicio
+        self.meta_length = len(metadata)
+        self.meta_crc = zlib.crc32(metadata)
+        self._write_header(self.block_size, self.total_blocks)
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+        # Só agora a cópia anterior pode sumir (se ficou depois da nova).
+        self._arquivo.truncate(inicio + len(metadata))
+        return sujas
+
+    def close(self):
+        self.store.close()
+        self._mapa.close()
+        self._arquivo.close()
@@ -0,0 +1,37 @@
+class FileSystemError(Exception):
+    """
+    Erro de uma operação dos sistemas de arquivos. A mensagem já vem pronta
+    para o usuário (sem o prefixo "Erro: ", que fica com quem a mostra).
+    """
+
+
+class NotFoundError(FileSystemError):
+    """O arquivo ou diretório não existe."""
+
+
+class AlreadyExistsError(FileSystemError):
+    """Já existe uma entrada com esse nome no diretório."""
+
+
+class IsDirectoryError(FileSystemError):
+    """A operação é de arquivo, mas o caminho é de um diretório."""
+
+
+class NotDirectoryError(FileSystemError):
+    """A operação precisa de um diretório, mas o caminho é de um arquivo."""
+
+
+class DirectoryNotEmptyError(FileSystemError):
+    """O diretório ainda tem entradas."""
+
+
+class NoSpaceError(FileSystemError, ValueError):
+    """Não há blocos livres suficientes (ValueError, como o que o alocador sempre levantou)."""
+
+
+class InvalidArgumentError(FileSystemError, ValueError):
+    """Um argumento fora do intervalo válido, como um offset negativo."""
+
+
+class NotMountedError(FileSystemError):
+    """A operação precisa de uma imagem montada."""
@@ -0,0 +1,127 @@
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from typing import Iterable, List, Tuple
+
+_VAZIO = ()
+
+
+class ExtentMap:
+    """
+    Mapa de blocos de um arquivo guardado como extents (inicio, tamanho).
+
+    `starts[i]` é o primeiro bloco físico do extent i e `offsets[i]` o índice
+    lógico do seu primeiro bloco, então o bloco lógico k é encontrado por
+    busca binária em `offsets`. Extents fisicamente contíguos são fundidos ao
+    serem anexados. Também se comporta como a antiga lista de blocos:
+    `len(m)` é o número de blocos, `m[k]` o bloco físico k e a iteração gera
+    os blocos em ordem.
+
+    Os arrays só são criados no primeiro extent; até lá um mapa vazio usa a
+    tupla vazia compartilhada, para não pesar em arquivos vazios.
+    """
+
+    __slots__ = ('starts', 'offsets', 'total')
+
+    def __init__(self, extents: Iterable[Tuple[int, int]] = ()):
+        self.starts = _VAZIO
+        self.offsets = _VAZIO
+        self.total = 0
+        for start, length in extents:
+            self.append(start, length)
+
+    def append(self, start: int, length: int):
+        if length <= 0:
+            return
+        if self.starts and self.starts[-1] + (self.total - self.offsets[-1]) == start:
+            self.total += length
+            return
+        if self.starts is _VAZIO:
+            self.starts = array('q')
+            self.offsets = array('q')
+        self.starts.append(start)
+        self.offsets.append(self.total)
+        self.total += length
+
+    def _length(self, i: int) -> int:
+        fim = self.offsets[i + 1] if i + 1 < len(self.offsets) else self.total
+        return fim - self.offsets[i]
+
+    def extents(self) -> List[Tuple[int, int]]:
+        return [(self.starts[i], self._length(i)) for i in range(len(self.starts))]
+
+    def extent_count(self) -> int:
+        return len(self.starts)
+
+    def block_at(self, k: int) -> int:
+        if k < 0:
+            k += self.total
+        if not 0 <= k < self.total:
+            raise IndexError(f"Bloco {k} fora do arquivo.")
+        i = bisect_right(self.offsets, k) - 1
+        return self.starts[i] + k - self.offsets[i]
+
+    def truncate(self, n: int) -> List[Tuple[int, int]]:
+        """Mantém só os n primeiros blocos e devolve os extents removidos do fim."""
+        if n >= self.total:
+            return []
+        i = bisect_right(self.offsets, n) - 1 if n > 0 else 0
+        removidos = [(self.starts[j], self._length(j)) for j in range(i, len(self.starts))]
+        manter = n - self.offsets[i]
+        if manter:
+            inicio, tamanho = removidos[0]
+            removidos[0] = (inicio + manter, tamanho - manter)
+            i += 1
+        del self.starts[i:]
+        del self.offsets[i:]
+        self.total = n
+        return removidos
+
+    def locate(self, k: int) -> Tuple[int, int]:
+        """Devolve (bloco físico de k, blocos contíguos restantes no extent a partir de k)."""
+        if not 0 <= k < self.total:
+            raise IndexError(f"Bloco {k} fora do arquivo.")
+        i = bisect_right(self.offsets, k) - 1
+        return self.starts[i] + k - self.offsets[i], self._length(i) - (k - self.offsets[i])
+
+    def nbytes(self) -> int:
+        """Bytes de metadados ocupados pelo mapa (objeto e arrays)."""
+        if self.starts is _VAZIO:
+            return sys.getsizeof(self)
+        return sys.getsizeof(self) + sys.getsizeof(self.starts) + sys.getsizeof(self.offsets)
+
+    def tobytes(self) -> bytes:
+        """Serializa o mapa: (total, número de extents) seguidos dos arrays starts e offsets."""
+        cabecalho = struct.pack('<QI', self.total, len(self.starts))
+        if not self.starts:
+            return cabecalho
+        return cabecalho + self.starts.tobytes() + self.offsets.tobytes()
+
+    @classmethod
+    def frombytes(cls, data, pos: int = 0) -> Tuple['ExtentMap', int]:
+        """Inverso de tobytes: devolve o mapa lido em `data[pos:]` e a posição seguinte."""
+        mapa = cls()
+        mapa.total, quantidade = struct.unpack_from('<QI', data, pos)
+        pos += 12
+        if quantidade:
+            mapa.starts = array('q')
+            mapa.starts.frombytes(data[pos:pos + 8 * quantidade])
+            pos += 8 * quantidade
+            mapa.offsets = array('q')
+            mapa.offsets.frombytes(data[pos:pos + 8 * quantidade])
+            pos += 8 * quantidade
+        return mapa, pos
+
+    def __getitem__(self, k: int) -> int:
+        return self.block_at(k)
+
+    def __len__(self) -> int:
+        return self.total
+
+    def __iter__(self):
+        for start, length in self.extents():
+            yield from range(start, start + length)
+
+    def __repr__(self) -> str:
+        return repr(self.extents())
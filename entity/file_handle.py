@@ -0,0 +1,116 @@
+import codecs
+import os
+
+TAMANHO_PEDACO = 4096
+
+
+def write_range(store, block_size: int, locate, offset: int, data: bytes):
+    """
+    Grava `data` a partir do byte lógico `offset` de um arquivo cujos blocos já
+    estão alocados, tocando só os blocos afetados. `locate` tem o mesmo
+    contrato do FileHandle.
+    """
+    data = memoryview(data)
+    pos = 0
+    while pos < len(data):
+        k, deslocamento = divmod(offset + pos, block_size)
+        bloco, contiguos = locate(k)
+        n = min(len(data) - pos, contiguos * block_size - deslocamento)
+        store.write_at(bloco, deslocamento, data[pos:pos + n])
+        pos += n
+
+
+class FileHandle:
+    """
+    Handle de leitura no estilo open(): read(n), seek, tell e iteração em
+    pedaços, sem materializar o arquivo inteiro.
+
+    `locate(k)` devolve (bloco físico, quantidade de blocos fisicamente
+    contíguos a partir dele) para a posição lógica k; cada backend fornece a
+    sua, então o mesmo handle serve ao i-node e à lista encadeada.
+    `on_close`, se dado, é chamado uma vez no close() (ex.: soltar a trava do
+    arquivo no modo concorrente).
+    """
+
+    def __init__(self, store, size: int, block_size: int, locate, on_close=None):
+        self._store = store
+        self._locate = locate
+        self._on_close = on_close
+        self.size = size
+        self.block_size = block_size
+        self._pos = 0
+        self.closed = False
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_SET:
+            pos = offset
+        elif whence == os.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == os.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"whence inválido: {whence}")
+        if pos < 0:
+            raise ValueError("Posição negativa.")
+        self._pos = pos
+        return pos
+
+    def _views(self, n: int):
+        """Gera memoryviews com os próximos n bytes a partir da posição atual, avançando-a."""
+        restante = min(n, self.size - self._pos)
+        while restante > 0:
+            k, deslocamento = divmod(self._pos, self.block_size)
+            bloco, contiguos = self._locate(k)
+            blocos = min(contiguos, (deslocamento + restante + self.block_size - 1) // self.block_size)
+            for view in self._store.iter_views(bloco, blocos):
+                if deslocamento:
+                    view = view[deslocamento:]
+                    deslocamento = 0
+                view = view[:restante]
+                restante -= len(view)
+                self._pos += len(view)
+                yield view
+
+    def read(self, n: int = -1) -> bytes:
+        if self.closed:
+            raise ValueError("Leitura em arquivo fechado.")
+        if n is None or n < 0:
+            n = self.size - self._pos
+        return b''.join(self._views(n))
+
+    def chunks(self, chunk_size: int = None):
+        """Gera o conteúdo restante em pedaços de `chunk_size` bytes (padrão: um bloco)."""
+        chunk_size = chunk_size or self.block_size
+        while True:
+            pedaco = self.read(chunk_size)
+            if not pedaco:
+                return
+            yield pedaco
+
+    def iter_text(self, chunk_size: int = TAMANHO_PEDACO):
+        """Como chunks(), mas decodifica UTF-8 sem partir caracteres entre pedaços."""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        for pedaco in self.chunks(chunk_size):
+            texto = decoder.decode(pedaco)
+            if texto:
+                yield texto
+        resto = decoder.decode(b'', final=True)
+        if resto:
+            yield resto
+
+    def __iter__(self):
+        return self.chunks()
+
+    def close(self):
+        if not self.closed and self._on_close is not None:
+            self._on_close()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
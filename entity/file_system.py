@@ -1,371 +1,1515 @@
 from typing import Dict
+from itertools import accumulate
 from entity.inode import Inode
+from entity.inode_table import InodeTable
+from entity.free_space import FreeSpaceManager, merge_extents, split_extents
+from entity.allocation import LayoutStats
+from entity.defrag import Defragmenter, fragmentation
+from entity.extent_map import ExtentMap
+from entity.file_handle import FileHandle, write_range
+from entity.block_store import BlockStore
+from entity.block_device import BlockDevice, BufferCache, CACHE_LINES
+from entity.disk_image import DiskImage
+from entity.journal import Journal, MODOS_DIARIO, GROUP_SIZE, CHECKPOINT_EVERY
+from entity.bench import measure, quiet, REPETICOES
+from entity.concurrency import Session, Sessions, ThreadSessions, Concurrency, LockedFreeSpace, \
+    LockedBufferCache, LockedInodeTable, LockedLayoutStats, LockedMetrics, locked, exclusive
+from entity.metrics import Metrics, measured
+from entity.workload import payload
+from entity.errors import FileSystemError, NotFoundError, AlreadyExistsError, IsDirectoryError, \
+    NotDirectoryError, DirectoryNotEmptyError, NoSpaceError, InvalidArgumentError, NotMountedError
+import contextlib
+import threading
+import os
+import struct
 import time
-import random
 
 
-def generate_random_data(size):
-    """Gera dados aleatórios do tamanho especificado."""
-    import random
-    import string
-    return ''.join(random.choice(string.ascii_letters) for _ in range(size))
-
 BLOCK_SIZE = 8
 TOTAL_BLOCKS = 1000000
 
 class FileSystem:
-    def __init__(self):
-        self.inodes: Dict[str, Inode] = {}
+    def __init__(self, block_size: int = BLOCK_SIZE, total_blocks: int = TOTAL_BLOCKS,
+                 cache_lines: int = CACHE_LINES, access_us: float = 0.0, seek_us: float = 0.0,
+                 store=None, concurrent: bool = False, allocator='size-class'):
+        self.block_size = block_size
+        self.total_blocks = total_blocks
+        # Modo concorrente: uma sessão (diretório atual) por thread, travas por
+        # inode e alocador, cache e tabela de inodes protegidos por travas.
+        self.concurrent = concurrent
+        self._concurrency = Concurrency() if concurrent else None
+        self.inodes = LockedInodeTable() if concurrent else InodeTable()
         self.root = Inode("/", True)
-        self.inodes[self.root.id] = self.root
+        self.inodes.add(self.root)
+        self._sessions = (ThreadSessions if concurrent else Sessions)(lambda: Session(self.root))
+        # Cache de dentries: caminho absoluto normalizado -> inode. Só guarda
+        # resultados positivos, então basta invalidar em delete e move.
+        self._dentries: Dict[str, Inode] = {"/": self.root}
+        self._dentries_lock = threading.RLock() if concurrent else contextlib.nullcontext()
+        self.next_block_id = 0
+        # Todo acesso a dados passa pelo cache de blocos, que fica na frente
+        # de um dispositivo com latência simulada.
+        if store is None:
+            store = BlockStore(total_blocks, block_size)
+        self.device = BlockDevice(store, access_us, seek_us)
+        self.disk = (LockedBufferCache if concurrent else BufferCache)(self.device, cache_lines)
+        # `allocator` escolhe a política de posicionamento (entity.allocation.POLICIES).
+        self.free_space = (LockedFreeSpace if concurrent else FreeSpaceManager)(total_blocks, allocator)
+        self.layout = (LockedLayoutStats if concurrent else LayoutStats)()
+        # Contagem e histograma de latência de cada operação @measured.
+        self.metrics = (LockedMetrics if concurrent else Metrics)()
+        self._defragmenter = Defragmenter(self.free_space, self._defrag_files, self._defrag_extents, self._relocate)
+        self.image = None
+        self.journal = None
+        # Operações do diário reaplicadas por mount().
+        self.replayed = 0
+        self.checkpoint_every = CHECKPOINT_EVERY
+        self._since_checkpoint = 0
+        if concurrent:
+            self._concurrency.checkpoint = self._checkpoint
+
+    @property
+    def current_dir(self) -> Inode:
+        return self._sessions.current.cwd
+
+    @current_dir.setter
+    def current_dir(self, inode: Inode):
+        self._sessions.current.cwd = inode
+
+    @property
+    def current_path(self) -> str:
+        return self._sessions.current.path
+
+    @current_path.setter
+    def current_path(self, path: str):
+        self._sessions.current.path = path
+
+    @contextlib.contextmanager
+    def session(self, session: Session = None):
+        """
+        Usa `session` (ou uma nova, na raiz) como diretório atual da thread
+        enquanto o bloco durar; devolve a sessão, que pode ser reutilizada.
+        """
+        anterior = self._sessions.current
+        self._sessions.current = session if session is not None else Session(self.root)
+        try:
+            yield self._sessions.current
+        finally:
+            self._sessions.current = anterior
+
+    @classmethod
+    def mount(cls, path: str, block_size: int = BLOCK_SIZE, total_blocks: int = TOTAL_BLOCKS,
+              journal: str = 'off', group_size: int = GROUP_SIZE, checkpoint_every: int = CHECKPOINT_EVERY,
+              **options):
+        """
+        Monta a imagem de disco em `path`, criando-a (com block_size e
+        total_blocks) se ainda não existir. Os dados ficam no arquivo mapeado
+        e os metadados são lidos de uma vez, então o custo é O(metadados).
+
+        Operações registradas em `path`.journal depois do último checkpoint
+        são reaplicadas e um checkpoint é feito em seguida. Com `journal`
+        'per-op' ou 'group' as próximas operações também são registradas, e a
+        cada `checkpoint_every` registros a imagem é sincronizada e o diário
+        esvaziado, para que a reaplicação continue curta.
+        """
+        if journal not in MODOS_DIARIO:
+            raise ValueError(f"Modo de diário inválido: '{journal}'. Use um de {MODOS_DIARIO}.")
+        image = DiskImage(path, b'IN', block_size, total_blocks)
+        fs = cls(image.block_size, image.total_blocks, store=image.store, **options)
+        fs.image = image
+        fs.checkpoint_every = checkpoint_every
+        metadata = image.read_metadata()
+        if metadata:
+            fs._load_metadata(metadata)
+
+        journal_path = path + '.journal'
+        records = [r for r in Journal.read(journal_path) if r[0] > image.lsn]
+        if records:
+            for _, op, args in records:
+                # Uma operação que falhou quando foi registrada falha de novo, sem efeito.
+                with contextlib.suppress(FileSystemError):
+                    fs._replay(op, args)
+            image.lsn = records[-1][0]
+            fs.replayed = len(records)
+        if journal != 'off':
+            fs.journal = Journal(journal_path, journal, group_size)
+            fs.journal.next_lsn = image.lsn + 1
+            fs.disk.before_writeback = fs.journal.commit
+        if records:
+            fs._checkpoint()
+            if fs.journal is None:
+                os.remove(journal_path)
+        return fs
+
+    def _abs(self, name: str) -> str:
+        return self.current_path.rstrip("/") + "/" + name
+
+    def _log(self, op: str, *args):
+        """Registra a operação no diário (se houver) antes de ela alterar o estado."""
+        if self.journal is None:
+            return
+        self.journal.append(op, *args)
+        self._since_checkpoint += 1
+
+    def _maybe_checkpoint(self):
+        if self.journal is not None and self._since_checkpoint >= self.checkpoint_every:
+            if self._concurrency is not None and self._concurrency.nested():
+                # Com outras sessões no meio de operações, o checkpoint espera por elas.
+                self._concurrency.checkpoint_due = True
+                return
+            self._checkpoint()
+
+    def _dir_locks(self, *args):
+        return ((self.current_dir.id, True),)
+
+    def _list_locks(self, *args):
+        return ((self.current_dir.id, False),)
+
+    def _write_locks(self, name: str, *args):
+        """Trava o arquivo `name`; se ele ainda não existe, o diretório atual, onde será criado."""
+        number = self.current_dir.entries.get(name)
+        if number is None:
+            return ((self.current_dir.id, True),)
+        return (self.current_dir.id, False), (number, True)
+
+    def _read_locks(self, name: str, *args):
+        return (self.current_dir.id, False), (self.current_dir.entries.get(name), False)
+
+    def _unlink_locks(self, name: str):
+        return (self.current_dir.id, True), (self.current_dir.entries.get(name), True)
+
+    def _move_locks(self, file_name: str, dest_path: str):
+        parent, name = self._split(file_name)
+        if parent is None:
+            return ()
+        dest_dir = self._resolve_path(dest_path)
+        return ((parent.id, True), (parent.entries.get(name), True),
+                (dest_dir.id if dest_dir is not None else None, True))
+
+    def _replay(self, op: str, args):
+        """Reaplica uma operação do diário; os caminhos registrados são absolutos."""
+        if op == 'move':
+            self.move(*args)
+            return
+        if op == 'relocate':
+            inode = self._lookup(args[0])
+            if inode is not None and not inode.is_dir:
+                write_range(self.disk, self.block_size, inode.data_blocks.locate, args[1], args[2])
+            return
+        parent, name = self._split(args[0])
+        if parent is None:
+            return
+        current = self.current_dir
+        self.current_dir = parent
+        try:
+            getattr(self, op)(name, *args[1:])
+        finally:
+            self.current_dir = current
+
+    def _dump_metadata(self) -> bytes:
+        """Serializa a tabela de inodes (a árvore sai dos parents) e o mapa livre."""
+        partes = [struct.pack('<I', len(self.inodes))]
+        for inode in self.inodes.values():
+            nome = inode.name.encode('utf-8')
+            pai = inode.parent.id if inode.parent is not None else -1
+            partes.append(struct.pack('<IiBQH', inode.id, pai, inode.is_dir, inode.size, len(nome)))
+            partes.append(nome)
+            partes.append(inode.data_blocks.tobytes())
+        partes.append(self.free_space.tobytes())
+        return b''.join(partes)
+
+    def _load_metadata(self, data: bytes):
+        (quantidade,) = struct.unpack_from('<I', data, 0)
+        pos = 4
+        inodes = []
+        pais = []
+        for _ in range(quantidade):
+            numero, pai, is_dir, size, tamanho_nome = struct.unpack_from('<IiBQH', data, pos)
+            pos += 19
+            inode = Inode(data[pos:pos + tamanho_nome].decode('utf-8'), bool(is_dir))
+            pos += tamanho_nome
+            inode.id = numero
+            inode.size = size
+            inode.data_blocks, pos = ExtentMap.frombytes(data, pos)
+            inodes.append(inode)
+            pais.append(pai)
+        self.free_space.load(data, pos)
+        self.inodes.restore(inodes)
+        self.layout.reset()
+        for inode in inodes:
+            self.layout.add(inode.data_blocks.extents())
+        for inode, pai in zip(inodes, pais):
+            if pai >= 0:
+                inode.parent = self.inodes[pai]
+                inode.parent.entries[inode.name] = inode.id
+        self.root = self.inodes[0]
         self.current_dir = self.root
         self.current_path = "/"
-        self.next_block_id = 0
-        self.disk = [''] * TOTAL_BLOCKS
-        self.free_blocks = list(range(TOTAL_BLOCKS))
+        self._dentries = {"/": self.root}
 
-    def create_file(self, name: str):
+    @measured
+    @locked('_dir_locks')
+    def create_file(self, name: str) -> int:
+        """Cria um arquivo vazio no diretório atual e devolve o número do inode."""
+        return self._create_file(name)
+
+    def _create_file(self, name: str) -> int:
+        """create_file sem métricas nem travas, para a criação implícita das escritas."""
         if name in self.current_dir.entries:
-            print(f"Erro: '{name}' já existe neste diretório.")
-            return
+            raise AlreadyExistsError(f"'{name}' já existe neste diretório.")
+        self._log('create_file', self._abs(name))
         inode = Inode(name, False, parent=self.current_dir)
-        self.inodes[inode.id] = inode
+        self.inodes.add(inode)
         self.current_dir.entries[name] = inode.id
-        print(f"Arquivo '{name}' criado com sucesso.")
+        self._maybe_checkpoint()
+        return inode.id
 
-    def create_dir(self, name: str):
+    @measured
+    @locked('_dir_locks')
+    def create_dir(self, name: str) -> int:
+        """Cria um diretório vazio no diretório atual e devolve o número do inode."""
         if name in self.current_dir.entries:
-            print(f"Erro: '{name}' já existe neste diretório.")
-            return
+            raise AlreadyExistsError(f"'{name}' já existe neste diretório.")
+        self._log('create_dir', self._abs(name))
         inode = Inode(name, True, parent=self.current_dir)
-        self.inodes[inode.id] = inode
+        self.inodes.add(inode)
         self.current_dir.entries[name] = inode.id
-        print(f"Diretório '{name}' criado com sucesso.")
+        self._maybe_checkpoint()
+        return inode.id
 
-    def ls(self):
-        if not self.current_dir.entries:
-            print("Diretório vazio.")
-            return
-        for name in self.current_dir.entries:
-            inode = self.inodes[self.current_dir.entries[name]]
-            type_str = "dir" if inode.is_dir else "file"
-            print(f"{type_str}\t{name}")
+    @measured
+    @locked('_list_locks')
+    def ls(self) -> list:
+        """Entradas do diretório atual como pares (nome, é diretório), na ordem de criação."""
+        return [(name, self.inodes[number].is_dir) for name, number in self.current_dir.entries.items()]
 
+    @measured
     def cd(self, path: str):
         if path == ".":
             return
         if path == "..":
+            # Na raiz, ".." é a própria raiz.
             if self.current_dir.parent is not None:
                 self.current_dir = self.current_dir.parent
                 self._update_path()
-            else:
-                print("Já está na raiz.")
             return
         if path not in self.current_dir.entries:
-            print(f"Erro: Diretório '{path}' não encontrado.")
-            return
+            raise NotFoundError(f"Diretório '{path}' não encontrado.")
         inode_id = self.current_dir.entries[path]
         inode = self.inodes[inode_id]
         if not inode.is_dir:
-            print(f"Erro: '{path}' não é um diretório.")
-            return
+            raise NotDirectoryError(f"'{path}' não é um diretório.")
         self.current_dir = inode
         self._update_path()
 
-    def _update_path(self):
-        if self.current_dir == self.root:
-            self.current_path = "/"
-            return
+    def _path_of(self, inode: Inode) -> str:
         path = []
-        current = self.current_dir
-        while current != self.root:
+        current = inode
+        while current is not self.root:
             path.append(current.name)
             current = current.parent
-        self.current_path = "/" + "/".join(reversed(path))
+        return "/" + "/".join(reversed(path))
 
+    def _update_path(self):
+        self.current_path = self._path_of(self.current_dir)
+
+    def _normalize(self, path: str) -> str:
+        """Converte um caminho absoluto ou relativo ao diretório atual em absoluto."""
+        parts = [] if path.startswith("/") else self.current_path.strip("/").split("/")
+        normalized = [p for p in parts if p]
+        for part in path.split("/"):
+            if part in ("", "."):
+                continue
+            if part == "..":
+                if normalized:
+                    normalized.pop()
+                continue
+            normalized.append(part)
+        return "/" + "/".join(normalized)
+
+    def _lookup(self, path: str):
+        """Resolve um caminho para seu inode em O(profundidade), usando o cache de dentries."""
+        abs_path = self._normalize(path)
+        inode = self._dentries.get(abs_path)
+        if inode is not None:
+            return inode
+        # A caminhada e o preenchimento do cache são atômicos em relação a
+        # _invalidate, que só roda depois que a árvore já mudou.
+        with self._dentries_lock:
+            current = self.root
+            prefix = ""
+            for part in abs_path.strip("/").split("/"):
+                if not current.is_dir or part not in current.entries:
+                    return None
+                current = self.inodes[current.entries[part]]
+                prefix += "/" + part
+                self._dentries[prefix] = current
+            return current
+
+    def _invalidate(self, path: str):
+        abs_path = self._normalize(path)
+        with self._dentries_lock:
+            inode = self._dentries.pop(abs_path, None)
+            if inode is not None and inode.is_dir:
+                prefix = abs_path.rstrip("/") + "/"
+                for key in [k for k in self._dentries if k.startswith(prefix)]:
+                    del self._dentries[key]
+
+    def _split(self, path: str):
+        """Separa um caminho em (inode do diretório pai, nome final)."""
+        if "/" not in path.strip("/"):
+            parent = self.root if path.startswith("/") else self.current_dir
+            return parent, path.strip("/")
+        parent_path, name = path.rstrip("/").rsplit("/", 1)
+        return self._resolve_path(parent_path or "/"), name
+
+    @measured
+    @locked('_move_locks')
     def move(self, file_name: str, dest_path: str):
-        if file_name not in self.current_dir.entries:
-            print(f"Erro: Arquivo '{file_name}' não encontrado no diretório atual.")
-            print(f"Diretório atual: {self.current_path}")
-            print(f"Conteúdo do diretório atual: {list(self.current_dir.entries.keys())}")
-            return
+        parent, name = self._split(file_name)
+        if parent is None or name not in parent.entries:
+            raise NotFoundError(f"Arquivo '{file_name}' não encontrado no diretório atual ({self.current_path}).")
 
-        file_inode_id = self.current_dir.entries[file_name]
+        file_inode_id = parent.entries[name]
         file_inode = self.inodes[file_inode_id]
 
         if file_inode.is_dir:
-            print(f"Erro: '{file_name}' é um diretório. Apenas arquivos podem ser movidos.")
-            return
+            raise IsDirectoryError(f"'{file_name}' é um diretório. Apenas arquivos podem ser movidos.")
 
-        dest_dir = None
-        if dest_path == "/":
-            dest_dir = self.root
-        else:
-            for inode in self.inodes.values():
-                if inode.is_dir and inode.name == dest_path:
-                    dest_dir = inode
-                    break
+        dest_dir = self._resolve_path(dest_path)
 
         if dest_dir is None:
-            print(f"Erro: Diretório de destino '{dest_path}' não encontrado.")
-            return
+            raise NotFoundError(f"Diretório de destino '{dest_path}' não encontrado.")
 
-        if file_name in dest_dir.entries:
-            print(f"Erro: Já existe um arquivo ou diretório chamado '{file_name}' em '{dest_path}'.")
-            return
+        if name in dest_dir.entries:
+            raise AlreadyExistsError(f"Já existe um arquivo ou diretório chamado '{name}' em '{dest_path}'.")
 
-        del self.current_dir.entries[file_name]
-        dest_dir.entries[file_name] = file_inode_id
+        old_path = self._path_of(file_inode)
+        self._log('move', old_path, self._path_of(dest_dir))
+        del parent.entries[name]
+        dest_dir.entries[name] = file_inode_id
         file_inode.parent = dest_dir
-        print(f"Arquivo '{file_name}' movido para '{dest_path}' com sucesso.")
+        self._invalidate(old_path)
+        self._maybe_checkpoint()
 
     def _resolve_path(self, path: str):
-        if path == "/":
-            return self.root
-        parts = path.strip("/").split("/")
-        current = self.root if path.startswith("/") else self.current_dir
+        inode = self._lookup(path)
+        if inode is None or not inode.is_dir:
+            return None
+        return inode
 
-        for part in parts:
-            if part == ".":
-                continue
-            elif part == "..":
-                for inode in self.inodes.values():
-                    if inode.is_dir and current.id in inode.entries.values():
-                        current = inode
-                        break
-            else:
-                if part not in current.entries:
-                    return None
-                inode_id = current.entries[part]
-                inode = self.inodes[inode_id]
-                if not inode.is_dir:
-                    return None
-                current = inode
-        return current
+    def _free_extents(self, extents):
+        for inicio, tamanho in extents:
+            self.disk.clear_extent(inicio, tamanho)
+        self.free_space.free_extents(extents)
+
+    def _iter_views(self, inode: Inode):
+        restante = inode.size
+        for inicio, tamanho in inode.data_blocks.extents():
+            if restante <= 0:
+                break
+            for view in self.disk.iter_views(inicio, tamanho):
+                if restante <= 0:
+                    break
+                view = view[:restante]
+                restante -= len(view)
+                yield view
 
-    def write_file(self, name: str, data: str):
+    def iter_file(self, name: str):
+        """Gera o conteúdo do arquivo como memoryviews sem cópia, uma por extent."""
         if name not in self.current_dir.entries:
-            self.create_file(name)
+            raise NotFoundError(f"Arquivo '{name}' não encontrado.")
+        inode = self.inodes[self.current_dir.entries[name]]
+        if inode.is_dir:
+            raise IsDirectoryError(f"'{name}' é um diretório.")
+        yield from self._iter_views(inode)
+
+    def _open_locks(self, path: str):
+        parent, name = self._split(path)
+        if parent is None:
+            return ()
+        return (parent.id, False), (parent.entries.get(name), False)
+
+    @measured
+    def open(self, path: str):
+        """
+        Abre um arquivo para leitura em streaming e devolve um FileHandle. No
+        modo concorrente o handle segura a trava compartilhada do arquivo até
+        ser fechado: escritas, remoções e movimentos dele esperam (inclusive
+        os da própria thread, que não deve escrever num arquivo que mantém
+        aberto) e a leitura nunca vê uma escrita pela metade. Lotes
+        (write_many/delete_many) não esperam por handles abertos.
+        """
+        return self._open(path)
+
+    def _open(self, path: str):
+        """open sem métricas, para read_file não contar duas operações."""
+        c = self._concurrency
+        locks = []
+        if c is not None and not c.nested():
+            locks = c.acquire(lambda: self._open_locks(path))
+        parent, name = self._split(path)
+        if locks:
+            # A trava do diretório só serve para não abrir um arquivo no meio
+            # da criação; o handle fica só com a do arquivo.
+            dir_lock = c.lock(parent.id)
+            c.release([lock for lock in locks if lock[0] is dir_lock])
+            locks = [lock for lock in locks if lock[0] is not dir_lock]
+        if parent is None or name not in parent.entries:
+            if locks:
+                c.release(locks)
+            raise NotFoundError(f"Arquivo '{path}' não encontrado.")
+        inode = self.inodes[parent.entries[name]]
+        if inode.is_dir:
+            if locks:
+                c.release(locks)
+            raise IsDirectoryError(f"'{path}' é um diretório.")
+        on_close = (lambda: c.release(locks)) if locks else None
+        return FileHandle(self.disk, inode.size, self.block_size, inode.data_blocks.locate, on_close)
+
+    @measured
+    @locked('_write_locks')
+    def write_file(self, name: str, data: str) -> int:
+        """
+        Substitui o conteúdo do arquivo (criado se não existir) por `data` e
+        devolve o novo tamanho em bytes. Sem espaço, o arquivo fica como estava.
+        """
+        if name not in self.current_dir.entries:
+            self._create_file(name)
 
         inode_id = self.current_dir.entries[name]
         inode = self.inodes[inode_id]
+        if inode.is_dir:
+            raise IsDirectoryError(f"'{name}' é um diretório.")
+
+        # O conteúdo é gravado em UTF-8: tamanhos e blocos contam bytes, não caracteres.
+        encoded = data.encode('utf-8')
+        num_blocks = (len(encoded) + self.block_size - 1) // self.block_size
+        with self.free_space.transaction():
+            # Os blocos atuais do arquivo voltam para o alocador antes da alocação.
+            if self.free_space.free_count + len(inode.data_blocks) < num_blocks:
+                raise NoSpaceError("Espaço insuficiente em disco.")
+
+            self._log('write_file', self._abs(name), data)
+            antigos = inode.data_blocks.extents()
+            self.layout.remove(antigos)
+            self._free_extents(antigos)
+            extents = self.free_space.allocate(num_blocks)
 
-        num_blocks = (len(data) + BLOCK_SIZE - 1) // BLOCK_SIZE
-        if len(self.free_blocks) < num_blocks:
-            print("Erro: Espaço insuficiente em disco.")
-            inode.size = 0
-            inode.data_blocks = []
+        data = encoded
+        deslocamento = 0
+        for inicio, tamanho in extents:
+            fim = deslocamento + tamanho * self.block_size
+            self.disk.write_extent(inicio, tamanho, memoryview(data)[deslocamento:fim])
+            deslocamento = fim
+
+        inode.size = len(data)
+        inode.data_blocks = ExtentMap(extents)
+        self.layout.add(extents)
+        self._maybe_checkpoint()
+        return inode.size
+
+    def _grow(self, inode: Inode, num_blocks: int):
+        """Acrescenta blocos ao fim do arquivo, tentando continuar o último extent."""
+        if num_blocks <= 0:
             return
+        mapa = inode.data_blocks
+        hint = mapa.block_at(-1) + 1 if len(mapa) else None
+        novos = self.free_space.allocate(num_blocks, hint=hint)
+        self.layout.grow(hint - 1 if hint is not None else None, novos)
+        for inicio, tamanho in novos:
+            mapa.append(inicio, tamanho)
 
-        for b in inode.data_blocks:
-            self.disk[b] = ''
-            self.free_blocks.append(b)
+    def _zero_tail(self, inode: Inode):
+        """Zera os bytes do último bloco que ficam além de inode.size."""
+        resto = inode.size % self.block_size
+        if resto:
+            ultimo = inode.data_blocks.block_at(-1)
+            self.disk.write_at(ultimo, resto, bytes(self.block_size - resto))
 
-        random.shuffle(self.free_blocks)
-        blocos_alocados = [self.free_blocks.pop(0) for _ in range(num_blocks)]
+    @measured
+    @locked('_write_locks')
+    def pwrite(self, name: str, offset: int, data: str) -> int:
+        """
+        Grava `data` a partir do byte `offset` sem realocar o arquivo: só os
+        blocos afetados são escritos e, se o arquivo crescer, os novos blocos
+        são anexados ao fim. Um `offset` além do fim deixa um trecho de zeros.
+        Devolve quantos bytes foram gravados.
+        """
+        return self._pwrite(name, offset, data)
 
-        for i, b in enumerate(blocos_alocados):
-            inicio = i * BLOCK_SIZE
-            fim = inicio + BLOCK_SIZE
-            self.disk[b] = data[inicio:fim]
+    def _pwrite(self, name: str, offset: int, data: str) -> int:
+        """pwrite sem métricas nem travas, para append não contar duas operações."""
+        if offset < 0:
+            raise InvalidArgumentError("Offset negativo.")
+        if name not in self.current_dir.entries:
+            self._create_file(name)
 
-        inode.size = len(data)
-        inode.data_blocks = blocos_alocados
+        inode = self.inodes[self.current_dir.entries[name]]
+        if inode.is_dir:
+            raise IsDirectoryError(f"'{name}' é um diretório.")
 
-        print(f"Dados escritos em '{name}' ({inode.size} bytes) nos blocos {blocos_alocados}")
+        encoded = data.encode('utf-8')
+        fim = offset + len(encoded)
+        faltando = (fim + self.block_size - 1) // self.block_size - len(inode.data_blocks)
+        with self.free_space.transaction():
+            if self.free_space.free_count < faltando:
+                raise NoSpaceError("Espaço insuficiente em disco.")
+            self._log('pwrite', self._abs(name), offset, data)
+            self._grow(inode, faltando)
+        data = encoded
+        write_range(self.disk, self.block_size, inode.data_blocks.locate, offset, data)
+        inode.size = max(inode.size, fim)
+        self._maybe_checkpoint()
+        return len(data)
 
-    def read_file(self, name: str):
+    @measured
+    @locked('_write_locks')
+    def append(self, name: str, data: str) -> int:
+        """Anexa `data` ao fim do arquivo; o custo depende só do tamanho de `data`. Devolve os bytes gravados."""
         if name not in self.current_dir.entries:
-            print(f"Erro: Arquivo '{name}' não encontrado.")
-            return
+            self._create_file(name)
+        inode = self.inodes[self.current_dir.entries[name]]
+        return self._pwrite(name, inode.size, data)
+
+    @measured
+    @locked('_write_locks')
+    def truncate(self, name: str, size: int):
+        """Ajusta o tamanho do arquivo, liberando os blocos do fim ou estendendo com zeros."""
+        if size < 0:
+            raise InvalidArgumentError("Tamanho negativo.")
+        if name not in self.current_dir.entries:
+            raise NotFoundError(f"Arquivo '{name}' não encontrado.")
+        inode = self.inodes[self.current_dir.entries[name]]
+        if inode.is_dir:
+            raise IsDirectoryError(f"'{name}' é um diretório.")
+
+        num_blocks = (size + self.block_size - 1) // self.block_size
+        if num_blocks > len(inode.data_blocks):
+            with self.free_space.transaction():
+                if self.free_space.free_count < num_blocks - len(inode.data_blocks):
+                    raise NoSpaceError("Espaço insuficiente em disco.")
+                self._log('truncate', self._abs(name), size)
+                self._grow(inode, num_blocks - len(inode.data_blocks))
+        else:
+            self._log('truncate', self._abs(name), size)
+            self.layout.remove(inode.data_blocks.extents())
+            self._free_extents(inode.data_blocks.truncate(num_blocks))
+            self.layout.add(inode.data_blocks.extents())
+        if size < inode.size:
+            inode.size = size
+            self._zero_tail(inode)
+        inode.size = size
+        self._maybe_checkpoint()
+
+    @measured
+    @locked('_read_locks')
+    def read_file(self, name: str) -> str:
+        """Conteúdo inteiro do arquivo como texto (para ler aos poucos, use open)."""
+        if name not in self.current_dir.entries:
+            raise NotFoundError(f"Arquivo '{name}' não encontrado.")
 
         inode_id = self.current_dir.entries[name]
         inode = self.inodes[inode_id]
 
         if inode.is_dir:
-            print(f"Erro: '{name}' é um diretório.")
-            return
+            raise IsDirectoryError(f"'{name}' é um diretório.")
 
-        conteudo = ''.join([self.disk[b] for b in inode.data_blocks])
-        print(f"Conteúdo de '{name}' ({inode.size} bytes):")
-        print(conteudo[:inode.size])
+        with self._open(name) as handle:
+            return ''.join(handle.iter_text())
 
+    @measured
+    @locked('_unlink_locks')
     def delete(self, name: str):
         if name not in self.current_dir.entries:
-            print(f"Erro: '{name}' não existe no diretório atual.")
-            return
+            raise NotFoundError(f"'{name}' não existe no diretório atual.")
 
         inode_id = self.current_dir.entries[name]
         inode = self.inodes[inode_id]
 
         if inode.is_dir:
             if inode.entries:
-                print(f"Erro: Diretório '{name}' não está vazio.")
-                return
-            else:
-                del self.inodes[inode_id]
-                del self.current_dir.entries[name]
-                print(f"Diretório '{name}' excluído com sucesso.")
-        else:
-            for b in inode.data_blocks:
-                self.disk[b] = ''
-                self.free_blocks.append(b)
+                raise DirectoryNotEmptyError(f"Diretório '{name}' não está vazio.")
+            self._log('delete', self._abs(name))
+            del self.current_dir.entries[name]
+            self._invalidate(self._path_of(inode))
             del self.inodes[inode_id]
+        else:
+            self._log('delete', self._abs(name))
             del self.current_dir.entries[name]
-            print(f"Arquivo '{name}' excluído com sucesso.")
-            
-    def detalhes(self, nome: str):
+            self._invalidate(self._path_of(inode))
+            extents = inode.data_blocks.extents()
+            self.layout.remove(extents)
+            self._free_extents(extents)
+            del self.inodes[inode_id]
+        self._maybe_checkpoint()
+
+    def _make_dirs(self, path: str):
+        """Devolve o diretório de `path` (absoluto), criando os que faltarem; None se um dos nomes for arquivo."""
+        current = self._lookup(path)
+        if current is not None:
+            return current if current.is_dir else None
+        current = self.root
+        prefix = ""
+        for part in path.strip("/").split("/"):
+            prefix += "/" + part
+            if part in current.entries:
+                current = self.inodes[current.entries[part]]
+                if not current.is_dir:
+                    return None
+                continue
+            self._log('create_dir', prefix)
+            inode = Inode(part, True, parent=current)
+            self.inodes.add(inode)
+            current.entries[part] = inode.id
+            current = inode
+        return current
+
+    @measured
+    @exclusive
+    def write_many(self, items) -> dict:
+        """
+        Grava vários arquivos de uma vez a partir de pares (caminho, dados).
+        Arquivos existentes são sobrescritos e diretórios que faltarem são
+        criados. Todos os blocos do lote saem de uma única alocação, os dados
+        vão para o disco extent a extent a partir de um buffer único e cada
+        diretório recebe as novas entradas de uma vez. Se não houver espaço
+        para o lote inteiro, nada é gravado.
+
+        Returns:
+            {'files', 'bytes', 'blocks', 'extents', 'dirs_created', 'errors': [(caminho, mensagem)]}
+        """
+        result = {'files': 0, 'bytes': 0, 'blocks': 0, 'extents': 0, 'dirs_created': 0, 'errors': []}
+        plan: Dict[str, Dict[str, str]] = {}
+        for path, data in items:
+            abs_path = self._normalize(path)
+            if abs_path == "/":
+                result['errors'].append((path, "Caminho inválido."))
+                continue
+            parent_path, name = abs_path.rsplit("/", 1)
+            plan.setdefault(parent_path or "/", {})[name] = data
+
+        groups: Dict[str, list] = {}
+        needed = 0
+        freed = 0
+        for parent_path, names in plan.items():
+            parent = self._lookup(parent_path)
+            entries = parent.entries if parent is not None and parent.is_dir else {}
+            group = groups[parent_path] = []
+            for name, data in names.items():
+                existing = self.inodes[entries[name]] if name in entries else None
+                if existing is not None:
+                    if existing.is_dir:
+                        result['errors'].append((parent_path.rstrip("/") + "/" + name, "É um diretório."))
+                        continue
+                    freed += len(existing.data_blocks)
+                encoded = data.encode('utf-8')
+                needed += (len(encoded) + self.block_size - 1) // self.block_size
+                group.append((name, data, encoded, existing))
+        if needed > self.free_space.free_count + freed:
+            result['errors'].append(("*", "Espaço insuficiente em disco."))
+            return result
+
+        files = []
+        old_extents = []
+        for parent_path, group in groups.items():
+            before = len(self.inodes)
+            parent = self._make_dirs(parent_path)
+            result['dirs_created'] += len(self.inodes) - before
+            if parent is None:
+                result['errors'].extend((parent_path.rstrip("/") + "/" + name, "Diretório pai inválido.")
+                                        for name, _, _, _ in group)
+                continue
+            new_entries = {}
+            for name, data, encoded, inode in group:
+                if inode is None and name in parent.entries:
+                    # Criado por _make_dirs neste mesmo lote.
+                    result['errors'].append((parent_path.rstrip("/") + "/" + name, "É um diretório."))
+                    continue
+                self._log('write_file', parent_path.rstrip("/") + "/" + name, data)
+                if inode is None:
+                    inode = Inode(name, False, parent=parent)
+                    self.inodes.add(inode)
+                    new_entries[name] = inode.id
+                else:
+                    antigos = inode.data_blocks.extents()
+                    self.layout.remove(antigos)
+                    old_extents.extend(antigos)
+                files.append((inode, encoded))
+            parent.entries.update(new_entries)
+        self._free_extents(merge_extents(old_extents))
+
+        counts = [(len(encoded) + self.block_size - 1) // self.block_size for _, encoded in files]
+        extents = self.free_space.allocate(sum(counts)) if sum(counts) else []
+        buffer = bytearray(sum(counts) * self.block_size)
+        offset = 0
+        for (inode, encoded), pieces, count in zip(files, split_extents(extents, counts), counts):
+            buffer[offset:offset + len(encoded)] = encoded
+            offset += count * self.block_size
+            inode.size = len(encoded)
+            inode.data_blocks = ExtentMap(pieces)
+            self.layout.add(pieces)
+            result['bytes'] += len(encoded)
+        view = memoryview(buffer)
+        offset = 0
+        for start, length in extents:
+            self.disk.write_extent(start, length, view[offset:offset + length * self.block_size])
+            offset += length * self.block_size
+
+        result['files'] = len(files)
+        result['blocks'] = sum(counts)
+        result['extents'] = len(extents)
+        self._maybe_checkpoint()
+        return result
+
+    @measured
+    @exclusive
+    def delete_many(self, paths) -> dict:
+        """
+        Remove vários arquivos (ou diretórios que fiquem vazios no próprio
+        lote) de uma vez: os blocos de todos são fundidos e devolvidos ao
+        espaço livre numa única passada.
+
+        Returns:
+            {'deleted', 'blocks_freed', 'errors': [(caminho, mensagem)]}
+        """
+        result = {'deleted': 0, 'blocks_freed': 0, 'errors': []}
+        plan: Dict[str, Dict[str, None]] = {}
+        for path in paths:
+            abs_path = self._normalize(path)
+            parent_path, name = abs_path.rsplit("/", 1)
+            plan.setdefault(parent_path or "/", {})[name] = None
+
+        victims = {}
+        # Os diretórios mais profundos primeiro, para que um diretório possa sair junto com o conteúdo.
+        for parent_path in sorted(plan, key=lambda p: p.count("/") if p != "/" else 0, reverse=True):
+            parent = self._lookup(parent_path)
+            entries = parent.entries if parent is not None and parent.is_dir else {}
+            for name in plan[parent_path]:
+                abs_path = parent_path.rstrip("/") + "/" + name
+                if name not in entries:
+                    result['errors'].append((abs_path if name else "/", "Não encontrado."))
+                    continue
+                inode = self.inodes[entries[name]]
+                if inode is self.current_dir:
+                    result['errors'].append((abs_path, "É o diretório atual."))
+                    continue
+                if inode.is_dir and any(i not in victims for i in inode.entries.values()):
+                    result['errors'].append((abs_path, "Diretório não está vazio."))
+                    continue
+                victims[inode.id] = (abs_path, inode)
+
+        extents = []
+        for abs_path, inode in victims.values():
+            self._log('delete', abs_path)
+            if inode.is_dir:
+                self._invalidate(abs_path)
+            else:
+                self._dentries.pop(abs_path, None)
+                self.layout.remove(inode.data_blocks.extents())
+                extents.extend(inode.data_blocks.extents())
+            del inode.parent.entries[inode.name]
+            del self.inodes[inode.id]
+        extents = merge_extents(extents)
+        self._free_extents(extents)
+
+        result['deleted'] = len(victims)
+        result['blocks_freed'] = sum(length for _, length in extents)
+        self._maybe_checkpoint()
+        return result
+
+    @measured
+    @locked('_list_locks')
+    def detalhes(self, nome: str) -> dict:
+        """
+        Returns:
+            {'id', 'name', 'is_dir'} mais 'entries' (nomes) num diretório ou
+            'size' e 'extents' num arquivo
+        """
         if nome not in self.current_dir.entries:
-            print(f"Erro: '{nome}' não encontrado.")
-            return
+            raise NotFoundError(f"'{nome}' não encontrado.")
 
         inode_id = self.current_dir.entries[nome]
         inode = self.inodes[inode_id]
 
-        print(f"ID: {inode.id}")
-        print(f"Nome: {inode.name}")
-        print(f"Diretório: {'Sim' if inode.is_dir else 'Não'}")
-
+        result = {'id': inode.id, 'name': inode.name, 'is_dir': inode.is_dir}
         if inode.is_dir:
-            print(f"Entradas: {list(inode.entries.keys())}")
+            result['entries'] = list(inode.entries.keys())
         else:
-            print(f"Tamanho: {inode.size} bytes")
-            print(f"Blocos alocados: {inode.data_blocks}")
-
-    def status(self):
-        total_blocos = TOTAL_BLOCKS
-        livres = len(self.free_blocks)
-        usados = total_blocos - livres
-
-        arquivos = sum(1 for i in self.inodes.values() if not i.is_dir)
-        diretorios = sum(1 for i in self.inodes.values() if i.is_dir)
-
-        print("\n=== STATUS DO SISTEMA DE ARQUIVOS (i-nodes) ===")
-        print(f"Blocos totais: {total_blocos}")
-        print(f"Blocos usados: {usados}")
-        print(f"Blocos livres: {livres}")
-        print(f"Arquivos: {arquivos}")
-        print(f"Diretórios: {diretorios}")
-        print("Uso por arquivo:")
+            result.update(size=inode.size, extents=inode.data_blocks.extents())
+        return result
+
+    def _defrag_files(self):
+        return [inode.id for inode in self.inodes.values() if not inode.is_dir]
+
+    def _defrag_extents(self, number: int):
+        inode = self.inodes.get(number)
+        if inode is None or inode.is_dir:
+            return None
+        if self._concurrency is not None and not self._concurrency.idle(number):
+            return None
+        return inode.data_blocks.extents()
+
+    def _relocate(self, number: int, extents: list, destinos: list):
+        """Move cada extent i do arquivo para começar em destinos[i], copiando os blocos pelo cache."""
+        inode = self.inodes[number]
+        movidos = [(extent, destino) for extent, destino in zip(extents, destinos) if extent[0] != destino]
+        dados = [self.disk.read_extent(inicio, tamanho) for (inicio, tamanho), _ in movidos]
+        if self.journal is not None:
+            # A imagem só conhece os extents do último checkpoint, e os antigos
+            # são zerados ou reaproveitados antes do próximo: cada registro leva
+            # os bytes movidos, que a reaplicação regrava no mesmo deslocamento
+            # do arquivo, onde quer que os blocos estejam.
+            caminho = self._path_of(inode)
+            posicoes = accumulate((tamanho for _, tamanho in extents), initial=0)
+            deslocamentos = [posicao * self.block_size for (inicio, _), destino, posicao
+                             in zip(extents, destinos, posicoes) if inicio != destino]
+            for deslocamento, payload in zip(deslocamentos, dados):
+                trecho = bytes(payload[:max(0, inode.size - deslocamento)])
+                if trecho:
+                    self._log('relocate', caminho, deslocamento, trecho)
+        self.layout.remove(extents)
+        self._free_extents([extent for extent, _ in movidos])
+        for ((_, tamanho), destino), payload in zip(movidos, dados):
+            self.free_space.reserve(destino, tamanho)
+            self.disk.write_extent(destino, tamanho, payload)
+        novos = [(destino, tamanho) for (_, tamanho), destino in zip(extents, destinos)]
+        inode.data_blocks = ExtentMap(novos)
+        self.layout.add(novos)
+
+    @measured
+    @exclusive
+    def defrag(self, max_blocks: int = None, max_ms: float = None) -> dict:
+        """
+        Desfragmenta aos poucos (entity.defrag.Defragmenter): copia blocos até
+        `max_blocks` blocos ou `max_ms` ms e, na chamada seguinte, continua de
+        onde parou. Sem orçamento vai até o fim: cada arquivo num extent só,
+        se couber, e o espaço livre num trecho só no fim do disco. Arquivos
+        abertos no modo concorrente ficam onde estão. Com uma imagem montada,
+        a chamada termina com um checkpoint, que grava a nova disposição; com
+        diário, cada movimento antes disso é registrado com os bytes movidos.
+
+        Returns:
+            {'moves', 'moved_blocks', 'seconds', 'done', 'before', 'after'},
+            com a fragmentation() de antes e de depois
+        """
+        antes = fragmentation(self.layout, self.free_space)
+        result = self._defragmenter.run(max_blocks, max_ms)
+        if result['moves'] and self.image is not None:
+            self._checkpoint()
+        result.update(before=antes, after=fragmentation(self.layout, self.free_space))
+        return result
+
+    def _checkpoint(self) -> int:
+        """
+        Confirma o diário, grava os blocos sujos e os metadados na imagem com o
+        lsn do último registro e então esvazia o diário. Devolve o número de
+        páginas de dados gravadas.
+        """
+        lsn = None
+        if self.journal is not None:
+            self.journal.commit()
+            lsn = self.journal.next_lsn - 1
+        self.disk.flush()
+        paginas = self.image.sync(self._dump_metadata(), lsn)
+        if self.journal is not None:
+            self.journal.reset()
+            self._since_checkpoint = 0
+        return paginas
+
+    @measured
+    @exclusive
+    def sync(self):
+        """
+        Grava no dispositivo os blocos sujos do cache e, com uma imagem
+        montada, faz um checkpoint: páginas sujas e metadados vão para o
+        arquivo. Devolve as páginas de dados gravadas na imagem (None sem imagem).
+        """
+        if self.image is None:
+            self.disk.flush()
+            return None
+        return self._checkpoint()
+
+    @exclusive
+    def unmount(self):
+        """
+        Sincroniza e fecha a imagem montada (e o diário). O cache é esvaziado,
+        então ler ou gravar dados depois disso levanta NotMountedError.
+        """
+        if self.image is None:
+            raise NotMountedError("Nenhuma imagem montada.")
+        self.sync()
+        self.disk.drop()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+            self.disk.before_writeback = None
+        self.image.close()
+        self.image = None
+
+    def status(self) -> dict:
+        """
+        Retrato do sistema (entity.report.format_status o mostra).
+
+        Returns:
+            {'backend', 'total_blocks', 'used_blocks', 'free_blocks', 'files',
+            'dirs', 'materialized_bytes', 'policy', 'layout': fragmentation(),
+            'cache': estatísticas do cache e do dispositivo, 'journal': modo e
+            estatísticas do diário ou None, 'usage': [(nome, extents, tamanho)]}
+        """
+        livres = self.free_space.free_count
+        arquivos = [i for i in self.inodes.values() if not i.is_dir]
+        diario = dict(self.journal.stats(), mode=self.journal.mode) if self.journal is not None else None
+        return {
+            'backend': 'i-nodes',
+            'total_blocks': self.total_blocks,
+            'used_blocks': self.total_blocks - livres,
+            'free_blocks': livres,
+            'files': len(arquivos),
+            'dirs': len(self.inodes) - len(arquivos),
+            'materialized_bytes': self.disk.materialized_bytes(),
+            'policy': self.free_space.policy.name,
+            'layout': fragmentation(self.layout, self.free_space),
+            'cache': self.disk.stats(),
+            'journal': diario,
+            'usage': [(i.name, i.data_blocks.extents(), i.size) for i in arquivos],
+        }
+
+    def metrics_snapshot(self) -> dict:
+        """
+        Métricas desde a criação: {'ops': Metrics.snapshot(), 'io': contadores
+        do cache e do dispositivo, 'allocator': contadores do mapa livre}.
+        """
+        return {'ops': self.metrics.snapshot(), 'io': self.disk.stats(), 'allocator': self.free_space.stats()}
+
+    @exclusive
+    def check_invariants(self) -> list:
+        """
+        Confere a consistência do sistema e devolve a lista de problemas (vazia
+        se estiver tudo certo): nenhum bloco pertence a dois arquivos, blocos
+        de arquivos não estão no mapa livre, usados + livres fecham o total e
+        cada entrada de diretório aponta para um inode que a reconhece.
+        """
+        problems = []
+        extents = []
         for inode in self.inodes.values():
-            if not inode.is_dir:
-                print(f"  - {inode.name}: {inode.data_blocks} ({inode.size} bytes)")
+            if inode.parent is not None:
+                if inode.parent.entries.get(inode.name) != inode.id:
+                    problems.append(f"Inode {inode.id} ('{inode.name}') fora do diretório pai.")
+            if inode.is_dir:
+                for name, number in inode.entries.items():
+                    if number not in self.inodes or self.inodes[number].parent is not inode:
+                        problems.append(f"Entrada '{name}' do inode {inode.id} aponta para o inode {number}.")
+                continue
+            if inode.size > len(inode.data_blocks) * self.block_size:
+                problems.append(f"Arquivo {inode.id} ('{inode.name}') maior que os seus blocos.")
+            for start, length in inode.data_blocks.extents():
+                extents.append((start, length, inode.id))
+                if self.free_space.is_free(start) or self.free_space.is_free(start + length - 1):
+                    problems.append(f"Extent ({start}, {length}) do arquivo {inode.id} está no mapa livre.")
+        extents.sort()
+        for (start, length, owner), (next_start, _, other) in zip(extents, extents[1:]):
+            if start + length > next_start:
+                problems.append(f"Bloco {next_start} pertence aos arquivos {owner} e {other}.")
+        used = sum(length for _, length, _ in extents)
+        if used != self.total_blocks - self.free_space.free_count:
+            problems.append(f"{used} blocos em arquivos, mas {self.total_blocks - self.free_space.free_count} "
+                            f"marcados como usados.")
+        return problems
+
 
+def benchmark_inode_access(fs: FileSystem, file_name: str, k: int, cold: bool = False) -> dict:
+    """
+    Mede o acesso ao bloco k de um arquivo via inode. Com `cold`, o cache de
+    blocos é esvaziado antes de cada acesso (um acesso por amostra).
 
-def benchmark_inode_access(fs: FileSystem, file_name: str, k: int) -> float:
-    """Mede o tempo para acessar o bloco k de um arquivo via inode."""
+    Returns:
+        Resultado de bench.measure (NotFoundError ou InvalidArgumentError se o
+        arquivo ou o bloco não existir)
+    """
     if file_name not in fs.current_dir.entries:
-        print(f"Arquivo '{file_name}' não encontrado.")
-        return -1
+        raise NotFoundError(f"Arquivo '{file_name}' não encontrado.")
 
     inode_id = fs.current_dir.entries[file_name]
     inode = fs.inodes[inode_id]
 
     if k >= len(inode.data_blocks):
-        print(f"Bloco {k} fora do intervalo do arquivo.")
-        return -1
-
-    start = time.perf_counter()
-    _ = fs.disk[inode.data_blocks[k]]
-    end = time.perf_counter()
+        raise InvalidArgumentError(f"Bloco {k} fora do intervalo do arquivo.")
 
-    return (end - start)*1000
+    mapa = inode.data_blocks
+    if cold:
+        return measure(lambda _: fs.disk.view_block(mapa[k]), setup=lambda n: [fs.disk.drop()], inner=1)
+    return measure(lambda: fs.disk.view_block(mapa[k]))
 
-import time
-
-def benchmark_move_inode(fs: FileSystem, file_name: str, dest_path: str) -> float:
+def benchmark_move_inode(fs: FileSystem, file_name: str, dest_path: str, repeat: int = REPETICOES) -> dict:
     """
-    Mede o tempo para mover um arquivo no sistema de arquivos com i-nodes.
-    Retorna o tempo em milissegundos.
+    Mede FileSystem.move de um arquivo do diretório atual para `dest_path`
+    (resolução e validação incluídas). Cada chamada medida move o arquivo
+    para o outro lado, e no fim ele fica em `dest_path`.
+
+    Returns:
+        Resultado de bench.measure (tempo por move); um move inválido levanta
+        o mesmo erro que FileSystem.move
     """
     if file_name not in fs.current_dir.entries:
-        print(f"Erro: Arquivo '{file_name}' não encontrado no diretório atual.")
-        return -1
+        raise NotFoundError(f"Arquivo '{file_name}' não encontrado no diretório atual.")
 
     inode_id = fs.current_dir.entries[file_name]
     inode = fs.inodes[inode_id]
 
     if inode.is_dir:
-        print(f"Erro: '{file_name}' é um diretório.")
-        return -1
+        raise IsDirectoryError(f"'{file_name}' é um diretório.")
 
-    if dest_path == "/":
-        dest_dir = fs.root
-    else:
-        dest_dir = fs._resolve_path(dest_path)
-        if dest_dir is None or not dest_dir.is_dir:
-            print(f"Erro: Diretório de destino '{dest_path}' não encontrado ou não é um diretório.")
-            return -1
+    dest_dir = fs._resolve_path(dest_path)
+    if dest_dir is None:
+        raise NotFoundError(f"Diretório de destino '{dest_path}' não encontrado ou não é um diretório.")
 
     if file_name in dest_dir.entries:
-        print(f"Erro: Já existe um arquivo chamado '{file_name}' em '{dest_path}'.")
-        return -1
+        raise AlreadyExistsError(f"Já existe um arquivo chamado '{file_name}' em '{dest_path}'.")
 
-    start = time.perf_counter()
-    del fs.current_dir.entries[file_name]
-    dest_dir.entries[file_name] = inode_id
-    end = time.perf_counter()
+    origem, destino = fs.current_path, fs._path_of(dest_dir)
+    lados = [origem, destino]
+
+    def mover():
+        fs.move(lados[0].rstrip("/") + "/" + file_name, lados[1])
+        lados.reverse()
+
+    result = measure(mover, repeat=repeat)
+    if lados[0] == origem:
+        with quiet():
+            mover()
+    return result
+
+def benchmark_move_scaling(file_counts=(100, 1000, 10000, 100000), repetitions: int = REPETICOES) -> dict:
+    """
+    Mede a latência de FileSystem.move (resolução do destino incluída) conforme
+    o número de arquivos cresce. Com o cache de dentries a latência deve ficar
+    estável, pois a resolução depende da profundidade do caminho e não do total
+    de inodes.
+
+    Returns:
+        Dicionário {quantidade de arquivos: resultado de bench.measure por move}
+    """
+    results = {}
+    for count in file_counts:
+        fs = FileSystem()
+        with quiet():
+            fs.create_dir("dados")
+            fs.cd("dados")
+            for i in range(count):
+                fs.create_file(f"f{i}")
+            fs.cd("..")
+            fs.create_dir("destino")
+            fs.cd("destino")
+            fs.create_dir("sub")
+            fs.cd("..")
+            fs.create_file("alvo.txt")
+        results[count] = benchmark_move_inode(fs, "alvo.txt", "destino/sub", repetitions)
+    return results
 
-    return (end - start) * 1000
+def benchmark_inode_delete(fs: FileSystem, file_name: str, repeat: int = REPETICOES) -> dict:
+    """
+    Mede o tempo para excluir um arquivo usando a estratégia de inode. As
+    exclusões medidas são de cópias do mesmo tamanho, criadas fora da medição;
+    no fim o próprio arquivo é excluído.
 
-def benchmark_inode_delete(fs: FileSystem, file_name: str) -> float:
-    """Mede o tempo para excluir um arquivo usando a estratégia de inode."""
+    Returns:
+        Resultado de bench.measure por exclusão (NotFoundError se o arquivo não existir)
+    """
     if file_name not in fs.current_dir.entries:
-        print(f"Arquivo '{file_name}' não encontrado.")
-        return -1
+        raise NotFoundError(f"Arquivo '{file_name}' não encontrado.")
 
-    start = time.perf_counter()
-    fs.delete(file_name)
-    end = time.perf_counter()
+    dados = "x" * fs.inodes[fs.current_dir.entries[file_name]].size
 
-    return (end - start) * 1000
+    def copias(n: int) -> list:
+        nomes = [f"{file_name}.{i}" for i in range(n)]
+        for nome in nomes:
+            fs.write_file(nome, dados)
+        return nomes
+
+    result = measure(fs.delete, setup=copias, repeat=repeat)
+    with quiet():
+        fs.delete(file_name)
+    return result
 
-def benchmark_write_file(fs: FileSystem, file_name: str, data_size: int, repetitions: int = 10) -> dict:
+def benchmark_write_file(fs: FileSystem, file_name: str, data_size: int, repetitions: int = REPETICOES) -> dict:
     """
-    Mede o tempo médio de escrita para um arquivo de determinado tamanho.
-    
+    Mede o tempo de escrita de um arquivo novo de determinado tamanho.
+
     Args:
         fs: Instância do FileSystem
-        file_name: Nome do arquivo a ser escrito
+        file_name: Prefixo dos arquivos escritos (cada escrita medida cria um)
         data_size: Tamanho dos dados a serem escritos (em bytes)
-        repetitions: Número de repetições para cálculo da média
-    
+        repetitions: Número de amostras
+
     Returns:
-        Dicionário com métricas de desempenho
+        Resultado de bench.measure por escrita, mais 'file_size' e 'blocks_used'
     """
-    results = {
-        'file_size': data_size,
-        'write_times': [],
-        'average_time': 0,
-        'min_time': float('inf'),
-        'max_time': 0,
-        'blocks_used': 0
-    }
-    
-    if file_name in fs.current_dir.entries:
-        fs.delete(file_name)
+    data = payload(data_size)
+    escritos = []
+
+    def nomes(n: int) -> list:
+        # Os arquivos da amostra anterior são removidos aqui, fora da medição.
+        for nome in escritos:
+            fs.delete(nome)
+        escritos[:] = [f"{file_name}.{i}" for i in range(n)]
+        return escritos
+
+    results = measure(lambda nome: fs.write_file(nome, data), setup=nomes, repeat=repetitions)
+    results['file_size'] = data_size
+    results['blocks_used'] = len(fs.inodes[fs.current_dir.entries[escritos[0]]].data_blocks)
+    with quiet():
+        for nome in escritos:
+            fs.delete(nome)
+    return results
+
+def benchmark_memory_per_file(num_files: int = 100000) -> dict:
+    """
+    Compara, com tracemalloc, os bytes por arquivo da tabela de inodes atual
+    (números inteiros e __slots__) com a representação anterior: ids uuid em
+    str, um __dict__ por inode e um dicionário indexado por str.
+
+    Returns:
+        Dicionário com os bytes por arquivo antes e depois
+    """
+    import tracemalloc
+    import uuid
+
+    class InodeAntigo:
+        def __init__(self, name, is_dir, parent=None):
+            self.id = str(uuid.uuid4())
+            self.name = name
+            self.is_dir = is_dir
+            self.size = 0
+            self.data_blocks = []
+            self.entries = {} if is_dir else None
+            self.parent = parent
+
+    def antes():
+        inodes = {}
+        root = InodeAntigo("/", True)
+        inodes[root.id] = root
+        for i in range(num_files):
+            inode = InodeAntigo(f"f{i}", False, parent=root)
+            inodes[inode.id] = inode
+            root.entries[inode.name] = inode.id
+        return inodes
+
+    def depois():
+        fs = FileSystem()
+        for i in range(num_files):
+            fs.create_file(f"f{i}")
+        return fs
+
+    results = {'files': num_files}
+    for nome, construir in (('before', antes), ('after', depois)):
+        tracemalloc.start()
+        inicio = tracemalloc.get_traced_memory()[0]
+        estrutura = construir()
+        fim = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del estrutura
+        results[nome] = (fim - inicio) / num_files
+    return results
+
+def benchmark_extent_metadata(file_blocks: int = 4096) -> dict:
+    """
+    Mede os bytes de metadados de um arquivo de `file_blocks` blocos com o mapa
+    de extents, em layout contíguo e fragmentado, e os compara com a lista de
+    um int por bloco usada antes.
+
+    Returns:
+        Dicionário {layout: {'extents', 'extent_bytes', 'list_bytes'}}
+    """
+    import sys
+
+    results = {}
+    contiguo = FileSystem(total_blocks=file_blocks * 2)
+    contiguo.write_file("arquivo", "x" * (file_blocks * contiguo.block_size))
+
+    # Enche o disco com arquivos de 1 bloco e apaga metade deles, deixando
+    # só buracos de 1 bloco para o arquivo medido.
+    fragmentado = FileSystem(total_blocks=file_blocks * 2)
+    for i in range(file_blocks * 2):
+        fragmentado.write_file(f"p{i}", "x" * fragmentado.block_size)
+    for i in range(0, file_blocks * 2, 2):
+        fragmentado.delete(f"p{i}")
+    fragmentado.write_file("arquivo", "x" * (file_blocks * fragmentado.block_size))
 
-    data = generate_random_data(data_size)
-    
-    for _ in range(repetitions):
+    for layout, fs in (('contiguous', contiguo), ('fragmented', fragmentado)):
+        mapa = fs.inodes[fs.current_dir.entries["arquivo"]].data_blocks
+        blocos = list(mapa)
+        results[layout] = {
+            'extents': mapa.extent_count(),
+            'extent_bytes': mapa.nbytes(),
+            'list_bytes': sys.getsizeof(blocos) + sum(sys.getsizeof(b) for b in blocos),
+        }
+    return results
+
+def benchmark_append(fs: FileSystem, file_name: str, chunk_size: int = 64, total_appends: int = 20000,
+                     samples: int = 5) -> dict:
+    """
+    Mede o custo de append conforme o arquivo cresce: os appends são divididos
+    em `samples` janelas e cada uma é medida à parte.
+
+    Returns:
+        Dicionário {tamanho do arquivo ao fim da janela (bytes): resultado de bench.measure por append}
+    """
+    data = payload(chunk_size)
+    per_sample = total_appends // samples
+    repeat = min(REPETICOES, per_sample)
+    results = {}
+    for _ in range(samples):
+        r = measure(lambda: fs.append(file_name, data), repeat=repeat, warmup=0, inner=per_sample // repeat)
+        results[fs.inodes[fs.current_dir.entries[file_name]].size] = r
+    return results
+
+
+def benchmark_journal(group_size: int = GROUP_SIZE, repetitions: int = REPETICOES) -> dict:
+    """
+    Mede a vazão de criação + remoção de um arquivo numa imagem montada em
+    cada modo de diário ('off', 'per-op' e 'group').
+
+    Returns:
+        Dicionário {modo: resultado de bench.measure por par criação + remoção,
+        mais 'ops_per_s' (pela mediana) e 'commits' (fsyncs do diário)}
+    """
+    import tempfile
+
+    def par(fs: FileSystem):
+        fs.create_file("f")
+        fs.delete("f")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        for mode in MODOS_DIARIO:
+            with quiet():
+                fs = FileSystem.mount(os.path.join(pasta, f"{mode}.img"), total_blocks=100000,
+                                      journal=mode, group_size=group_size)
+            r = measure(lambda: par(fs), repeat=repetitions)
+            with quiet():
+                if fs.journal is not None:
+                    fs.journal.commit()
+                r['commits'] = fs.journal.commits if fs.journal is not None else 0
+                fs.unmount()
+            r['ops_per_s'] = 2000 / r['median_ms']
+            results[mode] = r
+    return results
+
+
+def benchmark_concurrency(thread_counts=(1, 2, 4, 8), ops_per_thread: int = 2000, dirs: int = 4,
+                          files_per_dir: int = 16, file_size: int = 256, read_ratio: float = 0.5,
+                          seed: int = 0) -> dict:
+    """
+    Teste de carga do modo concorrente: para cada quantidade de threads, um
+    único FileSystem(concurrent=True) recebe `ops_per_thread` operações por
+    thread, cada uma com a sua sessão. Leituras abrem um arquivo qualquer e
+    conferem que ele está inteiro (uma letra só, como cada escrita grava,
+    mais os zeros de um truncate que estendeu); escritas reescrevem, truncam
+    ou removem arquivos do diretório da thread. No fim os invariantes do
+    sistema são conferidos.
+
+    Returns:
+        Dicionário {threads: {'ops_per_s', 'torn_reads', 'problems'}}
+    """
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+
+    def worker(fs: FileSystem, index: int) -> int:
+        rng = random.Random(seed * 1000 + index)
+        torn = 0
+        with fs.session():
+            fs.cd(f"d{index % dirs}")
+            for _ in range(ops_per_thread):
+                # Arquivos sorteados podem não existir (ou o disco pode encher): o erro faz parte da carga.
+                with contextlib.suppress(FileSystemError):
+                    if rng.random() < read_ratio:
+                        with fs.open(f"/d{rng.randrange(dirs)}/f{rng.randrange(files_per_dir)}") as handle:
+                            if len(set(handle.read()) - {0}) > 1:
+                                torn += 1
+                        continue
+                    name = f"f{rng.randrange(files_per_dir)}"
+                    sorteio = rng.random()
+                    if sorteio < 0.7:
+                        fs.write_file(name, rng.choice("abcdefgh") * rng.randrange(1, file_size))
+                    elif sorteio < 0.85:
+                        fs.truncate(name, rng.randrange(file_size))
+                    else:
+                        fs.delete(name)
+        return torn
+
+    results = {}
+    for threads in thread_counts:
+        fs = FileSystem(total_blocks=dirs * files_per_dir * file_size, concurrent=True)
+        for d in range(dirs):
+            fs.create_dir(f"d{d}")
         start = time.perf_counter()
-        fs.write_file(file_name, data)
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            torn = sum(pool.map(lambda i: worker(fs, i), range(threads)))
         end = time.perf_counter()
-        
-        write_time = (end - start) * 1000
-        results['write_times'].append(write_time)
-        
-        if write_time < results['min_time']:
-            results['min_time'] = write_time
-        if write_time > results['max_time']:
-            results['max_time'] = write_time
-            
-        inode_id = fs.current_dir.entries[file_name]
-        inode = fs.inodes[inode_id]
-        results['blocks_used'] = len(inode.data_blocks)
-        
-        fs.delete(file_name)
-    
-    results['average_time'] = sum(results['write_times']) / repetitions
-    
-    return results
\ No newline at end of file
+        results[threads] = {
+            'ops_per_s': threads * ops_per_thread / (end - start),
+            'torn_reads': torn,
+            'problems': fs.check_invariants(),
+        }
+    return results
+
+
+def _age(fs: FileSystem, rng, operations: int, fill: float, max_file_blocks: int) -> list:
+    """
+    Envelhece o disco com uma sequência sorteada de escritas, appends e
+    remoções (de 1 a `max_file_blocks` blocos, tamanhos log-uniformes) que o
+    mantém perto de `fill` cheio. Devolve os nomes dos arquivos que sobraram.
+    """
+    import math
+
+    limite = int(fs.total_blocks * fill)
+    vivos = []
+    for i in range(operations):
+        blocos = int(math.exp(rng.uniform(0, math.log(max_file_blocks))))
+        sorteio = rng.random()
+        while vivos and (fs.total_blocks - fs.free_space.free_count + blocos > limite):
+            fs.delete(vivos.pop(rng.randrange(len(vivos))))
+        if sorteio < 0.6 or not vivos:
+            vivos.append(f"f{i}")
+            fs.write_file(vivos[-1], "x" * (blocos * fs.block_size))
+        elif sorteio < 0.85:
+            fs.append(rng.choice(vivos), "y" * (max(1, blocos // 4) * fs.block_size))
+        else:
+            fs.delete(vivos.pop(rng.randrange(len(vivos))))
+    return vivos
+
+
+def _cold_read(fs: FileSystem, names: list) -> dict:
+    """Lê todos os arquivos em sequência com o cache frio: {'seconds', 'bytes', 'seeks'}."""
+    fs.disk.drop()
+    buscas = fs.device.seeks
+    lidos = 0
+    start = time.perf_counter()
+    for name in names:
+        with fs.open(name) as handle:
+            for chunk in handle.chunks():
+                lidos += len(chunk)
+    return {'seconds': time.perf_counter() - start, 'bytes': lidos, 'seeks': fs.device.seeks - buscas}
+
+
+def benchmark_allocation(policies=None, total_blocks: int = 1 << 16, operations: int = 20000, fill: float = 0.8,
+                         max_file_blocks: int = 512, seed: int = 0) -> dict:
+    """
+    Compara as políticas de alocação num disco envelhecido: a mesma
+    sequência sorteada de escritas, appends e remoções (de 1 a
+    `max_file_blocks` blocos, com tamanhos log-uniformes) mantém o disco
+    perto de `fill` cheio por `operations` operações. Mede a vazão do
+    envelhecimento, a fragmentação que sobra e a localidade de uma leitura
+    fria de todos os arquivos (buscas do dispositivo por arquivo).
+
+    Returns:
+        Dicionário {política: {'ops_per_s', 'extents_per_file', 'average_gap',
+        'largest_free', 'free_extents', 'seeks_per_file'}}
+    """
+    import random
+    from entity.allocation import POLICIES
+
+    results = {}
+    for policy in policies or POLICIES:
+        fs = FileSystem(total_blocks=total_blocks, allocator=policy)
+        with quiet():
+            start = time.perf_counter()
+            vivos = _age(fs, random.Random(seed), operations, fill, max_file_blocks)
+            end = time.perf_counter()
+            leitura = _cold_read(fs, vivos)
+        frag = fragmentation(fs.layout, fs.free_space)
+        results[policy] = {
+            'ops_per_s': operations / (end - start),
+            'extents_per_file': frag['extents_per_file'],
+            'average_gap': frag['average_gap'],
+            'largest_free': frag['largest_free'],
+            'free_extents': frag['free_extents'],
+            'seeks_per_file': leitura['seeks'] / len(vivos) if vivos else 0.0,
+        }
+    return results
+
+
+def benchmark_defrag(total_blocks: int = 1 << 16, operations: int = 20000, fill: float = 0.8,
+                     max_file_blocks: int = 512, step_blocks: int = 4096, access_us: float = 20.0,
+                     seek_us: float = 200.0, cache_lines: int = 16, allocator='size-class', seed: int = 0) -> dict:
+    """
+    Envelhece um disco como benchmark_allocation e mede uma leitura fria de
+    todos os arquivos antes e depois de desfragmentá-lo em chamadas de até
+    `step_blocks` blocos. As leituras passam por um cache de `cache_lines`
+    linhas e um dispositivo com `access_us` por acesso e `seek_us` por busca,
+    ligados só depois do envelhecimento para ele não ficar lento.
+
+    Returns:
+        {'before', 'after': fragmentation() mais 'read_mb_per_s' e
+        'seeks_per_file'; 'calls', 'moved_blocks', 'max_pause_ms', 'problems'}
+    """
+    import random
+
+    fs = FileSystem(total_blocks=total_blocks, cache_lines=cache_lines, allocator=allocator)
+    with quiet():
+        vivos = _age(fs, random.Random(seed), operations, fill, max_file_blocks)
+        fs.device.access_us, fs.device.seek_us = access_us, seek_us
+
+        def retrato() -> dict:
+            leitura = _cold_read(fs, vivos)
+            return dict(fragmentation(fs.layout, fs.free_space),
+                        read_mb_per_s=leitura['bytes'] / leitura['seconds'] / 1e6,
+                        seeks_per_file=leitura['seeks'] / len(vivos) if vivos else 0.0)
+
+        antes = retrato()
+        chamadas = blocos = 0
+        pausas = []
+        while True:
+            r = fs.defrag(max_blocks=step_blocks)
+            chamadas += 1
+            blocos += r['moved_blocks']
+            pausas.append(r['seconds'] * 1000)
+            if r['done']:
+                break
+        depois = retrato()
+    return {'before': antes, 'after': depois, 'calls': chamadas, 'moved_blocks': blocos,
+            'max_pause_ms': max(pausas), 'problems': fs.check_invariants()}
+
+
+def benchmark_metrics(file_size: int = 1024, files: int = 100, rounds: int = 5, repetitions: int = 20) -> dict:
+    """
+    Custo das métricas sempre ligadas: a mesma mistura de operações (cd,
+    write_file, read_file, create_file e delete sobre `files` arquivos de
+    `file_size` bytes) medida com fs.metrics.enabled ligado e desligado,
+    alternando `rounds` vezes para o ruído da máquina cair igual nos dois.
+
+    Returns:
+        {'on', 'off': bench.measure por mistura (a rodada de menor mediana),
+        'overhead_pct': diferença entre as duas medianas}
+    """
+    fs = FileSystem()
+    dados = "x" * file_size
+    nomes = [f"f{i}" for i in range(files)]
+    proximo = iter(range(1 << 62))
+    with quiet():
+        fs.create_dir("dados")
+        fs.cd("dados")
+        for nome in nomes:
+            fs.write_file(nome, dados)
+        fs.cd("..")
+
+    def mistura():
+        nome = nomes[next(proximo) % files]
+        fs.cd("dados")
+        fs.write_file(nome, dados)
+        fs.read_file(nome)
+        fs.create_file("tmp")
+        fs.delete("tmp")
+        fs.cd("..")
+
+    melhores = {}
+    for _ in range(rounds):
+        for ligado in (True, False):
+            fs.metrics.enabled = ligado
+            r = measure(mistura, repeat=repetitions)
+            if ligado not in melhores or r['median_ms'] < melhores[ligado]['median_ms']:
+                melhores[ligado] = r
+    fs.metrics.enabled = True
+    return {'on': melhores[True], 'off': melhores[False],
+            'overhead_pct': (melhores[True]['median_ms'] / melhores[False]['median_ms'] - 1) * 100}
@@ -1,398 +1,1577 @@
+from array import array
+from itertools import accumulate
 from typing import Dict
 from entity.lista import ListaEncadeada
+from entity.inode_table import InodeTable
+from entity.free_space import FreeSpaceManager, to_extents, merge_extents, split_extents
+from entity.allocation import LayoutStats
+from entity.defrag import Defragmenter, fragmentation
+from entity.block_store import BlockStore, PagedArray
+from entity.block_device import BlockDevice, BufferCache, CACHE_LINES
+from entity.file_handle import FileHandle, write_range
+from entity.disk_image import DiskImage
+from entity.journal import Journal, MODOS_DIARIO, GROUP_SIZE, CHECKPOINT_EVERY
+from entity.bench import measure, quiet, REPETICOES
+from entity.concurrency import Session, Sessions, ThreadSessions, Concurrency, LockedFreeSpace, \
+    LockedBufferCache, LockedInodeTable, LockedLayoutStats, LockedMetrics, locked, exclusive
+from entity.metrics import Metrics, measured
+from entity.workload import payload
+from entity.errors import FileSystemError, NotFoundError, AlreadyExistsError, IsDirectoryError, \
+    NotDirectoryError, DirectoryNotEmptyError, NoSpaceError, InvalidArgumentError, NotMountedError
 
+import contextlib
+import os
 import random
+import struct
+import threading
 import time
-import string
-
-def generate_random_data(size):
-    return ''.join(random.choice(string.ascii_letters) for _ in range(size))
 
 BLOCK_SIZE = 8
 TOTAL_BLOCKS = 1000000
+FIM = -1
+SALTO_INDICE = 64
+MODOS_ACESSO = ('encadeado', 'indexado')
 
 class SistemaArquivos:
-    def __init__(self):
-        self.nos: Dict[str, ListaEncadeada] = {}
+    def __init__(self, tamanho_bloco: int = BLOCK_SIZE, total_blocos: int = TOTAL_BLOCKS,
+                 modo_acesso: str = 'encadeado', linhas_cache: int = CACHE_LINES,
+                 latencia_us: float = 0.0, busca_us: float = 0.0, armazenamento=None,
+                 concorrente: bool = False, alocador='size-class'):
+        if modo_acesso not in MODOS_ACESSO:
+            raise ValueError(f"Modo de acesso inválido: '{modo_acesso}'. Use um de {MODOS_ACESSO}.")
+        self.tamanho_bloco = tamanho_bloco
+        self.total_blocos = total_blocos
+        self.modo_acesso = modo_acesso
+        # Modo concorrente: uma sessão (diretório atual) por thread, travas por
+        # nó e alocador, cache e tabela de nós protegidos por travas.
+        self.concorrente = concorrente
+        self._concurrency = Concurrency() if concorrente else None
+        self.nos = LockedInodeTable() if concorrente else InodeTable()
         self.root = ListaEncadeada("/", True)
-        self.nos[self.root.id] = self.root
+        self.nos.add(self.root)
+        self._sessions = (ThreadSessions if concorrente else Sessions)(lambda: Session(self.root))
+        # Caminho absoluto de cada diretório já visitado, calculado pela cadeia
+        # de parents; invalidado quando mover/deletar altera a árvore.
+        self._caminhos: Dict[int, str] = {self.root.id: "/"}
+        self._trava_caminhos = threading.RLock() if concorrente else contextlib.nullcontext()
+        # Struct-of-arrays: payloads num buffer paginado e ponteiros num array('q')
+        # paginado; as páginas só são criadas quando algum bloco delas é escrito.
+        # Os payloads são lidos e gravados pelo cache de blocos, na frente de
+        # um dispositivo com latência simulada.
+        if armazenamento is None:
+            armazenamento = BlockStore(total_blocos, tamanho_bloco)
+        self.dispositivo = BlockDevice(armazenamento, latencia_us, busca_us)
+        self.disco = (LockedBufferCache if concorrente else BufferCache)(self.dispositivo, linhas_cache)
+        self.proximo = PagedArray(total_blocos, FIM)
+        # `alocador` escolhe a política de posicionamento (entity.allocation.POLICIES).
+        self.espaco_livre = (LockedFreeSpace if concorrente else FreeSpaceManager)(total_blocos, alocador)
+        self.disposicao = (LockedLayoutStats if concorrente else LayoutStats)()
+        # Contagem e histograma de latência de cada operação @measured.
+        self.metrics = (LockedMetrics if concorrente else Metrics)()
+        self._desfragmentador = Defragmenter(self.espaco_livre, self._arquivos_desfrag, self._extents_desfrag,
+                                             self._realocar)
+        # Modo 'indexado': além da tabela de ponteiros (estilo FAT) em memória,
+        # cada arquivo ganha sob demanda um índice com o bloco de cada posição
+        # múltipla de SALTO_INDICE, descartado quando o arquivo é reescrito.
+        self._indices: Dict[int, array] = {}
+        self.imagem = None
+        self.diario = None
+        # Operações do diário reaplicadas por montar().
+        self.reaplicadas = 0
+        self.checkpoint_a_cada = CHECKPOINT_EVERY
+        self._desde_checkpoint = 0
+        if concorrente:
+            self._concurrency.checkpoint = self._checkpoint
+
+    @property
+    def diretorio_atual(self) -> ListaEncadeada:
+        return self._sessions.current.cwd
+
+    @diretorio_atual.setter
+    def diretorio_atual(self, no: ListaEncadeada):
+        self._sessions.current.cwd = no
+
+    @property
+    def caminho_atual(self) -> str:
+        return self._sessions.current.path
+
+    @caminho_atual.setter
+    def caminho_atual(self, caminho: str):
+        self._sessions.current.path = caminho
+
+    @contextlib.contextmanager
+    def sessao(self, sessao: Session = None):
+        """
+        Usa `sessao` (ou uma nova, na raiz) como diretório atual da thread
+        enquanto o bloco durar; devolve a sessão, que pode ser reutilizada.
+        """
+        anterior = self._sessions.current
+        self._sessions.current = sessao if sessao is not None else Session(self.root)
+        try:
+            yield self._sessions.current
+        finally:
+            self._sessions.current = anterior
+
+    @classmethod
+    def montar(cls, caminho: str, tamanho_bloco: int = BLOCK_SIZE, total_blocos: int = TOTAL_BLOCKS,
+               diario: str = 'off', tamanho_grupo: int = GROUP_SIZE, checkpoint_a_cada: int = CHECKPOINT_EVERY,
+               **opcoes):
+        """
+        Monta a imagem de disco em `caminho`, criando-a se ainda não existir.
+        Os payloads ficam no arquivo mapeado; nós, tabela de ponteiros e mapa
+        livre são lidos de uma vez da área de metadados.
+
+        Operações registradas em `caminho`.journal depois do último checkpoint
+        são reaplicadas. Com `diario` 'per-op' ou 'group' as próximas também
+        são registradas, com checkpoint a cada `checkpoint_a_cada` registros.
+        """
+        if diario not in MODOS_DIARIO:
+            raise ValueError(f"Modo de diário inválido: '{diario}'. Use um de {MODOS_DIARIO}.")
+        imagem = DiskImage(caminho, b'LE', tamanho_bloco, total_blocos)
+        fs = cls(imagem.block_size, imagem.total_blocks, armazenamento=imagem.store, **opcoes)
+        fs.imagem = imagem
+        fs.checkpoint_a_cada = checkpoint_a_cada
+        metadados = imagem.read_metadata()
+        if metadados:
+            fs._carregar_metadados(metadados)
+
+        caminho_diario = caminho + '.journal'
+        registros = [r for r in Journal.read(caminho_diario) if r[0] > imagem.lsn]
+        if registros:
+            for _, op, args in registros:
+                # Uma operação que falhou quando foi registrada falha de novo, sem efeito.
+                with contextlib.suppress(FileSystemError):
+                    fs._reaplicar(op, args)
+            imagem.lsn = registros[-1][0]
+            fs.reaplicadas = len(registros)
+        if diario != 'off':
+            fs.diario = Journal(caminho_diario, diario, tamanho_grupo)
+            fs.diario.next_lsn = imagem.lsn + 1
+            fs.disco.before_writeback = fs.diario.commit
+        if registros:
+            fs._checkpoint()
+            if fs.diario is None:
+                os.remove(caminho_diario)
+        return fs
+
+    def _absoluto(self, nome: str) -> str:
+        return self.caminho_atual.rstrip("/") + "/" + nome
+
+    def _registrar(self, op: str, *args):
+        """Registra a operação no diário (se houver) antes de ela alterar o estado."""
+        if self.diario is None:
+            return
+        self.diario.append(op, *args)
+        self._desde_checkpoint += 1
+
+    def _talvez_checkpoint(self):
+        if self.diario is not None and self._desde_checkpoint >= self.checkpoint_a_cada:
+            if self._concurrency is not None and self._concurrency.nested():
+                # Com outras sessões no meio de operações, o checkpoint espera por elas.
+                self._concurrency.checkpoint_due = True
+                return
+            self._checkpoint()
+
+    def _travas_diretorio(self, *args):
+        return ((self.diretorio_atual.id, True),)
+
+    def _travas_listagem(self, *args):
+        return ((self.diretorio_atual.id, False),)
+
+    def _travas_escrita(self, nome: str, *args):
+        """Trava o arquivo `nome`; se ele ainda não existe, o diretório atual, onde será criado."""
+        numero = self.diretorio_atual.entries.get(nome)
+        if numero is None:
+            return ((self.diretorio_atual.id, True),)
+        return (self.diretorio_atual.id, False), (numero, True)
+
+    def _travas_leitura(self, nome: str, *args):
+        return (self.diretorio_atual.id, False), (self.diretorio_atual.entries.get(nome), False)
+
+    def _travas_remocao(self, nome: str):
+        return (self.diretorio_atual.id, True), (self.diretorio_atual.entries.get(nome), True)
+
+    def _travas_mover(self, nome_arquivo: str, destino: str):
+        pai, nome = self._separar(nome_arquivo)
+        if pai is None:
+            return ()
+        destino_dir = self._resolver_caminho(destino)
+        return ((pai.id, True), (pai.entries.get(nome), True),
+                (destino_dir.id if destino_dir is not None else None, True))
+
+    def _travas_abrir(self, caminho: str):
+        pai, nome = self._separar(caminho)
+        if pai is None:
+            return ()
+        return (pai.id, False), (pai.entries.get(nome), False)
+
+    def _reaplicar(self, op: str, args):
+        """Reaplica uma operação do diário; os caminhos registrados são absolutos."""
+        if op == 'mover':
+            self.mover(*args)
+            return
+        if op == 'realocar':
+            no = self._resolver_caminho(args[0])
+            if no is not None and not no.is_dir:
+                write_range(self.disco, self.tamanho_bloco, self._localizador(no), args[1], args[2])
+            return
+        pai, nome = self._separar(args[0])
+        if pai is None:
+            return
+        atual = self.diretorio_atual
+        self.diretorio_atual = pai
+        try:
+            getattr(self, op)(nome, *args[1:])
+        finally:
+            self.diretorio_atual = atual
+
+    def _serializar_metadados(self) -> bytes:
+        """Serializa os nós (a árvore sai dos parents), os ponteiros e o mapa livre."""
+        partes = [struct.pack('<I', len(self.nos))]
+        for no in self.nos.values():
+            nome = no.name.encode('utf-8')
+            pai = no.parent.id if no.parent is not None else -1
+            primeiro = FIM if no.first_block is None else no.first_block
+            ultimo = FIM if no.last_block is None else no.last_block
+            partes.append(struct.pack('<IiBQqqH', no.id, pai, no.is_dir, no.size, primeiro, ultimo, len(nome)))
+            partes.append(nome)
+        partes.append(self.proximo.tobytes())
+        partes.append(self.espaco_livre.tobytes())
+        return b''.join(partes)
+
+    def _carregar_metadados(self, dados: bytes):
+        (quantidade,) = struct.unpack_from('<I', dados, 0)
+        pos = 4
+        nos = []
+        pais = []
+        for _ in range(quantidade):
+            numero, pai, is_dir, tamanho, primeiro, ultimo, tamanho_nome = \
+                struct.unpack_from('<IiBQqqH', dados, pos)
+            pos += 35
+            no = ListaEncadeada(dados[pos:pos + tamanho_nome].decode('utf-8'), bool(is_dir))
+            pos += tamanho_nome
+            no.id = numero
+            no.size = tamanho
+            no.first_block = None if primeiro == FIM else primeiro
+            no.last_block = None if ultimo == FIM else ultimo
+            nos.append(no)
+            pais.append(pai)
+        pos = self.proximo.load(dados, pos)
+        self.espaco_livre.load(dados, pos)
+        self.nos.restore(nos)
+        self.disposicao.reset()
+        for no in nos:
+            if not no.is_dir:
+                self.disposicao.add(to_extents(self._cadeia(no.first_block)))
+        for no, pai in zip(nos, pais):
+            if pai >= 0:
+                no.parent = self.nos[pai]
+                no.parent.entries[no.name] = no.id
+        self.root = self.nos[0]
         self.diretorio_atual = self.root
         self.caminho_atual = "/"
-        self.disco = [{'data': '', 'next': None} for _ in range(TOTAL_BLOCKS)]
-        self.blocos_livres = list(range(TOTAL_BLOCKS))
+        self._caminhos = {self.root.id: "/"}
+        self._indices = {}
+
+    @measured
+    @locked('_travas_diretorio')
+    def criar_arquivo(self, nome: str) -> int:
+        """Cria um arquivo vazio no diretório atual e devolve o número do nó."""
+        return self._criar_arquivo(nome)
 
-    def criar_arquivo(self, nome: str):
+    def _criar_arquivo(self, nome: str) -> int:
+        """criar_arquivo sem métricas nem travas, para a criação implícita das escritas."""
         if nome in self.diretorio_atual.entries:
-            print(f"Erro: '{nome}' já existe neste diretório.")
-            return
+            raise AlreadyExistsError(f"'{nome}' já existe neste diretório.")
+        self._registrar('criar_arquivo', self._absoluto(nome))
         no = ListaEncadeada(nome, False)
         no.parent = self.diretorio_atual
-        self.nos[no.id] = no
+        self.nos.add(no)
         self.diretorio_atual.entries[nome] = no.id
-        print(f"Arquivo '{nome}' criado com sucesso.")
+        self._talvez_checkpoint()
+        return no.id
 
-    def criar_diretorio(self, nome: str):
+    @measured
+    @locked('_travas_diretorio')
+    def criar_diretorio(self, nome: str) -> int:
+        """Cria um diretório vazio no diretório atual e devolve o número do nó."""
         if nome in self.diretorio_atual.entries:
-            print(f"Erro: '{nome}' já existe neste diretório.")
-            return
+            raise AlreadyExistsError(f"'{nome}' já existe neste diretório.")
+        self._registrar('criar_diretorio', self._absoluto(nome))
         no = ListaEncadeada(nome, True)
         no.parent = self.diretorio_atual
-        self.nos[no.id] = no
+        self.nos.add(no)
         self.diretorio_atual.entries[nome] = no.id
-        print(f"Diretório '{nome}' criado com sucesso.")
+        self._talvez_checkpoint()
+        return no.id
 
-    def listar(self):
-        if not self.diretorio_atual.entries:
-            print("Diretório vazio.")
-            return
-        for nome in self.diretorio_atual.entries:
-            no = self.nos[self.diretorio_atual.entries[nome]]
-            tipo = "dir" if no.is_dir else "file"
-            print(f"{tipo}\t{nome}")
+    @measured
+    @locked('_travas_listagem')
+    def listar(self) -> list:
+        """Entradas do diretório atual como pares (nome, é diretório), na ordem de criação."""
+        return [(nome, self.nos[numero].is_dir) for nome, numero in self.diretorio_atual.entries.items()]
 
+    @measured
     def mudar_diretorio(self, caminho: str):
         if caminho == ".":
             return
         if caminho == "..":
+            # Na raiz, ".." é a própria raiz.
             if self.diretorio_atual.parent:
                 self.diretorio_atual = self.diretorio_atual.parent
                 self._atualizar_caminho()
-            else:
-                print("Já está na raiz.")
             return
         if caminho not in self.diretorio_atual.entries:
-            print(f"Erro: Diretório '{caminho}' não encontrado.")
-            return
+            raise NotFoundError(f"Diretório '{caminho}' não encontrado.")
         no_id = self.diretorio_atual.entries[caminho]
         no = self.nos[no_id]
         if not no.is_dir:
-            print(f"Erro: '{caminho}' não é um diretório.")
-            return
+            raise NotDirectoryError(f"'{caminho}' não é um diretório.")
         self.diretorio_atual = no
         self._atualizar_caminho()
 
-    def _atualizar_caminho(self):
-        if self.diretorio_atual.id == self.root.id:
-            self.caminho_atual = "/"
+    def _caminho_de(self, no: ListaEncadeada) -> str:
+        """Caminho absoluto de um nó em O(profundidade), reaproveitando o cache."""
+        # Calcular e guardar é atômico em relação a _invalidar_caminhos, que
+        # só roda depois que a árvore já mudou.
+        with self._trava_caminhos:
+            nomes = []
+            atual = no
+            while atual.id not in self._caminhos:
+                nomes.append(atual.name)
+                atual = atual.parent
+            base = self._caminhos[atual.id]
+            if not nomes:
+                return base
+            caminho = base.rstrip("/") + "/" + "/".join(reversed(nomes))
+            if no.is_dir:
+                self._caminhos[no.id] = caminho
+            return caminho
+
+    def _invalidar_caminhos(self, no: ListaEncadeada):
+        if not no.is_dir:
             return
-        caminho = []
-        atual = self.diretorio_atual
-        while atual.id != self.root.id:
-            for no in self.nos.values():
-                if no.is_dir and atual.id in no.entries.values():
-                    for nome, id in no.entries.items():
-                        if id == atual.id:
-                            caminho.append(nome)
-                            atual = no
-                            break
-            if atual.id == self.root.id:
-                caminho.append("")
-                break
-        self.caminho_atual = "/".join(reversed(caminho)) or "/"
+        with self._trava_caminhos:
+            if no.entries:
+                # Um diretório com filhos invalida a subárvore inteira.
+                self._caminhos = {self.root.id: "/"}
+            else:
+                self._caminhos.pop(no.id, None)
+
+    def _atualizar_caminho(self):
+        self.caminho_atual = self._caminho_de(self.diretorio_atual)
+
+    def _resolver_caminho(self, caminho: str):
+        """Resolve um caminho absoluto ou relativo ao diretório atual em O(profundidade)."""
+        atual = self.root if caminho.startswith("/") else self.diretorio_atual
+        for parte in caminho.split("/"):
+            if parte in ("", "."):
+                continue
+            if parte == "..":
+                if atual.parent is not None:
+                    atual = atual.parent
+                continue
+            if not atual.is_dir or parte not in atual.entries:
+                return None
+            atual = self.nos[atual.entries[parte]]
+        return atual
+
+    def _separar(self, caminho: str):
+        """Separa um caminho em (nó do diretório pai, nome final)."""
+        if "/" not in caminho.strip("/"):
+            pai = self.root if caminho.startswith("/") else self.diretorio_atual
+            return pai, caminho.strip("/")
+        caminho_pai, nome = caminho.rstrip("/").rsplit("/", 1)
+        pai = self._resolver_caminho(caminho_pai or "/")
+        if pai is None or not pai.is_dir:
+            return None, nome
+        return pai, nome
 
+    @measured
+    @locked('_travas_mover')
     def mover(self, nome_arquivo: str, destino: str):
-        if nome_arquivo not in self.diretorio_atual.entries:
-            print(f"Erro: Arquivo '{nome_arquivo}' não encontrado no diretório atual.")
-            return
-        no_id = self.diretorio_atual.entries[nome_arquivo]
+        pai, nome = self._separar(nome_arquivo)
+        if pai is None or nome not in pai.entries:
+            raise NotFoundError(f"Arquivo '{nome_arquivo}' não encontrado no diretório atual.")
+        no_id = pai.entries[nome]
         no = self.nos[no_id]
         if no.is_dir:
-            print(f"Erro: '{nome_arquivo}' é um diretório. Apenas arquivos podem ser movidos.")
-            return
-        if destino == "/":
-            destino_dir = self.root
-        elif destino in self.diretorio_atual.entries:
-            destino_id = self.diretorio_atual.entries[destino]
-            destino_dir = self.nos[destino_id]
-        elif self.diretorio_atual.parent and destino in self.diretorio_atual.parent.entries:
-            destino_id = self.diretorio_atual.parent.entries[destino]
-            destino_dir = self.nos[destino_id]
-        else:
-            print(f"Erro: Diretório de destino '{destino}' inválido.")
-            return
+            raise IsDirectoryError(f"'{nome_arquivo}' é um diretório. Apenas arquivos podem ser movidos.")
+        destino_dir = self._resolver_caminho(destino)
         if not destino_dir or not destino_dir.is_dir:
-            print(f"Erro: Diretório de destino '{destino}' inválido.")
-            return
-        if nome_arquivo in destino_dir.entries:
-            print(f"Erro: Já existe '{nome_arquivo}' em '{destino}'.")
-            return
-        del self.diretorio_atual.entries[nome_arquivo]
-        destino_dir.entries[nome_arquivo] = no_id
+            raise NotFoundError(f"Diretório de destino '{destino}' inválido.")
+        if nome in destino_dir.entries:
+            raise AlreadyExistsError(f"Já existe '{nome}' em '{destino}'.")
+        self._registrar('mover', self._caminho_de(no), self._caminho_de(destino_dir))
+        del pai.entries[nome]
+        destino_dir.entries[nome] = no_id
         no.parent = destino_dir
-        print(f"Arquivo '{nome_arquivo}' movido para '{destino}' com sucesso.")
+        self._invalidar_caminhos(no)
+        self._talvez_checkpoint()
+
+    def _cadeia(self, primeiro):
+        atual = FIM if primeiro is None else primeiro
+        while atual != FIM:
+            yield atual
+            atual = self.proximo[atual]
+
+    def _indice_saltos(self, no: ListaEncadeada) -> array:
+        indice = self._indices.get(no.id)
+        if indice is None:
+            indice = array('q')
+            for posicao, bloco in enumerate(self._cadeia(no.first_block)):
+                if posicao % SALTO_INDICE == 0:
+                    indice.append(bloco)
+            self._indices[no.id] = indice
+        return indice
+
+    def localizar_bloco(self, no: ListaEncadeada, k: int):
+        """
+        Devolve o bloco físico da posição k do arquivo, ou None se k estiver fora
+        dele. No modo 'encadeado' segue k ponteiros a partir do primeiro bloco,
+        e cada ponteiro seguido custa uma leitura do bloco que o guarda; no modo
+        'indexado' a tabela de ponteiros fica em memória e a caminhada salta
+        pelo índice, seguindo no máximo SALTO_INDICE - 1 ponteiros.
+        """
+        if k < 0 or no.first_block is None:
+            return None
+        atual = no.first_block
+        passos = k
+        if self.modo_acesso == 'indexado':
+            indice = self._indice_saltos(no)
+            if k // SALTO_INDICE >= len(indice):
+                return None
+            atual = indice[k // SALTO_INDICE]
+            passos = k % SALTO_INDICE
+        encadeado = self.modo_acesso == 'encadeado'
+        for _ in range(passos):
+            if encadeado:
+                self.disco.touch(atual)
+            atual = self.proximo[atual]
+            if atual == FIM:
+                return None
+        return atual
+
+    def _localizador(self, no: ListaEncadeada, ancora=None):
+        """
+        Cria a função locate de um handle: guarda o último trecho contíguo
+        visitado, então leituras sequenciais avançam um ponteiro por trecho em
+        vez de percorrer a cadeia desde o início a cada bloco. `ancora` é um
+        par (posição, bloco) já conhecido de onde a caminhada pode começar.
+        """
+        trecho = [0, 0, 0] if ancora is None else [ancora[0], ancora[1], 1]  # posição, bloco, tamanho
 
-    def escrever_arquivo(self, nome: str, dados: str):
+        def localizar(k: int):
+            inicio, bloco, tamanho = trecho
+            if inicio <= k < inicio + tamanho:
+                return bloco + k - inicio, inicio + tamanho - k
+            if tamanho and k == inicio + tamanho:
+                bloco = self.proximo[bloco + tamanho - 1]
+            else:
+                bloco = self.localizar_bloco(no, k)
+            tamanho = 1
+            while tamanho < SALTO_INDICE and self.proximo[bloco + tamanho - 1] == bloco + tamanho:
+                tamanho += 1
+            trecho[:] = [k, bloco, tamanho]
+            return bloco, tamanho
+
+        return localizar
+
+    @measured
+    def abrir(self, caminho: str):
+        """
+        Abre um arquivo para leitura em streaming e devolve um FileHandle. No
+        modo concorrente o handle segura a trava compartilhada do arquivo até
+        ser fechado: escritas, remoções e movimentos dele esperam (inclusive
+        os da própria thread, que não deve escrever num arquivo que mantém
+        aberto) e a leitura nunca vê uma escrita pela metade. Lotes
+        (escrever_varios/deletar_varios) não esperam por handles abertos.
+        """
+        return self._abrir(caminho)
+
+    def _abrir(self, caminho: str):
+        """abrir sem métricas, para ler_arquivo não contar duas operações."""
+        c = self._concurrency
+        travas = []
+        if c is not None and not c.nested():
+            travas = c.acquire(lambda: self._travas_abrir(caminho))
+        pai, nome = self._separar(caminho)
+        if travas:
+            # A trava do diretório só serve para não abrir um arquivo no meio
+            # da criação; o handle fica só com a do arquivo.
+            do_diretorio = c.lock(pai.id)
+            c.release([trava for trava in travas if trava[0] is do_diretorio])
+            travas = [trava for trava in travas if trava[0] is not do_diretorio]
+        if pai is None or nome not in pai.entries:
+            if travas:
+                c.release(travas)
+            raise NotFoundError(f"Arquivo '{caminho}' não encontrado.")
+        no = self.nos[pai.entries[nome]]
+        if no.is_dir:
+            if travas:
+                c.release(travas)
+            raise IsDirectoryError(f"'{caminho}' é um diretório.")
+        ao_fechar = (lambda: c.release(travas)) if travas else None
+        return FileHandle(self.disco, no.size, self.tamanho_bloco, self._localizador(no), ao_fechar)
+
+    def _liberar_cadeia(self, primeiro):
+        """Libera a cadeia que começa em `primeiro` e devolve os extents liberados."""
+        extents = to_extents(self._cadeia(primeiro))
+        for inicio, tamanho in extents:
+            self.proximo.set_range(inicio, array('q', [FIM]) * tamanho)
+            self.disco.clear_extent(inicio, tamanho)
+        self.espaco_livre.free_extents(extents)
+        return extents
+
+    @measured
+    @locked('_travas_escrita')
+    def escrever_arquivo(self, nome: str, dados: str) -> int:
+        """Substitui o conteúdo do arquivo (criado se não existir) por `dados` e devolve o novo tamanho em bytes."""
         if nome not in self.diretorio_atual.entries:
-            self.criar_arquivo(nome)
+            self._criar_arquivo(nome)
 
         no_id = self.diretorio_atual.entries[nome]
         no = self.nos[no_id]
+        if no.is_dir:
+            raise IsDirectoryError(f"'{nome}' é um diretório.")
 
-        num_blocos = (len(dados) + BLOCK_SIZE - 1) // BLOCK_SIZE
-        if len(self.blocos_livres) < num_blocos:
-            print("Erro: Espaço insuficiente em disco.")
-            return
+        codificados = dados.encode('utf-8')
+        num_blocos = (len(codificados) + self.tamanho_bloco - 1) // self.tamanho_bloco
+        with self.espaco_livre.transaction():
+            # A cadeia atual do arquivo volta para o alocador antes da alocação.
+            if self.espaco_livre.free_count + self._num_blocos(no) < num_blocos:
+                raise NoSpaceError("Espaço insuficiente em disco.")
 
-        atual = no.first_block
-        while atual is not None:
-            prox = self.disco[atual]['next']
-            self.disco[atual] = {'data': '', 'next': None}
-            self.blocos_livres.append(atual)
-            atual = prox
-        no.first_block = None
-
-        random.shuffle(self.blocos_livres)
-
-        blocos = [self.blocos_livres.pop(0) for _ in range(num_blocos)]
-        for i, bloco in enumerate(blocos):
-            inicio = i * BLOCK_SIZE
-            fim = inicio + BLOCK_SIZE
-            self.disco[bloco]['data'] = dados[inicio:fim]
-            self.disco[bloco]['next'] = blocos[i + 1] if i + 1 < num_blocos else None
+            self._registrar('escrever_arquivo', self._absoluto(nome), dados)
+            self._indices.pop(no.id, None)
+            self.disposicao.remove(self._liberar_cadeia(no.first_block))
+            no.first_block = None
+            no.last_block = None
+            extents = self.espaco_livre.allocate(num_blocos)
+
+        dados = codificados
+        self.disposicao.add(extents)
+        deslocamento = 0
+        for inicio, tamanho in extents:
+            fim = deslocamento + tamanho * self.tamanho_bloco
+            self.disco.write_extent(inicio, tamanho, memoryview(dados)[deslocamento:fim])
+            deslocamento = fim
+        self._encadear(extents)
 
         no.size = len(dados)
-        no.first_block = blocos[0]
-        print(f"Dados escritos em '{nome}' ({no.size} bytes) nos blocos {blocos}")
+        if extents:
+            no.first_block = extents[0][0]
+            no.last_block = extents[-1][0] + extents[-1][1] - 1
+        self._talvez_checkpoint()
+        return no.size
 
+    def _encadear(self, extents):
+        """Liga os extents em uma cadeia, terminando em FIM."""
+        for i, (inicio, tamanho) in enumerate(extents):
+            self.proximo.set_range(inicio, array('q', range(inicio + 1, inicio + tamanho + 1)))
+            self.proximo[inicio + tamanho - 1] = extents[i + 1][0] if i + 1 < len(extents) else FIM
 
-    def ler_arquivo(self, nome: str):
-        if nome not in self.diretorio_atual.entries:
-            print(f"Erro: Arquivo '{nome}' não encontrado.")
+    def _num_blocos(self, no: ListaEncadeada) -> int:
+        return (no.size + self.tamanho_bloco - 1) // self.tamanho_bloco
+
+    def _crescer(self, no: ListaEncadeada, num_blocos: int):
+        """Estende a cadeia a partir de last_block, sem percorrê-la."""
+        if num_blocos <= 0:
             return
+        posicao = self._num_blocos(no)
+        hint = no.last_block + 1 if no.last_block is not None else None
+        extents = self.espaco_livre.allocate(num_blocos, hint=hint)
+        self.disposicao.grow(no.last_block, extents)
+        self._encadear(extents)
+        if no.last_block is None:
+            no.first_block = extents[0][0]
+        else:
+            self.proximo[no.last_block] = extents[0][0]
+        no.last_block = extents[-1][0] + extents[-1][1] - 1
+
+        indice = self._indices.get(no.id)
+        if indice is not None:
+            for inicio, tamanho in extents:
+                for d in range(-posicao % SALTO_INDICE, tamanho, SALTO_INDICE):
+                    indice.append(inicio + d)
+                posicao += tamanho
+
+    @measured
+    @locked('_travas_escrita')
+    def escrever_em(self, nome: str, deslocamento: int, dados: str) -> int:
+        """
+        Grava `dados` a partir do byte `deslocamento` sem realocar o arquivo: só
+        os blocos afetados são escritos e, se o arquivo crescer, a cadeia é
+        estendida a partir do último bloco. Um deslocamento além do fim deixa
+        um trecho de zeros. Devolve quantos bytes foram gravados.
+        """
+        return self._escrever_em(nome, deslocamento, dados)
+
+    def _escrever_em(self, nome: str, deslocamento: int, dados: str) -> int:
+        """escrever_em sem métricas nem travas, para anexar não contar duas operações."""
+        if deslocamento < 0:
+            raise InvalidArgumentError("Deslocamento negativo.")
+        if nome not in self.diretorio_atual.entries:
+            self._criar_arquivo(nome)
+
+        no = self.nos[self.diretorio_atual.entries[nome]]
+        if no.is_dir:
+            raise IsDirectoryError(f"'{nome}' é um diretório.")
+
+        codificados = dados.encode('utf-8')
+        fim = deslocamento + len(codificados)
+        atuais = self._num_blocos(no)
+        faltando = (fim + self.tamanho_bloco - 1) // self.tamanho_bloco - atuais
+        ancora = (atuais - 1, no.last_block) if atuais else None
+        with self.espaco_livre.transaction():
+            if self.espaco_livre.free_count < faltando:
+                raise NoSpaceError("Espaço insuficiente em disco.")
+            self._registrar('escrever_em', self._absoluto(nome), deslocamento, dados)
+            self._crescer(no, faltando)
+        dados = codificados
+        if dados:
+            localizar = self._localizador(no, ancora if ancora and deslocamento >= ancora[0] * self.tamanho_bloco else None)
+            write_range(self.disco, self.tamanho_bloco, localizar, deslocamento, dados)
+        no.size = max(no.size, fim)
+        self._talvez_checkpoint()
+        return len(dados)
+
+    @measured
+    @locked('_travas_escrita')
+    def anexar(self, nome: str, dados: str) -> int:
+        """Anexa `dados` ao fim do arquivo; o custo depende só do tamanho de `dados`. Devolve os bytes gravados."""
+        if nome not in self.diretorio_atual.entries:
+            self._criar_arquivo(nome)
+        no = self.nos[self.diretorio_atual.entries[nome]]
+        return self._escrever_em(nome, no.size, dados)
+
+    @measured
+    @locked('_travas_escrita')
+    def truncar(self, nome: str, tamanho: int):
+        """Ajusta o tamanho do arquivo, liberando o fim da cadeia ou estendendo com zeros."""
+        if tamanho < 0:
+            raise InvalidArgumentError("Tamanho negativo.")
+        if nome not in self.diretorio_atual.entries:
+            raise NotFoundError(f"Arquivo '{nome}' não encontrado.")
+        no = self.nos[self.diretorio_atual.entries[nome]]
+        if no.is_dir:
+            raise IsDirectoryError(f"'{nome}' é um diretório.")
+
+        atuais = self._num_blocos(no)
+        novos = (tamanho + self.tamanho_bloco - 1) // self.tamanho_bloco
+        if novos > atuais:
+            with self.espaco_livre.transaction():
+                if self.espaco_livre.free_count < novos - atuais:
+                    raise NoSpaceError("Espaço insuficiente em disco.")
+                self._registrar('truncar', self._absoluto(nome), tamanho)
+                self._crescer(no, novos - atuais)
+        else:
+            self._registrar('truncar', self._absoluto(nome), tamanho)
+        if novos < atuais:
+            self.disposicao.remove(to_extents(self._cadeia(no.first_block)))
+            if novos == 0:
+                self._liberar_cadeia(no.first_block)
+                no.first_block = None
+                no.last_block = None
+            else:
+                ultimo = self.localizar_bloco(no, novos - 1)
+                self._liberar_cadeia(self.proximo[ultimo])
+                self.proximo[ultimo] = FIM
+                no.last_block = ultimo
+                self.disposicao.add(to_extents(self._cadeia(no.first_block)))
+            indice = self._indices.get(no.id)
+            if indice is not None:
+                del indice[(novos + SALTO_INDICE - 1) // SALTO_INDICE:]
+        resto = tamanho % self.tamanho_bloco
+        if tamanho < no.size and resto:
+            self.disco.write_at(no.last_block, resto, bytes(self.tamanho_bloco - resto))
+        no.size = tamanho
+        self._talvez_checkpoint()
+
+
+    @measured
+    @locked('_travas_leitura')
+    def ler_arquivo(self, nome: str) -> str:
+        """Conteúdo inteiro do arquivo como texto (para ler aos poucos, use abrir)."""
+        if nome not in self.diretorio_atual.entries:
+            raise NotFoundError(f"Arquivo '{nome}' não encontrado.")
         no_id = self.diretorio_atual.entries[nome]
         no = self.nos[no_id]
         if no.is_dir:
-            print(f"Erro: '{nome}' é um diretório.")
-            return
-        conteudo = ''
-        atual = no.first_block
-        while atual is not None:
-            conteudo += self.disco[atual]['data']
-            atual = self.disco[atual]['next']
-        print(f"Conteúdo de '{nome}' ({no.size} bytes):")
-        print(conteudo[:no.size])
+            raise IsDirectoryError(f"'{nome}' é um diretório.")
+        with self._abrir(nome) as handle:
+            return ''.join(handle.iter_text())
 
+    @measured
+    @locked('_travas_remocao')
     def deletar(self, nome: str):
         if nome not in self.diretorio_atual.entries:
-            print(f"Erro: '{nome}' não existe no diretório atual.")
-            return
+            raise NotFoundError(f"'{nome}' não existe no diretório atual.")
         no_id = self.diretorio_atual.entries[nome]
         no = self.nos[no_id]
         if no.is_dir:
             if no.entries:
-                print(f"Erro: Diretório '{nome}' não está vazio.")
-                return
-            del self.nos[no_id]
+                raise DirectoryNotEmptyError(f"Diretório '{nome}' não está vazio.")
+            self._registrar('deletar', self._absoluto(nome))
             del self.diretorio_atual.entries[nome]
-            print(f"Diretório '{nome}' excluído com sucesso.")
+            self._invalidar_caminhos(no)
+            del self.nos[no_id]
         else:
-            atual = no.first_block
-            while atual is not None:
-                prox = self.disco[atual]['next']
-                self.disco[atual] = {'data': '', 'next': None}
-                self.blocos_livres.append(atual)
-                atual = prox
+            self._registrar('deletar', self._absoluto(nome))
+            self._indices.pop(no.id, None)
+            self.disposicao.remove(self._liberar_cadeia(no.first_block))
             del self.nos[no_id]
             del self.diretorio_atual.entries[nome]
-            print(f"Arquivo '{nome}' excluído com sucesso.")
-            
-    def detalhes(self, nome: str):
+        self._talvez_checkpoint()
+
+    def _normalizar(self, caminho: str) -> str:
+        """Converte um caminho absoluto ou relativo ao diretório atual em absoluto."""
+        partes = [] if caminho.startswith("/") else [p for p in self.caminho_atual.split("/") if p]
+        for parte in caminho.split("/"):
+            if parte in ("", "."):
+                continue
+            if parte == "..":
+                if partes:
+                    partes.pop()
+                continue
+            partes.append(parte)
+        return "/" + "/".join(partes)
+
+    def _criar_diretorios(self, caminho: str):
+        """Devolve o diretório de `caminho` (absoluto), criando os que faltarem; None se um dos nomes for arquivo."""
+        atual = self.root
+        prefixo = ""
+        for parte in caminho.strip("/").split("/"):
+            if not parte:
+                continue
+            prefixo += "/" + parte
+            if parte in atual.entries:
+                atual = self.nos[atual.entries[parte]]
+                if not atual.is_dir:
+                    return None
+                continue
+            self._registrar('criar_diretorio', prefixo)
+            no = ListaEncadeada(parte, True)
+            no.parent = atual
+            self.nos.add(no)
+            atual.entries[parte] = no.id
+            atual = no
+        return atual
+
+    @measured
+    @exclusive
+    def escrever_varios(self, itens) -> dict:
+        """
+        Grava vários arquivos de uma vez a partir de pares (caminho, dados).
+        Arquivos existentes são sobrescritos e diretórios que faltarem são
+        criados. Todos os blocos do lote saem de uma única alocação, cada
+        arquivo é encadeado na sua fatia dela, os dados vão para o disco
+        extent a extent a partir de um buffer único e cada diretório recebe as
+        novas entradas de uma vez. Se não houver espaço para o lote inteiro,
+        nada é gravado.
+
+        Returns:
+            {'files', 'bytes', 'blocks', 'extents', 'dirs_created', 'errors': [(caminho, mensagem)]}
+        """
+        resultado = {'files': 0, 'bytes': 0, 'blocks': 0, 'extents': 0, 'dirs_created': 0, 'errors': []}
+        plano: Dict[str, Dict[str, str]] = {}
+        for caminho, dados in itens:
+            absoluto = self._normalizar(caminho)
+            if absoluto == "/":
+                resultado['errors'].append((caminho, "Caminho inválido."))
+                continue
+            caminho_pai, nome = absoluto.rsplit("/", 1)
+            plano.setdefault(caminho_pai or "/", {})[nome] = dados
+
+        grupos: Dict[str, list] = {}
+        necessarios = 0
+        liberados = 0
+        for caminho_pai, nomes in plano.items():
+            pai = self._resolver_caminho(caminho_pai)
+            entradas = pai.entries if pai is not None and pai.is_dir else {}
+            grupo = grupos[caminho_pai] = []
+            for nome, dados in nomes.items():
+                existente = self.nos[entradas[nome]] if nome in entradas else None
+                if existente is not None:
+                    if existente.is_dir:
+                        resultado['errors'].append((caminho_pai.rstrip("/") + "/" + nome, "É um diretório."))
+                        continue
+                    liberados += self._num_blocos(existente)
+                codificados = dados.encode('utf-8')
+                necessarios += (len(codificados) + self.tamanho_bloco - 1) // self.tamanho_bloco
+                grupo.append((nome, dados, codificados, existente))
+        if necessarios > self.espaco_livre.free_count + liberados:
+            resultado['errors'].append(("*", "Espaço insuficiente em disco."))
+            return resultado
+
+        arquivos = []
+        for caminho_pai, grupo in grupos.items():
+            antes = len(self.nos)
+            pai = self._criar_diretorios(caminho_pai)
+            resultado['dirs_created'] += len(self.nos) - antes
+            if pai is None:
+                resultado['errors'].extend((caminho_pai.rstrip("/") + "/" + nome, "Diretório pai inválido.")
+                                           for nome, _, _, _ in grupo)
+                continue
+            novas = {}
+            for nome, dados, codificados, no in grupo:
+                if no is None and nome in pai.entries:
+                    # Criado por _criar_diretorios neste mesmo lote.
+                    resultado['errors'].append((caminho_pai.rstrip("/") + "/" + nome, "É um diretório."))
+                    continue
+                self._registrar('escrever_arquivo', caminho_pai.rstrip("/") + "/" + nome, dados)
+                if no is None:
+                    no = ListaEncadeada(nome, False)
+                    no.parent = pai
+                    self.nos.add(no)
+                    novas[nome] = no.id
+                else:
+                    self._indices.pop(no.id, None)
+                    self.disposicao.remove(self._liberar_cadeia(no.first_block))
+                    no.first_block = None
+                    no.last_block = None
+                arquivos.append((no, codificados))
+            pai.entries.update(novas)
+
+        contagens = [(len(codificados) + self.tamanho_bloco - 1) // self.tamanho_bloco for _, codificados in arquivos]
+        extents = self.espaco_livre.allocate(sum(contagens)) if sum(contagens) else []
+        buffer = bytearray(sum(contagens) * self.tamanho_bloco)
+        deslocamento = 0
+        for (no, codificados), pedacos, contagem in zip(arquivos, split_extents(extents, contagens), contagens):
+            buffer[deslocamento:deslocamento + len(codificados)] = codificados
+            deslocamento += contagem * self.tamanho_bloco
+            no.size = len(codificados)
+            if pedacos:
+                self._encadear(pedacos)
+                self.disposicao.add(pedacos)
+                no.first_block = pedacos[0][0]
+                no.last_block = pedacos[-1][0] + pedacos[-1][1] - 1
+            resultado['bytes'] += len(codificados)
+        visao = memoryview(buffer)
+        deslocamento = 0
+        for inicio, tamanho in extents:
+            self.disco.write_extent(inicio, tamanho, visao[deslocamento:deslocamento + tamanho * self.tamanho_bloco])
+            deslocamento += tamanho * self.tamanho_bloco
+
+        resultado['files'] = len(arquivos)
+        resultado['blocks'] = sum(contagens)
+        resultado['extents'] = len(extents)
+        self._talvez_checkpoint()
+        return resultado
+
+    @measured
+    @exclusive
+    def deletar_varios(self, caminhos) -> dict:
+        """
+        Remove vários arquivos (ou diretórios que fiquem vazios no próprio
+        lote) de uma vez: os blocos de todas as cadeias são fundidos e
+        devolvidos ao espaço livre numa única passada.
+
+        Returns:
+            {'deleted', 'blocks_freed', 'errors': [(caminho, mensagem)]}
+        """
+        resultado = {'deleted': 0, 'blocks_freed': 0, 'errors': []}
+        plano: Dict[str, Dict[str, None]] = {}
+        for caminho in caminhos:
+            caminho_pai, nome = self._normalizar(caminho).rsplit("/", 1)
+            plano.setdefault(caminho_pai or "/", {})[nome] = None
+
+        vitimas = {}
+        # Os diretórios mais profundos primeiro, para que um diretório possa sair junto com o conteúdo.
+        for caminho_pai in sorted(plano, key=lambda p: p.count("/") if p != "/" else 0, reverse=True):
+            pai = self._resolver_caminho(caminho_pai)
+            entradas = pai.entries if pai is not None and pai.is_dir else {}
+            for nome in plano[caminho_pai]:
+                absoluto = caminho_pai.rstrip("/") + "/" + nome
+                if nome not in entradas:
+                    resultado['errors'].append((absoluto if nome else "/", "Não encontrado."))
+                    continue
+                no = self.nos[entradas[nome]]
+                if no is self.diretorio_atual:
+                    resultado['errors'].append((absoluto, "É o diretório atual."))
+                    continue
+                if no.is_dir and any(i not in vitimas for i in no.entries.values()):
+                    resultado['errors'].append((absoluto, "Diretório não está vazio."))
+                    continue
+                vitimas[no.id] = (absoluto, no)
+
+        extents = []
+        for absoluto, no in vitimas.values():
+            self._registrar('deletar', absoluto)
+            if no.is_dir:
+                self._invalidar_caminhos(no)
+            else:
+                self._indices.pop(no.id, None)
+                cadeia = to_extents(self._cadeia(no.first_block))
+                self.disposicao.remove(cadeia)
+                extents.extend(cadeia)
+            del no.parent.entries[no.name]
+            del self.nos[no.id]
+        extents = merge_extents(extents)
+        for inicio, tamanho in extents:
+            self.proximo.set_range(inicio, array('q', [FIM]) * tamanho)
+            self.disco.clear_extent(inicio, tamanho)
+        self.espaco_livre.free_extents(extents)
+
+        resultado['deleted'] = len(vitimas)
+        resultado['blocks_freed'] = sum(tamanho for _, tamanho in extents)
+        self._talvez_checkpoint()
+        return resultado
+
+    @measured
+    @locked('_travas_listagem')
+    def detalhes(self, nome: str) -> dict:
+        """
+        Returns:
+            {'id', 'name', 'is_dir'} mais 'entries' (nomes) num diretório ou
+            'size' e 'extents' (a cadeia agrupada) num arquivo
+        """
         if nome not in self.diretorio_atual.entries:
-            print(f"Erro: '{nome}' não encontrado.")
-            return
+            raise NotFoundError(f"'{nome}' não encontrado.")
 
         no_id = self.diretorio_atual.entries[nome]
         no = self.nos[no_id]
 
-        print(f"ID: {no.id}")
-        print(f"Nome: {no.name}")
-        print(f"Diretório: {'Sim' if no.is_dir else 'Não'}")
-
+        resultado = {'id': no.id, 'name': no.name, 'is_dir': no.is_dir}
         if no.is_dir:
-            print(f"Entradas: {list(no.entries.keys())}")
+            resultado['entries'] = list(no.entries.keys())
         else:
-            print(f"Tamanho: {no.size} bytes")
-            blocos = []
-            atual = no.first_block
-            while atual is not None:
-                blocos.append(atual)
-                atual = self.disco[atual]['next']
-            print(f"Blocos alocados: {blocos}")
-
-    def status(self):
-        total_blocos = TOTAL_BLOCKS
-        livres = len(self.blocos_livres)
-        usados = total_blocos - livres
-
-        arquivos = sum(1 for n in self.nos.values() if not n.is_dir)
-        diretorios = sum(1 for n in self.nos.values() if n.is_dir)
-
-        print("\n=== STATUS DO SISTEMA DE ARQUIVOS (lista encadeada) ===")
-        print(f"Blocos totais: {total_blocos}")
-        print(f"Blocos usados: {usados}")
-        print(f"Blocos livres: {livres}")
-        print(f"Arquivos: {arquivos}")
-        print(f"Diretórios: {diretorios}")
-        print("Uso por arquivo:")
-        for n in self.nos.values():
-            if not n.is_dir:
-                blocos = []
-                atual = n.first_block
-                while atual is not None:
-                    blocos.append(atual)
-                    atual = self.disco[atual]['next']
-                print(f"  - {n.name}: {blocos} ({n.size} bytes)")
-
-
-def benchmark_inode_access_linked_list(fs: SistemaArquivos, file_name: str, k: int) -> float:
-    """Mede o tempo para acessar o bloco k de um arquivo via lista encadeada no SistemaArquivos."""
+            resultado.update(size=no.size, extents=to_extents(self._cadeia(no.first_block)))
+        return resultado
+
+    def _arquivos_desfrag(self):
+        return [no.id for no in self.nos.values() if not no.is_dir]
+
+    def _extents_desfrag(self, numero: int):
+        no = self.nos.get(numero)
+        if no is None or no.is_dir:
+            return None
+        if self._concurrency is not None and not self._concurrency.idle(numero):
+            return None
+        return to_extents(self._cadeia(no.first_block))
+
+    def _realocar(self, numero: int, extents: list, destinos: list):
+        """
+        Move cada trecho i da cadeia para começar em destinos[i], copiando os
+        payloads pelo cache e refazendo só os ponteiros dos trechos movidos e
+        dos que apontam para eles.
+        """
+        no = self.nos[numero]
+        movidos = [i for i, ((inicio, _), destino) in enumerate(zip(extents, destinos)) if inicio != destino]
+        dados = [self.disco.read_extent(*extents[i]) for i in movidos]
+        if self.diario is not None:
+            # A imagem só conhece a cadeia do último checkpoint: cada registro
+            # leva os bytes movidos, que a reaplicação regrava no mesmo
+            # deslocamento do arquivo, onde quer que os blocos estejam.
+            caminho = self._caminho_de(no)
+            posicoes = list(accumulate((tamanho for _, tamanho in extents), initial=0))
+            for i, payload in zip(movidos, dados):
+                deslocamento = posicoes[i] * self.tamanho_bloco
+                trecho = bytes(payload[:max(0, no.size - deslocamento)])
+                if trecho:
+                    self._registrar('realocar', caminho, deslocamento, trecho)
+        self.disposicao.remove(extents)
+        self._indices.pop(no.id, None)
+        liberados = [extents[i] for i in movidos]
+        for inicio, tamanho in liberados:
+            self.proximo.set_range(inicio, array('q', [FIM]) * tamanho)
+            self.disco.clear_extent(inicio, tamanho)
+        self.espaco_livre.free_extents(liberados)
+        novos = [(destino, tamanho) for (_, tamanho), destino in zip(extents, destinos)]
+        for i, payload in zip(movidos, dados):
+            destino, tamanho = novos[i]
+            self.espaco_livre.reserve(destino, tamanho)
+            self.disco.write_extent(destino, tamanho, payload)
+            self.proximo.set_range(destino, array('q', range(destino + 1, destino + tamanho + 1)))
+            self.proximo[destino + tamanho - 1] = novos[i + 1][0] if i + 1 < len(novos) else FIM
+            if i:
+                anterior, tamanho_anterior = novos[i - 1]
+                self.proximo[anterior + tamanho_anterior - 1] = destino
+        no.first_block = novos[0][0]
+        no.last_block = novos[-1][0] + novos[-1][1] - 1
+        self.disposicao.add(novos)
+
+    @measured
+    @exclusive
+    def desfragmentar(self, max_blocos: int = None, max_ms: float = None) -> dict:
+        """
+        Desfragmenta aos poucos (entity.defrag.Defragmenter): copia blocos até
+        `max_blocos` blocos ou `max_ms` ms e, na chamada seguinte, continua de
+        onde parou. Sem orçamento vai até o fim: cada cadeia num trecho
+        contíguo só, se couber, e o espaço livre num trecho só no fim do
+        disco. Arquivos abertos no modo concorrente ficam onde estão. Com uma
+        imagem montada, a chamada termina com um checkpoint; com diário, cada
+        movimento antes disso é registrado com os bytes movidos.
+
+        Returns:
+            {'moves', 'moved_blocks', 'seconds', 'done', 'before', 'after'},
+            com a fragmentation() de antes e de depois
+        """
+        antes = fragmentation(self.disposicao, self.espaco_livre)
+        resultado = self._desfragmentador.run(max_blocos, max_ms)
+        if resultado['moves'] and self.imagem is not None:
+            self._checkpoint()
+        resultado.update(before=antes, after=fragmentation(self.disposicao, self.espaco_livre))
+        return resultado
+
+    def _checkpoint(self) -> int:
+        """
+        Confirma o diário, grava blocos sujos e metadados na imagem com o lsn
+        do último registro e esvazia o diário. Devolve as páginas gravadas.
+        """
+        lsn = None
+        if self.diario is not None:
+            self.diario.commit()
+            lsn = self.diario.next_lsn - 1
+        self.disco.flush()
+        paginas = self.imagem.sync(self._serializar_metadados(), lsn)
+        if self.diario is not None:
+            self.diario.reset()
+            self._desde_checkpoint = 0
+        return paginas
+
+    @measured
+    @exclusive
+    def sincronizar(self):
+        """
+        Grava no dispositivo os blocos sujos do cache e, com uma imagem
+        montada, faz um checkpoint: páginas sujas e metadados vão para o
+        arquivo. Devolve as páginas de dados gravadas na imagem (None sem imagem).
+        """
+        if self.imagem is None:
+            self.disco.flush()
+            return None
+        return self._checkpoint()
+
+    @exclusive
+    def desmontar(self):
+        """
+        Sincroniza e fecha a imagem montada (e o diário). O cache é esvaziado,
+        então ler ou gravar dados depois disso levanta NotMountedError.
+        """
+        if self.imagem is None:
+            raise NotMountedError("Nenhuma imagem montada.")
+        self.sincronizar()
+        self.disco.drop()
+        if self.diario is not None:
+            self.diario.close()
+            self.diario = None
+            self.disco.before_writeback = None
+        self.imagem.close()
+        self.imagem = None
+
+    def status(self) -> dict:
+        """
+        Retrato do sistema, com as mesmas chaves de FileSystem.status (a
+        memória materializada inclui a tabela de ponteiros).
+        """
+        livres = self.espaco_livre.free_count
+        arquivos = [n for n in self.nos.values() if not n.is_dir]
+        diario = dict(self.diario.stats(), mode=self.diario.mode) if self.diario is not None else None
+        return {
+            'backend': 'lista encadeada',
+            'total_blocks': self.total_blocos,
+            'used_blocks': self.total_blocos - livres,
+            'free_blocks': livres,
+            'files': len(arquivos),
+            'dirs': len(self.nos) - len(arquivos),
+            'materialized_bytes': self.disco.materialized_bytes() + self.proximo.materialized_bytes(),
+            'policy': self.espaco_livre.policy.name,
+            'layout': fragmentation(self.disposicao, self.espaco_livre),
+            'cache': self.disco.stats(),
+            'journal': diario,
+            'usage': [(n.name, to_extents(self._cadeia(n.first_block)), n.size) for n in arquivos],
+        }
+
+    def metricas(self) -> dict:
+        """
+        Métricas desde a criação: {'ops': Metrics.snapshot(), 'io': contadores
+        do cache e do dispositivo, 'allocator': contadores do mapa livre}.
+        """
+        return {'ops': self.metrics.snapshot(), 'io': self.disco.stats(), 'allocator': self.espaco_livre.stats()}
+
+    @exclusive
+    def verificar_invariantes(self) -> list:
+        """
+        Confere a consistência do sistema e devolve a lista de problemas (vazia
+        se estiver tudo certo): nenhum bloco está em duas cadeias, blocos de
+        arquivos não estão no mapa livre, cada cadeia tem o tamanho do arquivo
+        e termina em last_block, usados + livres fecham o total e cada entrada
+        de diretório aponta para um nó que a reconhece.
+        """
+        problemas = []
+        donos: Dict[int, int] = {}
+        for no in self.nos.values():
+            if no.parent is not None and no.parent.entries.get(no.name) != no.id:
+                problemas.append(f"Nó {no.id} ('{no.name}') fora do diretório pai.")
+            if no.is_dir:
+                for nome, numero in no.entries.items():
+                    if numero not in self.nos or self.nos[numero].parent is not no:
+                        problemas.append(f"Entrada '{nome}' do nó {no.id} aponta para o nó {numero}.")
+                continue
+            cadeia = []
+            for bloco in self._cadeia(no.first_block):
+                if bloco in donos:
+                    problemas.append(f"Bloco {bloco} está nas cadeias dos arquivos {donos[bloco]} e {no.id}.")
+                    break
+                donos[bloco] = no.id
+                cadeia.append(bloco)
+                if self.espaco_livre.is_free(bloco):
+                    problemas.append(f"Bloco {bloco} do arquivo {no.id} está no mapa livre.")
+            if len(cadeia) != self._num_blocos(no):
+                problemas.append(f"Arquivo {no.id} ('{no.name}') tem {len(cadeia)} blocos para {no.size} bytes.")
+            if (cadeia[-1] if cadeia else None) != no.last_block:
+                problemas.append(f"Arquivo {no.id} ('{no.name}') não termina em last_block.")
+        if len(donos) != self.total_blocos - self.espaco_livre.free_count:
+            problemas.append(f"{len(donos)} blocos em cadeias, mas "
+                             f"{self.total_blocos - self.espaco_livre.free_count} marcados como usados.")
+        return problemas
+
+
+def benchmark_inode_access_linked_list(fs: SistemaArquivos, file_name: str, k: int, cold: bool = False) -> dict:
+    """
+    Mede o acesso ao bloco k de um arquivo via lista encadeada no
+    SistemaArquivos. Com `cold`, o cache de blocos é esvaziado antes de cada
+    acesso (um acesso por amostra).
+
+    Returns:
+        Resultado de bench.measure (NotFoundError, IsDirectoryError ou
+        InvalidArgumentError se o arquivo ou o bloco não existir)
+    """
     if file_name not in fs.diretorio_atual.entries:
-        print(f"Arquivo '{file_name}' não encontrado no diretório atual.")
-        return -1
+        raise NotFoundError(f"Arquivo '{file_name}' não encontrado no diretório atual.")
 
     no_id = fs.diretorio_atual.entries[file_name]
     no = fs.nos[no_id]
 
     if no.is_dir:
-        print(f"'{file_name}' é um diretório, não um arquivo.")
-        return -1
-
-    start = time.perf_counter()
-    atual = no.first_block
-    indice = 0
-    while atual is not None and indice < k:
-        atual = fs.disco[atual]['next']
-        indice += 1
+        raise IsDirectoryError(f"'{file_name}' é um diretório, não um arquivo.")
 
-    if atual is None:
-        print(f"Bloco {k} fora do intervalo do arquivo.")
-        return -1
+    # Também constrói, fora da medição, o índice de saltos do modo 'indexado'.
+    if fs.localizar_bloco(no, k) is None:
+        raise InvalidArgumentError(f"Bloco {k} fora do intervalo do arquivo.")
 
-    bloco = fs.disco[atual]
-    end = time.perf_counter()
+    def acessar(_=None):
+        fs.disco.read_block(fs.localizar_bloco(no, k))
 
+    if cold:
+        return measure(acessar, setup=lambda n: [fs.disco.drop()], inner=1)
+    return measure(acessar)
 
-    return (end - start) * 1000
+def benchmark_move_linked_list(fs: SistemaArquivos, nome_arquivo: str, destino: str,
+                               repeticoes: int = REPETICOES) -> dict:
+    """
+    Mede SistemaArquivos.mover de um arquivo do diretório atual para
+    `destino` (resolução e validação incluídas). Cada chamada medida move o
+    arquivo para o outro lado, e no fim ele fica em `destino`.
 
-import time
-
-def benchmark_move_linked_list(fs: SistemaArquivos, nome_arquivo: str, destino: str) -> float:
+    Returns:
+        Resultado de bench.measure (tempo por mover); um movimento inválido
+        levanta o mesmo erro que SistemaArquivos.mover
+    """
     if nome_arquivo not in fs.diretorio_atual.entries:
-        print(f"Arquivo '{nome_arquivo}' não encontrado no diretório atual.")
-        return -1
+        raise NotFoundError(f"Arquivo '{nome_arquivo}' não encontrado no diretório atual.")
 
     no_id = fs.diretorio_atual.entries[nome_arquivo]
     no = fs.nos[no_id]
 
     if no.is_dir:
-        print(f"'{nome_arquivo}' é um diretório, não um arquivo.")
-        return -1
-
-    if destino == "/":
-        destino_dir = fs.root
-    elif destino in fs.diretorio_atual.entries:
-        destino_id = fs.diretorio_atual.entries[destino]
-        destino_dir = fs.nos[destino_id]
-    elif fs.diretorio_atual.parent and destino in fs.diretorio_atual.parent.entries:
-        destino_id = fs.diretorio_atual.parent.entries[destino]
-        destino_dir = fs.nos[destino_id]
-    else:
-        print(f"Diretório de destino '{destino}' inválido.")
-        return -1
+        raise IsDirectoryError(f"'{nome_arquivo}' é um diretório, não um arquivo.")
 
+    destino_dir = fs._resolver_caminho(destino)
     if not destino_dir or not destino_dir.is_dir:
-        print(f"Diretório de destino '{destino}' inválido.")
-        return -1
+        raise NotFoundError(f"Diretório de destino '{destino}' inválido.")
 
     if nome_arquivo in destino_dir.entries:
-        print(f"Já existe '{nome_arquivo}' em '{destino}'.")
-        return -1
+        raise AlreadyExistsError(f"Já existe '{nome_arquivo}' em '{destino}'.")
+
+    origem = fs.caminho_atual
+    lados = [origem, fs._caminho_de(destino_dir)]
 
-    start = time.perf_counter()
-    del fs.diretorio_atual.entries[nome_arquivo]
-    destino_dir.entries[nome_arquivo] = no_id
-    no.parent = destino_dir
-    end = time.perf_counter()
+    def mover():
+        fs.mover(lados[0].rstrip("/") + "/" + nome_arquivo, lados[1])
+        lados.reverse()
 
-    return (end - start) * 1000
+    resultado = measure(mover, repeat=repeticoes)
+    if lados[0] == origem:
+        with quiet():
+            mover()
+    return resultado
 
-def benchmark_linked_delete(fs: SistemaArquivos, file_name: str) -> float:
-    """Mede o tempo para excluir um arquivo usando a estratégia de alocação encadeada."""
+def benchmark_linked_delete(fs: SistemaArquivos, file_name: str, repeticoes: int = REPETICOES) -> dict:
+    """
+    Mede o tempo para excluir um arquivo usando a estratégia de alocação
+    encadeada. As exclusões medidas são de cópias do mesmo tamanho, criadas
+    fora da medição; no fim o próprio arquivo é excluído.
+
+    Returns:
+        Resultado de bench.measure por exclusão (NotFoundError se o arquivo não existir)
+    """
     if file_name not in fs.diretorio_atual.entries:
-        print(f"Arquivo '{file_name}' não encontrado.")
-        return -1
+        raise NotFoundError(f"Arquivo '{file_name}' não encontrado.")
 
-    start = time.perf_counter()
-    fs.deletar(file_name)
-    end = time.perf_counter()
+    dados = "x" * fs.nos[fs.diretorio_atual.entries[file_name]].size
 
-    return (end - start) * 1000
+    def copias(n: int) -> list:
+        nomes = [f"{file_name}.{i}" for i in range(n)]
+        for nome in nomes:
+            fs.escrever_arquivo(nome, dados)
+        return nomes
 
-def benchmark_write_file_linked_list(fs: 'SistemaArquivos', file_name: str, data_size: int, repetitions: int = 10) -> dict:
-    def generate_random_data(size):
-        return ''.join(random.choice(string.ascii_letters) for _ in range(size))
+    resultado = measure(fs.deletar, setup=copias, repeat=repeticoes)
+    with quiet():
+        fs.deletar(file_name)
+    return resultado
 
-    results = {
-        'file_size': data_size,
-        'write_times': [],
-        'average_time': 0,
-        'min_time': float('inf'),
-        'max_time': 0,
-        'blocks_used': 0,
-        'fragmentation': 0.0
-    }
+def benchmark_write_file_linked_list(fs: 'SistemaArquivos', file_name: str, data_size: int,
+                                     repetitions: int = REPETICOES) -> dict:
+    """
+    Mede o tempo de escrita de um arquivo novo de determinado tamanho; cada
+    escrita medida cria um arquivo com prefixo `file_name`.
 
-    total_blocos = getattr(fs, 'TOTAL_BLOCKS', 10000)  
+    Returns:
+        Resultado de bench.measure por escrita, mais 'file_size', 'blocks_used',
+        'extents' e 'average_gap' (salto médio entre extents, em blocos) de um
+        dos arquivos escritos
+    """
+    data = payload(data_size)
+    escritos = []
 
-    if file_name in fs.diretorio_atual.entries:
-        fs.deletar(file_name)
+    def nomes(n: int) -> list:
+        # Os arquivos da amostra anterior são removidos aqui, fora da medição.
+        for nome in escritos:
+            fs.deletar(nome)
+        escritos[:] = [f"{file_name}.{i}" for i in range(n)]
+        return escritos
 
-    data = generate_random_data(data_size)
+    results = measure(lambda nome: fs.escrever_arquivo(nome, data), setup=nomes, repeat=repetitions)
+    no = fs.nos[fs.diretorio_atual.entries[escritos[0]]]
+    blocos = list(fs._cadeia(no.first_block))
+    arquivo = LayoutStats()
+    arquivo.add(to_extents(blocos))
+    results['file_size'] = data_size
+    results['blocks_used'] = len(blocos)
+    results['extents'] = arquivo.runs
+    results['average_gap'] = arquivo.stats()['average_gap']
+    with quiet():
+        for nome in escritos:
+            fs.deletar(nome)
+    return results
 
-    for _ in range(repetitions):
-        try:
+def benchmark_memoria_por_arquivo(num_arquivos: int = 100000) -> dict:
+    """
+    Compara, com tracemalloc, os bytes por arquivo da tabela de nós atual
+    (números inteiros e __slots__) com a representação anterior: ids uuid em
+    str, um __dict__ por nó e um dicionário indexado por str.
+
+    Returns:
+        Dicionário com os bytes por arquivo antes e depois
+    """
+    import tracemalloc
+    import uuid
+
+    class NoAntigo:
+        def __init__(self, name, is_dir):
+            self.id = str(uuid.uuid4())
+            self.name = name
+            self.is_dir = is_dir
+            self.size = 0
+            self.first_block = None
+            self.entries = {} if is_dir else None
+            self.parent = None
+
+    def antes():
+        nos = {}
+        root = NoAntigo("/", True)
+        nos[root.id] = root
+        for i in range(num_arquivos):
+            no = NoAntigo(f"f{i}", False)
+            no.parent = root
+            nos[no.id] = no
+            root.entries[no.name] = no.id
+        return nos
+
+    def depois():
+        fs = SistemaArquivos()
+        for i in range(num_arquivos):
+            fs.criar_arquivo(f"f{i}")
+        return fs
+
+    resultados = {'files': num_arquivos}
+    for nome, construir in (('before', antes), ('after', depois)):
+        tracemalloc.start()
+        inicio = tracemalloc.get_traced_memory()[0]
+        estrutura = construir()
+        fim = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del estrutura
+        resultados[nome] = (fim - inicio) / num_arquivos
+    return resultados
+
+def benchmark_anexar_linked_list(fs: SistemaArquivos, nome_arquivo: str, tamanho_pedaco: int = 64,
+                                 total_anexos: int = 20000, amostras: int = 5) -> dict:
+    """
+    Mede o custo de anexar conforme o arquivo cresce: os anexos são divididos
+    em `amostras` janelas e cada uma é medida à parte.
+
+    Returns:
+        Dicionário {tamanho do arquivo ao fim da janela (bytes): resultado de bench.measure por anexo}
+    """
+    dados = payload(tamanho_pedaco)
+    por_amostra = total_anexos // amostras
+    repeticoes = min(REPETICOES, por_amostra)
+    resultados = {}
+    for _ in range(amostras):
+        r = measure(lambda: fs.anexar(nome_arquivo, dados), repeat=repeticoes, warmup=0,
+                    inner=por_amostra // repeticoes)
+        resultados[fs.nos[fs.diretorio_atual.entries[nome_arquivo]].size] = r
+    return resultados
+
+
+def benchmark_diario(tamanho_grupo: int = GROUP_SIZE, repeticoes: int = REPETICOES) -> dict:
+    """
+    Mede a vazão de criação + remoção de um arquivo numa imagem montada em
+    cada modo de diário ('off', 'per-op' e 'group').
+
+    Returns:
+        Dicionário {modo: resultado de bench.measure por par criação + remoção,
+        mais 'ops_per_s' (pela mediana) e 'commits' (fsyncs do diário)}
+    """
+    import tempfile
+
+    def par(fs: SistemaArquivos):
+        fs.criar_arquivo("f")
+        fs.deletar("f")
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        for modo in MODOS_DIARIO:
+            with quiet():
+                fs = SistemaArquivos.montar(os.path.join(pasta, f"{modo}.img"), total_blocos=100000,
+                                            diario=modo, tamanho_grupo=tamanho_grupo)
+            r = measure(lambda: par(fs), repeat=repeticoes)
+            with quiet():
+                if fs.diario is not None:
+                    fs.diario.commit()
+                r['commits'] = fs.diario.commits if fs.diario is not None else 0
+                fs.desmontar()
+            r['ops_per_s'] = 2000 / r['median_ms']
+            resultados[modo] = r
+    return resultados
+
+
+def benchmark_concorrencia(quantidades_threads=(1, 2, 4, 8), ops_por_thread: int = 2000, diretorios: int = 4,
+                           arquivos_por_diretorio: int = 16, tamanho_arquivo: int = 256,
+                           fracao_leituras: float = 0.5, semente: int = 0, modo_acesso: str = 'encadeado') -> dict:
+    """
+    Teste de carga do modo concorrente: para cada quantidade de threads, um
+    único SistemaArquivos(concorrente=True) recebe `ops_por_thread` operações
+    por thread, cada uma com a sua sessão. Leituras abrem um arquivo qualquer
+    e conferem que ele está inteiro (uma letra só, como cada escrita grava,
+    mais os zeros de um truncar que estendeu); escritas reescrevem, truncam
+    ou removem arquivos do diretório da thread. No fim os invariantes do
+    sistema são conferidos.
+
+    Returns:
+        Dicionário {threads: {'ops_per_s', 'torn_reads', 'problems'}}
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def trabalhador(fs: SistemaArquivos, indice: int) -> int:
+        rng = random.Random(semente * 1000 + indice)
+        rasgadas = 0
+        with fs.sessao():
+            fs.mudar_diretorio(f"d{indice % diretorios}")
+            for _ in range(ops_por_thread):
+                # Arquivos sorteados podem não existir (ou o disco pode encher): o erro faz parte da carga.
+                with contextlib.suppress(FileSystemError):
+                    if rng.random() < fracao_leituras:
+                        with fs.abrir(f"/d{rng.randrange(diretorios)}/f{rng.randrange(arquivos_por_diretorio)}") as handle:
+                            if len(set(handle.read()) - {0}) > 1:
+                                rasgadas += 1
+                        continue
+                    nome = f"f{rng.randrange(arquivos_por_diretorio)}"
+                    sorteio = rng.random()
+                    if sorteio < 0.7:
+                        fs.escrever_arquivo(nome, rng.choice("abcdefgh") * rng.randrange(1, tamanho_arquivo))
+                    elif sorteio < 0.85:
+                        fs.truncar(nome, rng.randrange(tamanho_arquivo))
+                    else:
+                        fs.deletar(nome)
+        return rasgadas
+
+    resultados = {}
+    for threads in quantidades_threads:
+        fs = SistemaArquivos(total_blocos=diretorios * arquivos_por_diretorio * tamanho_arquivo,
+                             modo_acesso=modo_acesso, concorrente=True)
+        for d in range(diretorios):
+            fs.criar_diretorio(f"d{d}")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            rasgadas = sum(pool.map(lambda i: trabalhador(fs, i), range(threads)))
+        end = time.perf_counter()
+        resultados[threads] = {
+            'ops_per_s': threads * ops_por_thread / (end - start),
+            'torn_reads': rasgadas,
+            'problems': fs.verificar_invariantes(),
+        }
+    return resultados
+
+
+def _envelhecer(fs: SistemaArquivos, rng, operacoes: int, ocupacao: float, max_blocos_arquivo: int) -> list:
+    """
+    Envelhece o disco com uma sequência sorteada de escritas, anexos e
+    remoções (de 1 a `max_blocos_arquivo` blocos, tamanhos log-uniformes)
+    que o mantém perto de `ocupacao` cheio. Devolve os arquivos que sobraram.
+    """
+    import math
+
+    limite = int(fs.total_blocos * ocupacao)
+    vivos = []
+    for i in range(operacoes):
+        blocos = int(math.exp(rng.uniform(0, math.log(max_blocos_arquivo))))
+        sorteio = rng.random()
+        while vivos and (fs.total_blocos - fs.espaco_livre.free_count + blocos > limite):
+            fs.deletar(vivos.pop(rng.randrange(len(vivos))))
+        if sorteio < 0.6 or not vivos:
+            vivos.append(f"f{i}")
+            fs.escrever_arquivo(vivos[-1], "x" * (blocos * fs.tamanho_bloco))
+        elif sorteio < 0.85:
+            fs.anexar(rng.choice(vivos), "y" * (max(1, blocos // 4) * fs.tamanho_bloco))
+        else:
+            fs.deletar(vivos.pop(rng.randrange(len(vivos))))
+    return vivos
+
+
+def _leitura_fria(fs: SistemaArquivos, nomes: list) -> dict:
+    """Lê todos os arquivos em sequência com o cache frio: {'seconds', 'bytes', 'seeks'}."""
+    fs.disco.drop()
+    buscas = fs.dispositivo.seeks
+    lidos = 0
+    inicio = time.perf_counter()
+    for nome in nomes:
+        with fs.abrir(nome) as handle:
+            for pedaco in handle.chunks():
+                lidos += len(pedaco)
+    return {'seconds': time.perf_counter() - inicio, 'bytes': lidos, 'seeks': fs.dispositivo.seeks - buscas}
+
+
+def benchmark_alocacao(politicas=None, total_blocos: int = 1 << 16, operacoes: int = 20000,
+                       ocupacao: float = 0.8, max_blocos_arquivo: int = 512, semente: int = 0) -> dict:
+    """
+    Compara as políticas de alocação num disco envelhecido: a mesma
+    sequência sorteada de escritas, anexos e remoções (de 1 a
+    `max_blocos_arquivo` blocos, com tamanhos log-uniformes) mantém o disco
+    perto de `ocupacao` cheio por `operacoes` operações. Mede a vazão do
+    envelhecimento, a fragmentação que sobra e a localidade de uma leitura
+    fria de todos os arquivos (buscas do dispositivo por arquivo).
+
+    Returns:
+        Dicionário {política: {'ops_per_s', 'extents_per_file', 'average_gap',
+        'largest_free', 'free_extents', 'seeks_per_file'}}
+    """
+    from entity.allocation import POLICIES
+
+    resultados = {}
+    for politica in politicas or POLICIES:
+        fs = SistemaArquivos(total_blocos=total_blocos, alocador=politica)
+        with quiet():
             start = time.perf_counter()
-            fs.escrever_arquivo(file_name, data)
+            vivos = _envelhecer(fs, random.Random(semente), operacoes, ocupacao, max_blocos_arquivo)
             end = time.perf_counter()
-            write_time = (end - start) * 1000
-            results['write_times'].append(write_time)
-
-            results['min_time'] = min(results['min_time'], write_time)
-            results['max_time'] = max(results['max_time'], write_time)
-
-            no_id = fs.diretorio_atual.entries[file_name]
-            no = fs.nos[no_id]
-
-            blocos = []
-            if hasattr(no, 'data_blocks'):  
-                blocos = no.data_blocks
-            elif hasattr(no, 'first_block'):  
-                atual = no.first_block
-                while atual is not None:
-                    blocos.append(atual)
-                    if isinstance(fs.disco, (list, dict)) and len(fs.disco) > atual:
-                        proximo = fs.disco[atual].get('proximo', 
-                                    fs.disco[atual].get('next', None))
-                        atual = proximo
-                    else:
-                        break
+            leitura = _leitura_fria(fs, vivos)
+        frag = fragmentation(fs.disposicao, fs.espaco_livre)
+        resultados[politica] = {
+            'ops_per_s': operacoes / (end - start),
+            'extents_per_file': frag['extents_per_file'],
+            'average_gap': frag['average_gap'],
+            'largest_free': frag['largest_free'],
+            'free_extents': frag['free_extents'],
+            'seeks_per_file': leitura['seeks'] / len(vivos) if vivos else 0.0,
+        }
+    return resultados
 
-            results['blocks_used'] = len(blocos)
 
-            if len(blocos) > 1:
-                distancias = [abs(blocos[i+1] - blocos[i]) for i in range(len(blocos)-1)]
-                results['fragmentation'] = sum(distancias) / len(distancias) / total_blocos
+def benchmark_desfragmentar(total_blocos: int = 1 << 16, operacoes: int = 20000, ocupacao: float = 0.8,
+                            max_blocos_arquivo: int = 512, blocos_por_chamada: int = 4096,
+                            latencia_us: float = 20.0, busca_us: float = 200.0, linhas_cache: int = 16,
+                            alocador='size-class', semente: int = 0) -> dict:
+    """
+    Envelhece um disco como benchmark_alocacao e mede uma leitura fria de
+    todos os arquivos antes e depois de desfragmentá-lo em chamadas de até
+    `blocos_por_chamada` blocos. As leituras passam por um cache de
+    `linhas_cache` linhas e um dispositivo com `latencia_us` por acesso e
+    `busca_us` por busca, ligados só depois do envelhecimento.
 
-        except Exception as e:
-            print(f"Erro durante benchmark: {str(e)}")
-            continue
-        finally:
-            if file_name in fs.diretorio_atual.entries:
-                fs.deletar(file_name)
+    Returns:
+        {'before', 'after': fragmentation() mais 'read_mb_per_s' e
+        'seeks_per_file'; 'calls', 'moved_blocks', 'max_pause_ms', 'problems'}
+    """
+    fs = SistemaArquivos(total_blocos=total_blocos, linhas_cache=linhas_cache, alocador=alocador)
+    with quiet():
+        vivos = _envelhecer(fs, random.Random(semente), operacoes, ocupacao, max_blocos_arquivo)
+        fs.dispositivo.access_us, fs.dispositivo.seek_us = latencia_us, busca_us
+
+        def retrato() -> dict:
+            leitura = _leitura_fria(fs, vivos)
+            return dict(fragmentation(fs.disposicao, fs.espaco_livre),
+                        read_mb_per_s=leitura['bytes'] / leitura['seconds'] / 1e6,
+                        seeks_per_file=leitura['seeks'] / len(vivos) if vivos else 0.0)
+
+        antes = retrato()
+        chamadas = blocos = 0
+        pausas = []
+        while True:
+            r = fs.desfragmentar(max_blocos=blocos_por_chamada)
+            chamadas += 1
+            blocos += r['moved_blocks']
+            pausas.append(r['seconds'] * 1000)
+            if r['done']:
+                break
+        depois = retrato()
+    return {'before': antes, 'after': depois, 'calls': chamadas, 'moved_blocks': blocos,
+            'max_pause_ms': max(pausas), 'problems': fs.verificar_invariantes()}
+
+
+def benchmark_metricas(tamanho_arquivo: int = 1024, arquivos: int = 100, rodadas: int = 5,
+                       repeticoes: int = 20) -> dict:
+    """
+    Custo das métricas sempre ligadas: a mesma mistura de operações
+    (mudar_diretorio, escrever_arquivo, ler_arquivo, criar_arquivo e
+    deletar sobre `arquivos` arquivos de `tamanho_arquivo` bytes) medida com
+    fs.metrics.enabled ligado e desligado, alternando `rodadas` vezes.
+
+    Returns:
+        {'on', 'off': bench.measure por mistura (a rodada de menor mediana),
+        'overhead_pct': diferença entre as duas medianas}
+    """
+    fs = SistemaArquivos()
+    dados = "x" * tamanho_arquivo
+    nomes = [f"f{i}" for i in range(arquivos)]
+    proximo = iter(range(1 << 62))
+    with quiet():
+        fs.criar_diretorio("dados")
+        fs.mudar_diretorio("dados")
+        for nome in nomes:
+            fs.escrever_arquivo(nome, dados)
+        fs.mudar_diretorio("..")
 
-    if results['write_times']:
-        results['average_time'] = sum(results['write_times']) / len(results['write_times'])
-    else:
-        results['average_time'] = 0
+    def mistura():
+        nome = nomes[next(proximo) % arquivos]
+        fs.mudar_diretorio("dados")
+        fs.escrever_arquivo(nome, dados)
+        fs.ler_arquivo(nome)
+        fs.criar_arquivo("tmp")
+        fs.deletar("tmp")
+        fs.mudar_diretorio("..")
 
-    return results
\ No newline at end of file
+    melhores = {}
+    for _ in range(rodadas):
+        for ligado in (True, False):
+            fs.metrics.enabled = ligado
+            r = measure(mistura, repeat=repeticoes)
+            if ligado not in melhores or r['median_ms'] < melhores[ligado]['median_ms']:
+                melhores[ligado] = r
+    fs.metrics.enabled = True
+    return {'on': melhores[True], 'off': melhores[False],
+            'overhead_pct': (melhores[True]['median_ms'] / melhores[False]['median_ms'] - 1) * 100}
@@ -0,0 +1,314 @@
+import struct
+from array import array
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, Tuple
+from entity.allocation import make_policy
+from entity.errors import NoSpaceError
+
+BITMAP_PAGE = 65536
+
+
+def to_extents(blocks: Iterable[int]) -> List[Tuple[int, int]]:
+    """Agrupa uma sequência de blocos em extents (inicio, tamanho) consecutivos."""
+    extents = []
+    start = None
+    length = 0
+    for b in blocks:
+        if start is not None and b == start + length:
+            length += 1
+            continue
+        if start is not None:
+            extents.append((start, length))
+        start = b
+        length = 1
+    if start is not None:
+        extents.append((start, length))
+    return extents
+
+
+def merge_extents(extents: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Ordena os extents e funde os que se encostam, para liberá-los em menos chamadas."""
+    merged = []
+    for start, length in sorted(extents):
+        if merged and merged[-1][0] + merged[-1][1] == start:
+            merged[-1] = (merged[-1][0], merged[-1][1] + length)
+        else:
+            merged.append((start, length))
+    return merged
+
+
+def split_extents(extents: List[Tuple[int, int]], counts: Iterable[int]):
+    """Reparte `extents`, em ordem, em listas de extents com `counts[i]` blocos cada."""
+    i = -1
+    start = remaining = 0
+    for count in counts:
+        pieces = []
+        while count:
+            if not remaining:
+                i += 1
+                start, remaining = extents[i]
+            take = min(count, remaining)
+            pieces.append((start, take))
+            start += take
+            remaining -= take
+            count -= take
+        yield pieces
+
+
+class FreeSpaceManager:
+    """
+    Gerenciador de espaço livre usado pelos dois sistemas de arquivos.
+
+    Mantém um bitmap (1 byte por bloco, 1 = ocupado) e um índice de extents
+    livres indexado pelo início e pelo fim de cada extent. Onde cada pedido
+    é posicionado fica a cargo de uma AllocationPolicy (entity.allocation),
+    que mantém o seu próprio índice dos extents livres; a padrão,
+    'size-class', acha um trecho contíguo que comporte o pedido em
+    O(log total). Liberar um extent custa O(1) no índice, com coalescência
+    imediata dos vizinhos livres.
+
+    O bitmap é paginado: uma página só existe depois que algum bloco dela é
+    alocado, e páginas ausentes são inteiramente livres. Um disco novo começa
+    com um único extent livre, então a criação é O(1) em qualquer tamanho.
+    """
+
+    def __init__(self, total_blocks: int, policy='size-class'):
+        self.total_blocks = total_blocks
+        self.policy = make_policy(policy)
+        # Chamadas ao alocador e blocos que passaram por elas, para as métricas.
+        self.allocations = 0
+        self.allocated_blocks = 0
+        self.frees = 0
+        self.freed_blocks = 0
+        self._reset()
+        self.free_count = total_blocks
+        if total_blocks:
+            self._insert(0, total_blocks)
+
+    def _reset(self):
+        self.bitmap: Dict[int, bytearray] = {}
+        self._by_start: Dict[int, int] = {}
+        self._by_end: Dict[int, int] = {}
+        # Quantos extents livres há de cada tamanho, para o maior trecho livre.
+        self._tamanhos: Dict[int, int] = {}
+        self._maior = 0
+        self.policy.reset(self.total_blocks)
+
+    def _insert(self, start: int, length: int):
+        self._by_start[start] = length
+        self._by_end[start + length] = start
+        self._tamanhos[length] = self._tamanhos.get(length, 0) + 1
+        if self._maior is not None and length > self._maior:
+            self._maior = length
+        self.policy.inserted(start, length)
+
+    def _remove(self, start: int):
+        length = self._by_start.pop(start)
+        del self._by_end[start + length]
+        restantes = self._tamanhos[length] - 1
+        if restantes:
+            self._tamanhos[length] = restantes
+        else:
+            del self._tamanhos[length]
+            if length == self._maior:
+                # Recalculado em largest_free(), só quando alguém perguntar.
+                self._maior = None
+        self.policy.removed(start, length)
+        return length
+
+    def largest_free(self) -> int:
+        """Tamanho do maior extent livre."""
+        if self._maior is None:
+            self._maior = max(self._tamanhos, default=0)
+        return self._maior
+
+    def _trechos(self, start: int, length: int):
+        bloco = start
+        fim = start + length
+        while bloco < fim:
+            numero, inicio = divmod(bloco, BITMAP_PAGE)
+            quantidade = min(fim - bloco, BITMAP_PAGE - inicio)
+            yield numero, inicio, inicio + quantidade
+            bloco += quantidade
+
+    def _mark_used(self, start: int, length: int):
+        for numero, inicio, fim in self._trechos(start, length):
+            pagina = self.bitmap.get(numero)
+            if pagina is None:
+                pagina = self.bitmap[numero] = bytearray(BITMAP_PAGE)
+            pagina[inicio:fim] = b'\x01' * (fim - inicio)
+
+    def _mark_free(self, start: int, length: int):
+        for numero, inicio, fim in self._trechos(start, length):
+            if fim - inicio == BITMAP_PAGE:
+                self.bitmap.pop(numero, None)
+            else:
+                self.bitmap[numero][inicio:fim] = bytes(fim - inicio)
+
+    def _all_used(self, start: int, length: int) -> bool:
+        for numero, inicio, fim in self._trechos(start, length):
+            pagina = self.bitmap.get(numero)
+            if pagina is None or pagina.find(0, inicio, fim) != -1:
+                return False
+        return True
+
+    def is_free(self, block: int) -> bool:
+        pagina = self.bitmap.get(block // BITMAP_PAGE)
+        return pagina is None or pagina[block % BITMAP_PAGE] == 0
+
+    def free_extent_count(self) -> int:
+        return len(self._by_start)
+
+    def stats(self) -> dict:
+        """Fragmentação do espaço livre (extents livres e o maior deles) e os contadores de chamadas."""
+        return {
+            'policy': self.policy.name,
+            'free_extents': len(self._by_start),
+            'largest_free': self.largest_free(),
+            'allocations': self.allocations,
+            'allocated_blocks': self.allocated_blocks,
+            'frees': self.frees,
+            'freed_blocks': self.freed_blocks,
+        }
+
+    def transaction(self):
+        """
+        Contexto em que verificar o espaço, liberar e alocar valem como uma
+        operação só: no modo concorrente, nenhum outro escritor toma os blocos
+        no meio. Aqui não faz nada (veja LockedFreeSpace).
+        """
+        return nullcontext()
+
+    def allocate(self, count: int, hint: int = None) -> List[Tuple[int, int]]:
+        """
+        Aloca `count` blocos e devolve a lista de extents (inicio, tamanho).
+        Se `hint` for o início de um extent livre (por exemplo, o bloco logo
+        após o fim de um arquivo que está crescendo), a alocação começa por ele.
+        """
+        if count > self.free_count:
+            raise NoSpaceError("Espaço insuficiente em disco.")
+        self.allocations += 1
+        self.allocated_blocks += count
+        extents = []
+        remaining = count
+        while remaining:
+            if hint is not None and hint in self._by_start:
+                start = position = hint
+            else:
+                start, position = self.policy.pick(self, remaining)
+            hint = None
+            length = min(remaining, start + self._by_start[start] - position)
+            self._take(start, position, length)
+            extents.append((position, length))
+            remaining -= length
+        self.free_count -= count
+        return extents
+
+    def _take(self, start: int, position: int, length: int):
+        """Ocupa [position, position + length) do extent livre que começa em `start`."""
+        end = start + self._remove(start)
+        if position > start:
+            self._insert(start, position - start)
+        if position + length < end:
+            self._insert(position + length, end - position - length)
+        self._mark_used(position, length)
+        self.policy.allocated(position, length)
+
+    def lowest_fit(self, count: int):
+        """Início do extent livre de menor endereço com pelo menos `count` blocos, ou None. O(extents livres)."""
+        return min((start for start, length in self._by_start.items() if length >= count), default=None)
+
+    def first_hole(self):
+        """
+        O extent livre (inicio, tamanho) de menor endereço que ainda tem blocos
+        usados depois dele, ou None se o espaço livre já é um trecho só no fim
+        do disco. O(extents livres).
+        """
+        start = min(self._by_start, default=None)
+        if start is None or start + self._by_start[start] == self.total_blocks:
+            return None
+        return start, self._by_start[start]
+
+    def reserve(self, start: int, count: int):
+        """Aloca exatamente [start, start + count), que precisa estar dentro de um extent livre."""
+        if count <= 0:
+            return
+        inicio = self._run_start(start) if 0 <= start < self.total_blocks and self.is_free(start) else None
+        if inicio is None or start + count > inicio + self._by_start[inicio]:
+            raise ValueError(f"Extent ({start}, {count}) não está livre.")
+        self._take(inicio, start, count)
+        self.free_count -= count
+        self.allocations += 1
+        self.allocated_blocks += count
+
+    def _run_start(self, block: int) -> int:
+        """Início do extent livre que contém `block` (livre): o bloco após o último usado antes dele."""
+        numero, fim = divmod(block, BITMAP_PAGE)
+        while numero >= 0:
+            pagina = self.bitmap.get(numero)
+            if pagina is not None:
+                usado = pagina.rfind(1, 0, fim)
+                if usado != -1:
+                    return numero * BITMAP_PAGE + usado + 1
+            numero -= 1
+            fim = BITMAP_PAGE
+        return 0
+
+    def free(self, start: int, length: int):
+        """Devolve o extent [start, start + length) ao espaço livre."""
+        if length <= 0:
+            return
+        if start < 0 or start + length > self.total_blocks:
+            raise ValueError(f"Extent ({start}, {length}) fora do disco.")
+        if not self._all_used(start, length):
+            raise ValueError(f"Extent ({start}, {length}) contém blocos já livres.")
+        self._mark_free(start, length)
+        self.free_count += length
+        self.frees += 1
+        self.freed_blocks += length
+
+        left = self._by_end.get(start)
+        if left is not None:
+            length += self._remove(left)
+            start = left
+        end = start + length
+        if end in self._by_start:
+            length += self._remove(end)
+        self._insert(start, length)
+
+    def tobytes(self) -> bytes:
+        """Serializa o mapa livre como a lista ordenada de extents livres."""
+        extents = array('q')
+        for start in sorted(self._by_start):
+            extents.append(start)
+            extents.append(self._by_start[start])
+        return struct.pack('<I', len(self._by_start)) + extents.tobytes()
+
+    def load(self, data, pos: int = 0) -> int:
+        """
+        Substitui o estado pelos extents livres serializados em `data[pos:]` e
+        devolve a posição seguinte. O bitmap é refeito marcando os intervalos
+        entre extents livres, sem percorrer os blocos livres.
+        """
+        (quantidade,) = struct.unpack_from('<I', data, pos)
+        pos += 4
+        extents = array('q')
+        extents.frombytes(data[pos:pos + 16 * quantidade])
+        pos += 16 * quantidade
+        self._reset()
+        self.free_count = 0
+        anterior = 0
+        for i in range(0, len(extents), 2):
+            start, length = extents[i], extents[i + 1]
+            if start > anterior:
+                self._mark_used(anterior, start - anterior)
+            self._insert(start, length)
+            self.free_count += length
+            anterior = start + length
+        if anterior < self.total_blocks:
+            self._mark_used(anterior, self.total_blocks - anterior)
+        return pos
+
+    def free_extents(self, extents: Iterable[Tuple[int, int]]):
+        for start, length in extents:
+            self.free(start, length)
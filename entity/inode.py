@@ -1,12 +1,17 @@
-import uuid
-from typing import List, Dict, Optional
+from typing import Optional
+from entity.extent_map import ExtentMap
 
 class Inode:
+    # __slots__ evita um __dict__ por inode; o id é o número inteiro atribuído
+    # pela InodeTable e as entries de diretórios mapeiam nome -> número.
+    # data_blocks é um ExtentMap: o layout do arquivo em extents (inicio, tamanho).
+    __slots__ = ('id', 'name', 'is_dir', 'size', 'data_blocks', 'entries', 'parent')
+
     def __init__(self, name: str, is_dir: bool, parent: Optional['Inode'] = None):
-        self.id = str(uuid.uuid4())
+        self.id = -1
         self.name = name
         self.is_dir = is_dir
-        self.size = 0
-        self.data_blocks = []
+        self.size = 0  # em bytes do conteúdo codificado em UTF-8
+        self.data_blocks = ExtentMap()
         self.entries = {} if is_dir else None
-        self.parent = parent
\ No newline at end of file
+        self.parent = parent
@@ -0,0 +1,68 @@
+from typing import List, Optional
+
+
+class InodeTable:
+    """
+    Tabela de inodes indexada por números inteiros.
+
+    Cada nó recebe como `id` a sua posição na tabela; números de nós removidos
+    vão para uma lista de livres e são reutilizados pelas próximas criações,
+    então a tabela não cresce com ciclos de criação/remoção.
+    """
+
+    def __init__(self):
+        self._slots: List[Optional[object]] = []
+        self._free: List[int] = []
+        self._count = 0
+
+    def add(self, node) -> int:
+        if self._free:
+            number = self._free.pop()
+            self._slots[number] = node
+        else:
+            number = len(self._slots)
+            self._slots.append(node)
+        node.id = number
+        self._count += 1
+        return number
+
+    def restore(self, nodes):
+        """Recria a tabela a partir de nós que já têm `id` (ex.: lidos de uma imagem de disco)."""
+        self._slots = []
+        self._count = 0
+        for node in nodes:
+            if node.id >= len(self._slots):
+                self._slots.extend([None] * (node.id + 1 - len(self._slots)))
+            self._slots[node.id] = node
+            self._count += 1
+        self._free = [n for n in range(len(self._slots) - 1, -1, -1) if self._slots[n] is None]
+
+    def __getitem__(self, number: int):
+        node = self._slots[number] if 0 <= number < len(self._slots) else None
+        if node is None:
+            raise KeyError(number)
+        return node
+
+    def get(self, number: int, default=None):
+        try:
+            return self[number]
+        except KeyError:
+            return default
+
+    def __delitem__(self, number: int):
+        self[number]
+        self._slots[number] = None
+        self._free.append(number)
+        self._count -= 1
+
+    def __contains__(self, number: int) -> bool:
+        return 0 <= number < len(self._slots) and self._slots[number] is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def values(self):
+        return (node for node in self._slots if node is not None)
+
+    def items(self):
+        return ((node.id, node) for node in self._slots if node is not None)
@@ -0,0 +1,151 @@
+import os
+import struct
+import threading
+import zlib
+from typing import List
+
+MODOS_DIARIO = ('off', 'per-op', 'group')
+GROUP_SIZE = 64
+CHECKPOINT_EVERY = 4096
+
+# Cada registro: tamanho e crc32 do corpo, seguidos do corpo
+# (lsn, operação e argumentos, cada argumento com uma tag de tipo).
+_REGISTRO = struct.Struct('<II')
+_CORPO = struct.Struct('<QB')
+
+
+def _codificar(lsn: int, op: str, args) -> bytes:
+    nome = op.encode('ascii')
+    partes = [_CORPO.pack(lsn, len(nome)), nome, struct.pack('<B', len(args))]
+    for arg in args:
+        if isinstance(arg, int):
+            partes.append(b'q' + struct.pack('<q', arg))
+            continue
+        if isinstance(arg, str):
+            tag, arg = b's', arg.encode('utf-8')
+        else:
+            tag = b'b'
+        partes.append(tag + struct.pack('<I', len(arg)))
+        partes.append(bytes(arg))
+    return b''.join(partes)
+
+
+def _decodificar(corpo: bytes):
+    lsn, tamanho_nome = _CORPO.unpack_from(corpo, 0)
+    pos = _CORPO.size
+    op = corpo[pos:pos + tamanho_nome].decode('ascii')
+    pos += tamanho_nome
+    (quantidade,) = struct.unpack_from('<B', corpo, pos)
+    pos += 1
+    args = []
+    for _ in range(quantidade):
+        tag = corpo[pos:pos + 1]
+        pos += 1
+        if tag == b'q':
+            args.append(struct.unpack_from('<q', corpo, pos)[0])
+            pos += 8
+            continue
+        (tamanho,) = struct.unpack_from('<I', corpo, pos)
+        pos += 4
+        valor = corpo[pos:pos + tamanho]
+        pos += tamanho
+        args.append(valor.decode('utf-8') if tag == b's' else valor)
+    return lsn, op, args
+
+
+class Journal:
+    """
+    Diário de escrita antecipada (write-ahead log) das operações de um
+    sistema de arquivos, num arquivo só de acréscimos.
+
+    Cada operação vira um registro com tamanho e crc32; um registro cortado
+    por uma queda no meio da gravação é descartado na leitura. No modo
+    'per-op' cada registro é gravado e sincronizado (fsync) na hora; no modo
+    'group' os registros se acumulam em memória e vão num único write + fsync
+    a cada `group_size` registros ou quando commit() é chamado, trocando as
+    últimas operações não confirmadas por muito menos fsyncs.
+    """
+
+    def __init__(self, path: str, mode: str = 'group', group_size: int = GROUP_SIZE):
+        if mode not in MODOS_DIARIO or mode == 'off':
+            raise ValueError(f"Modo de diário inválido: '{mode}'. Use 'per-op' ou 'group'.")
+        self.path = path
+        self.mode = mode
+        self.group_size = group_size
+        self._arquivo = open(path, 'ab')
+        self._pendentes: List[bytes] = []
+        # Sessões concorrentes registram ao mesmo tempo; lsn e grupo ficam sob a trava.
+        self._trava = threading.RLock()
+        self.next_lsn = 1
+        self.records = 0
+        self.commits = 0
+        self.bytes_written = 0
+
+    @staticmethod
+    def read(path: str):
+        """
+        Devolve a lista de registros (lsn, op, args) válidos de um diário e
+        corta do arquivo uma eventual cauda incompleta ou corrompida.
+        """
+        if not os.path.exists(path):
+            return []
+        with open(path, 'rb') as arquivo:
+            dados = arquivo.read()
+        registros = []
+        pos = 0
+        while pos + _REGISTRO.size <= len(dados):
+            tamanho, crc = _REGISTRO.unpack_from(dados, pos)
+            corpo = dados[pos + _REGISTRO.size:pos + _REGISTRO.size + tamanho]
+            if len(corpo) < tamanho or zlib.crc32(corpo) != crc:
+                break
+            registros.append(_decodificar(corpo))
+            pos += _REGISTRO.size + tamanho
+        if pos < len(dados):
+            with open(path, 'r+b') as arquivo:
+                arquivo.truncate(pos)
+        return registros
+
+    def append(self, op: str, *args) -> int:
+        """Registra a operação e devolve o seu lsn (número de sequência)."""
+        with self._trava:
+            lsn = self.next_lsn
+            self.next_lsn += 1
+            corpo = _codificar(lsn, op, args)
+            self._pendentes.append(_REGISTRO.pack(len(corpo), zlib.crc32(corpo)) + corpo)
+            self.records += 1
+            if self.mode == 'per-op' or len(self._pendentes) >= self.group_size:
+                self.commit()
+        return lsn
+
+    def commit(self):
+        """Grava os registros pendentes com um único write sequencial e um fsync."""
+        with self._trava:
+            if not self._pendentes:
+                return
+            dados = b''.join(self._pendentes)
+            self._pendentes.clear()
+            self._arquivo.write(dados)
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+            self.commits += 1
+            self.bytes_written += len(dados)
+
+    def reset(self):
+        """Esvazia o diário depois de um checkpoint (o estado já está na imagem)."""
+        with self._trava:
+            self.commit()
+            self._arquivo.truncate(0)
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+
+    def close(self):
+        self.commit()
+        self._arquivo.close()
+
+    def stats(self) -> dict:
+        return {
+            'records': self.records,
+            'commits': self.commits,
+            'bytes': self.bytes_written,
+            'pending': len(self._pendentes),
+        }
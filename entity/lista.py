@@ -1,11 +1,14 @@
-import uuid
-
 class ListaEncadeada:
+    # __slots__ evita um __dict__ por nó; o id é o número inteiro atribuído
+    # pela InodeTable e as entries de diretórios mapeiam nome -> número.
+    __slots__ = ('id', 'name', 'is_dir', 'size', 'first_block', 'last_block', 'entries', 'parent')
+
     def __init__(self, name: str, is_dir: bool):
-        self.id = str(uuid.uuid4())
+        self.id = -1
         self.name = name
         self.is_dir = is_dir
-        self.size = 0 
+        self.size = 0  # em bytes do conteúdo codificado em UTF-8
         self.first_block = None
+        self.last_block = None  # fim da cadeia, para anexar sem percorrê-la
         self.entries = {} if is_dir else None
-        self.parent = None
\ No newline at end of file
+        self.parent = None
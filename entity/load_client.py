@@ -0,0 +1,84 @@
+import asyncio
+import random
+import time
+from entity.server import Client, FileServer
+
+
+def _percentil(ordenados: list, p: float) -> float:
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def run_load(host: str = '127.0.0.1', port: int = 0, path: str = None, connections: int = 200,
+                   requests_per_connection: int = 50, file_size: int = 512, read_ratio: float = 0.5,
+                   seed: int = 0) -> dict:
+    """
+    Gerador de carga: abre `connections` conexões simultâneas e cada uma cria
+    o seu diretório e faz `requests_per_connection` pedidos, misturando
+    escritas e leituras (metade dos pedidos, por padrão) de arquivos de até
+    `file_size` bytes, mais um ls de vez em quando. A latência de cada pedido
+    é medida do envio ao último byte da resposta.
+
+    Returns:
+        {'connections', 'requests', 'errors', 'seconds', 'rps', 'p50_ms', 'p99_ms', 'max_ms'}
+    """
+    latencias = []
+    erros = 0
+
+    async def cliente(indice: int):
+        nonlocal erros
+        rng = random.Random(seed * 100000 + indice)
+        conexao = await Client.connect(host, port, path)
+        try:
+            await conexao.request(f"create dir c{indice}")
+            await conexao.request(f"cd c{indice}")
+            await conexao.request(f"write f0 {'x' * file_size}")
+            for _ in range(requests_per_connection):
+                sorteio = rng.random()
+                if sorteio < read_ratio:
+                    linha = f"read f{rng.randrange(4)}"
+                elif sorteio < 0.95:
+                    linha = f"write f{rng.randrange(4)} {'y' * rng.randrange(1, file_size)}"
+                else:
+                    linha = "ls"
+                inicio = time.perf_counter()
+                estado, _ = await conexao.request(linha)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                if estado == "ERR" and not linha.startswith("read"):
+                    erros += 1
+        finally:
+            await conexao.close()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(i) for i in range(connections)))
+    segundos = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        'connections': connections,
+        'requests': len(latencias),
+        'errors': erros,
+        'seconds': segundos,
+        'rps': len(latencias) / segundos,
+        'p50_ms': _percentil(latencias, 0.50),
+        'p99_ms': _percentil(latencias, 0.99),
+        'max_ms': latencias[-1] if latencias else 0.0,
+    }
+
+
+async def _benchmark(fs, **options) -> dict:
+    server = FileServer(fs)
+    host, port = (await server.start())[:2]
+    try:
+        return await run_load(host, port, **options)
+    finally:
+        await server.close()
+
+
+def benchmark_server(fs, connections: int = 200, requests_per_connection: int = 50, **options) -> dict:
+    """
+    Sobe um FileServer para `fs` numa porta local livre, roda run_load contra
+    ele no mesmo processo e devolve o resultado de run_load.
+    """
+    return asyncio.run(_benchmark(fs, connections=connections,
+                                  requests_per_connection=requests_per_connection, **options))
@@ -0,0 +1,13 @@
+def read_manifest(path: str):
+    """
+    Lê um manifesto de carga em lote: uma linha por arquivo no formato
+    `caminho<TAB>conteúdo`. Linhas vazias e iniciadas por '#' são ignoradas;
+    uma linha sem TAB cria o arquivo vazio.
+    """
+    with open(path, encoding='utf-8') as manifesto:
+        for linha in manifesto:
+            linha = linha.rstrip('\r\n')
+            if not linha or linha.startswith('#'):
+                continue
+            caminho, _, conteudo = linha.partition('\t')
+            yield caminho, conteudo
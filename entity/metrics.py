@@ -0,0 +1,230 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter_ns
+
+# Precisão dos histogramas: 2^SUB_BITS sub-faixas por potência de 2, ou seja,
+# erro relativo de no máximo 1/2^SUB_BITS (~3%) em qualquer escala.
+SUB_BITS = 5
+_SUB = 1 << SUB_BITS
+PERCENTIS = {'p50_us': 0.5, 'p90_us': 0.9, 'p99_us': 0.99, 'p999_us': 0.999}
+# Amostras acumuladas por operação antes de entrarem no histograma de uma vez.
+LOTE = 1024
+
+
+class Histogram:
+    """
+    Histograma de latências no estilo HDR: faixas log-lineares sobre
+    nanossegundos inteiros. Abaixo de 2 * 2^SUB_BITS ns cada valor tem a sua
+    faixa; acima, cada potência de 2 é dividida em 2^SUB_BITS faixas iguais.
+    Registrar é O(1) e a memória só cresce com as faixas usadas.
+    """
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @staticmethod
+    def _faixa(ns: int) -> int:
+        if ns < 2 * _SUB:
+            return ns
+        deslocamento = ns.bit_length() - SUB_BITS - 1
+        return (deslocamento << SUB_BITS) + (ns >> deslocamento)
+
+    def record(self, ns: int):
+        self.record_sorted([ns])
+
+    def record_sorted(self, valores: list):
+        """
+        Registra uma lista ordenada de valores: cada faixa presente custa uma
+        busca binária, em vez de uma conta por valor.
+        """
+        if not valores:
+            return
+        i = 0
+        while i < len(valores):
+            faixa = self._faixa(valores[i])
+            j = bisect_left(valores, self._limites(faixa)[1], i)
+            self.counts[faixa] = self.counts.get(faixa, 0) + j - i
+            i = j
+        self.count += len(valores)
+        self.total += sum(valores)
+        if valores[-1] > self.max:
+            self.max = valores[-1]
+        if self.min is None or valores[0] < self.min:
+            self.min = valores[0]
+
+    @staticmethod
+    def _limites(faixa: int):
+        """Intervalo [baixo, alto) de valores da faixa."""
+        if faixa < 2 * _SUB:
+            return faixa, faixa + 1
+        deslocamento = faixa // _SUB - 1
+        base = faixa - (deslocamento << SUB_BITS)
+        return base << deslocamento, (base + 1) << deslocamento
+
+    def percentile(self, p: float) -> float:
+        """Valor (ns) do percentil p, pelo meio da faixa onde ele cai, limitado a [min, max]."""
+        if not self.count:
+            return 0.0
+        alvo = p * self.count
+        acumulado = 0
+        for faixa in sorted(self.counts):
+            acumulado += self.counts[faixa]
+            if acumulado >= alvo:
+                baixo, alto = self._limites(faixa)
+                return min(max((baixo + alto - 1) / 2, self.min), self.max)
+        return float(self.max)
+
+    def snapshot(self) -> dict:
+        """Resumo em microssegundos: {'count', 'mean_us', 'min_us', 'p50_us', ..., 'max_us'}."""
+        r = {
+            'count': self.count,
+            'mean_us': self.total / self.count / 1000 if self.count else 0.0,
+            'min_us': (self.min or 0) / 1000,
+        }
+        for chave, p in PERCENTIS.items():
+            r[chave] = self.percentile(p) / 1000
+        r['max_us'] = self.max / 1000
+        return r
+
+
+class _Pendentes(dict):
+    """Listas de amostras por operação, criadas no primeiro acesso (setdefault é atômico)."""
+
+    def __missing__(self, op: str) -> list:
+        return self.setdefault(op, [])
+
+
+class Metrics:
+    """
+    Métricas por operação de um sistema de arquivos, sempre ligadas: a
+    quantidade, os erros e um Histogram de latência de cada operação
+    decorada com @measured. Cada operação do usuário conta uma vez: as
+    chamadas internas (write_file -> _create_file) passam por auxiliares
+    sem decorador e não contam. `tracer`, se dado, recebe um evento
+    (dicionário) por operação; `enabled = False` desliga tudo.
+
+    Para custar pouco por chamada, a latência só é anexada à lista da
+    operação em `pending`; a cada LOTE amostras (e em snapshot()) a lista
+    é ordenada e entra no histograma de uma vez.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.tracer = None
+        self.reset()
+
+    def reset(self):
+        self.ops = {}
+        self.errors = {}
+        self.pending = _Pendentes()
+
+    def _fold(self, op: str):
+        """Passa as amostras pendentes de `op` para o histograma (as anexadas no meio ficam para a próxima)."""
+        amostras = self.pending[op]
+        n = len(amostras)
+        lote = amostras[:n]
+        del amostras[:n]
+        histograma = self.ops.get(op)
+        if histograma is None:
+            histograma = self.ops[op] = Histogram()
+        lote.sort()
+        histograma.record_sorted(lote)
+
+    def _count_error(self, op: str):
+        self.errors[op] = self.errors.get(op, 0) + 1
+
+    def record(self, op: str, ns: int, args=(), error: str = None):
+        """Caminho completo de uma amostra: erros e tracer (o @measured sem tracer só anexa a pendentes)."""
+        amostras = self.pending[op]
+        amostras.append(ns)
+        if len(amostras) >= LOTE:
+            self._fold(op)
+        if error is not None:
+            self._count_error(op)
+        if self.tracer is not None:
+            self.tracer({
+                'ts': time.time(),
+                'op': op,
+                'target': args[0] if args and isinstance(args[0], str) else None,
+                'us': ns / 1000,
+                'error': error,
+                'thread': threading.get_ident(),
+            })
+
+    def snapshot(self) -> dict:
+        """{operação: Histogram.snapshot() mais 'errors'}, em ordem alfabética."""
+        for op in list(self.pending):
+            self._fold(op)
+        return {op: dict(self.ops[op].snapshot(), errors=self.errors.get(op, 0)) for op in sorted(self.ops)}
+
+
+def measured(metodo):
+    """Decora uma operação pública: registra a latência em self.metrics com o nome do método."""
+    nome = metodo.__name__
+
+    @wraps(metodo)
+    def wrapper(self, *args, **kwargs):
+        metrics = self.metrics
+        if not metrics.enabled:
+            return metodo(self, *args, **kwargs)
+        inicio = perf_counter_ns()
+        try:
+            resultado = metodo(self, *args, **kwargs)
+        except BaseException as e:
+            metrics.record(nome, perf_counter_ns() - inicio, args, type(e).__name__)
+            raise
+        ns = perf_counter_ns() - inicio
+        if metrics.tracer is not None:
+            metrics.record(nome, ns, args)
+            return resultado
+        amostras = metrics.pending[nome]
+        amostras.append(ns)
+        if len(amostras) >= LOTE:
+            metrics._fold(nome)
+        return resultado
+    return wrapper
+
+
+class TraceWriter:
+    """Tracer que grava cada evento como uma linha JSON em `path` (modo append)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._arquivo = open(path, 'a')
+        self._trava = threading.Lock()
+
+    def __call__(self, evento: dict):
+        linha = json.dumps(evento)
+        with self._trava:
+            self._arquivo.write(linha + '\n')
+
+    def close(self):
+        with self._trava:
+            self._arquivo.close()
+
+
+def format_stats(r: dict) -> str:
+    """Tabela de um snapshot de métricas (metrics_snapshot() / metricas()) para stats."""
+    linhas = [f"{'operação':<16} {'qtd':>8} {'erros':>6} {'média':>10} {'p50':>10} {'p99':>10} {'p99.9':>10} "
+              f"{'máx':>10}  (us)"]
+    for op, h in r['ops'].items():
+        linhas.append(f"{op:<16} {h['count']:>8} {h['errors']:>6} {h['mean_us']:>10.2f} {h['p50_us']:>10.2f} "
+                      f"{h['p99_us']:>10.2f} {h['p999_us']:>10.2f} {h['max_us']:>10.2f}")
+    io = r['io']
+    linhas.append(f"Blocos: {io['blocks_read']} lidos | {io['blocks_written']} escritos (cache) | "
+                  f"dispositivo: {io['device_reads']} leituras, {io['device_writes']} escritas, "
+                  f"{io['device_seeks']} buscas")
+    alocador = r['allocator']
+    linhas.append(f"Alocador ({alocador['policy']}): {alocador['allocations']} alocações "
+                  f"({alocador['allocated_blocks']} blocos) | {alocador['frees']} liberações "
+                  f"({alocador['freed_blocks']} blocos)")
+    return "\n".join(linhas)
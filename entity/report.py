@@ -0,0 +1,59 @@
+from entity.defrag import describe_layout
+
+
+def format_status(r: dict) -> str:
+    """Texto de status() para o REPL, igual nos dois backends."""
+    cache = r['cache']
+    linhas = [
+        f"=== STATUS DO SISTEMA DE ARQUIVOS ({r['backend']}) ===",
+        f"Blocos totais: {r['total_blocks']}",
+        f"Blocos usados: {r['used_blocks']}",
+        f"Blocos livres: {r['free_blocks']}",
+        f"Arquivos: {r['files']}",
+        f"Diretórios: {r['dirs']}",
+        f"Memória materializada: {r['materialized_bytes']} bytes",
+        f"Alocação ({r['policy']}): {describe_layout(r['layout'])}",
+        f"Cache: {cache['hits']} acertos | {cache['misses']} faltas | "
+        f"{cache['evictions']} despejos | {cache['dirty_lines']} linhas sujas",
+        f"Dispositivo: {cache['device_reads']} leituras | {cache['device_writes']} escritas | "
+        f"{cache['device_seeks']} buscas | {cache['simulated_ms']:.3f} ms simulados",
+    ]
+    diario = r['journal']
+    if diario is not None:
+        linhas.append(f"Diário ({diario['mode']}): {diario['records']} registros | {diario['commits']} commits | "
+                      f"{diario['pending']} pendentes")
+    linhas.append("Uso por arquivo:")
+    for nome, extents, tamanho in r['usage']:
+        linhas.append(f"  - {nome}: {extents} ({tamanho} bytes)")
+    return "\n".join(linhas)
+
+
+def format_details(r: dict) -> str:
+    """Texto de detalhes() para o REPL."""
+    linhas = [
+        f"ID: {r['id']}",
+        f"Nome: {r['name']}",
+        f"Diretório: {'Sim' if r['is_dir'] else 'Não'}",
+    ]
+    if r['is_dir']:
+        linhas.append(f"Entradas: {r['entries']}")
+    else:
+        linhas.append(f"Tamanho: {r['size']} bytes")
+        linhas.append(f"Blocos alocados (extents): {r['extents']}")
+    return "\n".join(linhas)
+
+
+def format_listing(entradas: list) -> str:
+    """Texto de ls()/listar(): uma linha "dir|file<TAB>nome" por entrada."""
+    if not entradas:
+        return "Diretório vazio."
+    return "\n".join(f"{'dir' if is_dir else 'file'}\t{nome}" for nome, is_dir in entradas)
+
+
+def format_defrag(r: dict) -> str:
+    """Texto do resultado de defrag()/desfragmentar()."""
+    estado = "concluída" if r['done'] else "continua na próxima chamada"
+    return (f"Desfragmentação: {r['moves']} movimentos, {r['moved_blocks']} blocos copiados "
+            f"em {r['seconds']:.3f} s ({estado}).\n"
+            f"  Antes: {describe_layout(r['before'])}\n"
+            f"  Depois: {describe_layout(r['after'])}")
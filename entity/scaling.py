@@ -0,0 +1,176 @@
+import math
+from entity.bench import measure, quiet
+from entity.file_system import FileSystem
+from entity.file_system_linked import SistemaArquivos
+
+SIZES = (10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+# Formato da árvore de diretórios: (profundidade, diretórios por nível). Os
+# arquivos são repartidos entre os diretórios do último nível.
+SHAPES = {
+    'flat': (1, 1),
+    'wide': (2, 32),
+    'deep': (32, 1),
+}
+# Crescimento esperado de cada operação com o número de entradas. Numa forma
+# fixa a profundidade não muda, então O(profundidade) deve ficar constante.
+EXPECTED = {
+    'lookup': 'O(depth)',
+    'cd': 'O(depth)',
+    'move': 'O(depth)',
+    'create_delete': 'O(1)',
+    'write': 'O(1)',
+    'status': 'O(n)',
+}
+# Maior expoente de n (latência ~ n^k) aceito para cada crescimento esperado.
+MAX_EXPONENT = {'O(1)': 0.35, 'O(depth)': 0.35, 'O(n)': 1.35}
+ORDERS = ((0.0, 'O(1)'), (0.5, 'O(n^0.5)'), (1.0, 'O(n)'), (2.0, 'O(n^2)'))
+
+
+def _operacoes(backend: str):
+    if backend == 'linked':
+        fs = SistemaArquivos()
+        return fs, {
+            'create_file': fs.criar_arquivo, 'create_dir': fs.criar_diretorio, 'cd': fs.mudar_diretorio,
+            'move': fs.mover, 'write': fs.escrever_arquivo, 'delete': fs.deletar, 'status': fs.status,
+            'open': fs.abrir,
+        }
+    if backend != 'inode':
+        raise ValueError(f"Backend desconhecido: {backend}")
+    fs = FileSystem()
+    return fs, {
+        'create_file': fs.create_file, 'create_dir': fs.create_dir, 'cd': fs.cd, 'move': fs.move,
+        'write': fs.write_file, 'delete': fs.delete, 'status': fs.status, 'open': fs.open,
+    }
+
+
+def populate(backend: str, entries: int, depth: int, fanout: int):
+    """
+    Monta uma árvore com `fanout` diretórios por nível até `depth` níveis e
+    reparte `entries` arquivos vazios entre os diretórios do último nível.
+    Deixa o diretório atual no primeiro deles (/d0/d0/...), que também
+    recebe 'alvo' e o subdiretório 'destino' usados nas medições.
+
+    Returns:
+        (sistema de arquivos, operações pelo nome)
+    """
+    fs, ops = _operacoes(backend)
+    folhas = fanout ** depth
+
+    with quiet():
+        def descer(nivel: int, primeira: int):
+            if nivel == depth:
+                quantidade = entries // folhas + (primeira < entries % folhas)
+                for i in range(quantidade):
+                    ops['create_file'](f"f{i}")
+                return primeira + 1
+            for i in range(fanout):
+                ops['create_dir'](f"d{i}")
+                ops['cd'](f"d{i}")
+                primeira = descer(nivel + 1, primeira)
+                ops['cd']("..")
+            return primeira
+
+        descer(0, 0)
+        for _ in range(depth):
+            ops['cd']("d0")
+        ops['create_dir']("destino")
+        ops['write']("alvo", "x" * 64)
+    return fs, ops
+
+
+def _medicoes(ops: dict, caminho: str) -> dict:
+    """As operações medidas, todas a partir do diretório deixado por populate()."""
+    alvo = caminho + "/alvo"
+    lados = [caminho, caminho + "/destino"]
+
+    def lookup():
+        ops['open'](alvo).close()
+
+    def cd():
+        ops['cd']("destino")
+        ops['cd']("..")
+
+    def move():
+        ops['move'](lados[0] + "/alvo", lados[1])
+        lados.reverse()
+
+    def create_delete():
+        ops['create_file']("tmp")
+        ops['delete']("tmp")
+
+    def write():
+        ops['write']("escrita", "y" * 64)
+
+    def status():
+        ops['status']()
+
+    return {'lookup': lookup, 'cd': cd, 'move': move, 'create_delete': create_delete, 'write': write,
+            'status': status}
+
+
+def fit_exponent(series: dict) -> float:
+    """Inclinação, por mínimos quadrados, de log(latência) x log(n): latência ~ n^k."""
+    xs = [math.log(n) for n in series]
+    ys = [math.log(max(t, 1e-9)) for t in series.values()]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mx) ** 2 for x in xs)
+    if not var:
+        return 0.0
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / var
+
+
+def order_of(exponent: float) -> str:
+    """A ordem de crescimento mais próxima do expoente medido."""
+    return min(ORDERS, key=lambda par: abs(par[0] - exponent))[1]
+
+
+def run_scaling(backends=('inode', 'linked'), sizes=SIZES, shapes=None, repeat: int = 20) -> dict:
+    """
+    Para cada backend e forma de árvore, monta árvores de cada tamanho em
+    `sizes`, mede a latência das operações de EXPECTED com bench.measure e
+    ajusta o expoente de crescimento das medianas. Operações O(n) têm menos
+    repetições, para a suíte caber no tempo com 10^6 entradas.
+
+    Returns:
+        {backend: {forma: {operação: {'expected', 'latency_ms': {n: mediana},
+                                      'exponent', 'order', 'ok'}}}}
+    """
+    shapes = shapes or SHAPES
+    results = {}
+    for backend in backends:
+        results[backend] = {}
+        for shape, (depth, fanout) in shapes.items():
+            series = {op: {} for op in EXPECTED}
+            for n in sizes:
+                fs, ops = populate(backend, n, depth, fanout)
+                caminho = "/" + "/".join(["d0"] * depth)
+                for op, fn in _medicoes(ops, caminho).items():
+                    if EXPECTED[op] == 'O(n)':
+                        r = measure(fn, repeat=max(3, repeat // 4), warmup=1)
+                    else:
+                        r = measure(fn, repeat=repeat)
+                    series[op][n] = r['median_ms']
+                del fs, ops
+            results[backend][shape] = {}
+            for op, serie in series.items():
+                expoente = fit_exponent(serie)
+                results[backend][shape][op] = {
+                    'expected': EXPECTED[op],
+                    'latency_ms': serie,
+                    'exponent': expoente,
+                    'order': order_of(expoente),
+                    'ok': expoente <= MAX_EXPONENT[EXPECTED[op]],
+                }
+    return results
+
+
+def regressions(results: dict) -> list:
+    """As operações que cresceram mais do que o esperado, uma mensagem por (backend, forma, operação)."""
+    falhas = []
+    for backend, formas in results.items():
+        for shape, operacoes in formas.items():
+            for op, r in operacoes.items():
+                if not r['ok']:
+                    falhas.append(f"{backend}/{shape}/{op}: esperado {r['expected']}, "
+                                  f"medido ~n^{r['exponent']:.2f} ({r['order']})")
+    return falhas
@@ -0,0 +1,212 @@
+import asyncio
+import contextlib
+from entity.concurrency import Session
+from entity.errors import FileSystemError
+from entity.file_handle import TAMANHO_PEDACO
+from entity.file_system_linked import SistemaArquivos
+from entity.report import format_status, format_details, format_listing
+
+# Protocolo de linhas, UTF-8. Cada pedido é uma linha com um comando do REPL
+# ("write notas.txt texto...", "cd docs", "read notas.txt"). Cada resposta
+# começa com uma linha de estado seguida de exatamente <n> bytes:
+#   OK <n>     saída de texto do comando
+#   ERR <n>    mensagem de erro
+#   DATA <n>   conteúdo de um arquivo (resposta de read), enviado em pedaços
+COMANDOS = ('create', 'ls', 'cd', 'pwd', 'move', 'write', 'append', 'pwrite', 'truncate',
+            'read', 'delete', 'detalhes', 'status', 'quit')
+
+
+def _operacoes(fs) -> dict:
+    """Os métodos de cada backend sob os nomes dos comandos do REPL."""
+    if isinstance(fs, SistemaArquivos):
+        return {
+            'create_file': fs.criar_arquivo, 'create_dir': fs.criar_diretorio, 'ls': fs.listar,
+            'cd': fs.mudar_diretorio, 'move': fs.mover, 'write': fs.escrever_arquivo, 'append': fs.anexar,
+            'pwrite': fs.escrever_em, 'truncate': fs.truncar, 'delete': fs.deletar, 'detalhes': fs.detalhes,
+            'status': fs.status, 'open': fs.abrir, 'session': fs.sessao, 'path': lambda: fs.caminho_atual,
+        }
+    return {
+        'create_file': fs.create_file, 'create_dir': fs.create_dir, 'ls': fs.ls, 'cd': fs.cd,
+        'move': fs.move, 'write': fs.write_file, 'append': fs.append, 'pwrite': fs.pwrite,
+        'truncate': fs.truncate, 'delete': fs.delete, 'detalhes': fs.detalhes, 'status': fs.status,
+        'open': fs.open, 'session': fs.session, 'path': lambda: fs.current_path,
+    }
+
+
+def _executar(ops: dict, cmd: str, args: list) -> str:
+    """Executa um comando com a mesma sintaxe e mensagens do REPL e devolve o texto da resposta."""
+    if cmd == "create":
+        if len(args) < 2 or args[0] not in ("file", "dir"):
+            return "Uso: create [file|dir] <nome>"
+        ops['create_' + args[0]](args[1])
+        return f"{'Arquivo' if args[0] == 'file' else 'Diretório'} '{args[1]}' criado com sucesso."
+    elif cmd == "ls":
+        return format_listing(ops['ls']())
+    elif cmd == "cd":
+        if len(args) != 1:
+            return "Uso: cd <nome>"
+        ops['cd'](args[0])
+        return ""
+    elif cmd == "pwd":
+        return ops['path']()
+    elif cmd == "move":
+        if len(args) != 2:
+            return "Uso: move <nome_arquivo> <novo_diretorio>"
+        ops['move'](args[0], args[1])
+        return f"Arquivo '{args[0]}' movido para '{args[1]}' com sucesso."
+    elif cmd in ("write", "append"):
+        if len(args) < 2:
+            return f"Uso: {cmd} <arquivo> <texto>"
+        n = ops[cmd](args[0], ' '.join(args[1:]))
+        return f"Dados {'escritos em' if cmd == 'write' else 'anexados a'} '{args[0]}' ({n} bytes)."
+    elif cmd == "pwrite":
+        if len(args) < 3 or not args[1].isdigit():
+            return "Uso: pwrite <arquivo> <offset> <texto>"
+        n = ops['pwrite'](args[0], int(args[1]), ' '.join(args[2:]))
+        return f"Dados escritos em '{args[0]}' a partir do byte {args[1]} ({n} bytes)."
+    elif cmd == "truncate":
+        if len(args) != 2 or not args[1].isdigit():
+            return "Uso: truncate <arquivo> <tamanho>"
+        ops['truncate'](args[0], int(args[1]))
+        return f"Arquivo '{args[0]}' truncado para {args[1]} bytes."
+    elif cmd == "delete":
+        if len(args) != 1:
+            return "Uso: delete <nome>"
+        ops['delete'](args[0])
+        return f"'{args[0]}' excluído com sucesso."
+    elif cmd == "detalhes":
+        if len(args) != 1:
+            return "Uso: detalhes <arquivo|diretorio>"
+        return format_details(ops['detalhes'](args[0]))
+    elif cmd == "status":
+        return format_status(ops['status']())
+    return f"Erro: Comando inválido. Comandos disponíveis: {', '.join(COMANDOS)}"
+
+
+class FileServer:
+    """
+    Servidor asyncio que expõe um sistema de arquivos (i-node ou lista
+    encadeada, criado com concurrent/concorrente=True) a vários clientes por
+    TCP ou socket Unix.
+
+    Cada conexão tem a sua Session, com o seu diretório atual. Os comandos
+    rodam no executor padrão do loop, então um comando que espera por uma
+    trava (ex.: escrever num arquivo que outro cliente está lendo) não para o
+    servidor. read abre o arquivo, que fica travado para escrita enquanto
+    durar a leitura, e o envia em pedaços de `chunk_size` bytes respeitando o
+    controle de fluxo do socket, sem montar o arquivo inteiro na memória.
+    """
+
+    def __init__(self, fs, chunk_size: int = TAMANHO_PEDACO):
+        if not getattr(fs, 'concurrent', getattr(fs, 'concorrente', False)):
+            raise ValueError("O servidor precisa de um sistema de arquivos em modo concorrente.")
+        self.fs = fs
+        self.chunk_size = chunk_size
+        self.requests = 0
+        self.connections = 0
+        self._ops = _operacoes(fs)
+        self._server = None
+        self._conexoes = {}
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0, path: str = None):
+        """Começa a aceitar conexões em `path` (socket Unix) ou host:port; devolve o endereço."""
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._atender, path=path, limit=1 << 20)
+        else:
+            self._server = await asyncio.start_server(self._atender, host, port, limit=1 << 20)
+        return self._server.sockets[0].getsockname()
+
+    async def close(self):
+        """Para de aceitar conexões, fecha as abertas e espera os atendimentos terminarem."""
+        self._server.close()
+        for writer in self._conexoes.values():
+            writer.close()
+        await asyncio.gather(*self._conexoes, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    def _comando(self, sessao: Session, cmd: str, args: list):
+        """Roda numa thread do executor: executa o comando na sessão da conexão e devolve (handle, texto)."""
+        with self._ops['session'](sessao):
+            try:
+                if cmd == "read":
+                    if len(args) != 1:
+                        return None, "Uso: read <arquivo>\n"
+                    return self._ops['open'](args[0]), ""
+                texto = _executar(self._ops, cmd, args)
+            except FileSystemError as e:
+                return None, f"Erro: {e}\n"
+        return None, texto + "\n" if texto else ""
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        sessao = Session(self.fs.root)
+        tarefa = asyncio.current_task()
+        self._conexoes[tarefa] = writer
+        self.connections += 1
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha:
+                    break
+                partes = linha.decode('utf-8', errors='replace').split()
+                if not partes:
+                    continue
+                cmd, args = partes[0].lower(), partes[1:]
+                if cmd == "quit":
+                    break
+                self.requests += 1
+                handle, texto = await loop.run_in_executor(None, self._comando, sessao, cmd, args)
+                if handle is None:
+                    corpo = texto.encode('utf-8')
+                    estado = "ERR" if texto.startswith("Erro") or texto.startswith("Uso") else "OK"
+                    writer.write(f"{estado} {len(corpo)}\n".encode() + corpo)
+                    await writer.drain()
+                    continue
+                try:
+                    writer.write(f"DATA {handle.size}\n".encode())
+                    for pedaco in handle.chunks(self.chunk_size):
+                        writer.write(pedaco)
+                        await writer.drain()
+                    await writer.drain()
+                finally:
+                    handle.close()
+        except (ConnectionError, ValueError):
+            # ValueError: linha maior que o limite do reader.
+            pass
+        finally:
+            self.connections -= 1
+            del self._conexoes[tarefa]
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+
+class Client:
+    """Cliente assíncrono do protocolo: request() devolve (estado, corpo em bytes)."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def connect(cls, host: str = '127.0.0.1', port: int = 0, path: str = None) -> 'Client':
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, linha: str):
+        self._writer.write(linha.encode('utf-8') + b"\n")
+        await self._writer.drain()
+        estado, tamanho = (await self._reader.readline()).decode().split()
+        return estado, await self._reader.readexactly(int(tamanho))
+
+    async def close(self):
+        self._writer.write(b"quit\n")
+        self._writer.close()
+        with contextlib.suppress(ConnectionError):
+            await self._writer.wait_closed()
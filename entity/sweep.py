@@ -0,0 +1,145 @@
+import csv
+import itertools
+import json
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from entity.allocation import POLICIES
+from entity.file_system import FileSystem, BLOCK_SIZE
+from entity.file_system_linked import SistemaArquivos
+from entity.workload import payload
+
+BACKENDS = ('inode', 'linked')
+OPERACOES = ('write', 'append', 'read', 'move', 'delete')
+# Políticas de alocação do mapa livre, pelo nome usado na matriz.
+ALOCADORES = tuple(POLICIES)
+TAMANHO_ANEXO = 64
+
+# Matriz padrão: backend x tamanho do arquivo x quantidade x operação x alocador.
+MATRIZ = {
+    'backend': BACKENDS,
+    'file_size': (64, 1024, 16384),
+    'file_count': (100, 1000),
+    'operation': OPERACOES,
+    'allocator': ALOCADORES,
+}
+COLUNAS = ('backend', 'file_size', 'file_count', 'operation', 'allocator', 'seed',
+           'ops', 'seconds', 'ops_per_s', 'mb_per_s', 'error')
+
+
+def expand(matriz: dict = None, seed: int = 0) -> list:
+    """Todas as combinações da matriz, na ordem dos eixos, como dicionários (células)."""
+    matriz = dict(MATRIZ, **(matriz or {}))
+    eixos = list(MATRIZ)
+    return [dict(zip(eixos, valores), seed=seed)
+            for valores in itertools.product(*(matriz[eixo] for eixo in eixos))]
+
+
+class _Alvo:
+    """As operações medidas com os mesmos nomes nos dois backends."""
+
+    def __init__(self, backend: str, total_blocks: int, allocator: str):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend desconhecido: {backend}")
+        if allocator not in ALOCADORES:
+            raise ValueError(f"Alocador desconhecido: {allocator}")
+        if backend == 'linked':
+            fs = SistemaArquivos(total_blocos=total_blocks, alocador=allocator)
+            self.write, self.append, self.open = fs.escrever_arquivo, fs.anexar, fs.abrir
+            self.move, self.delete, self.create_dir = fs.mover, fs.deletar, fs.criar_diretorio
+        else:
+            fs = FileSystem(total_blocks=total_blocks, allocator=allocator)
+            self.write, self.append, self.open = fs.write_file, fs.append, fs.open
+            self.move, self.delete, self.create_dir = fs.move, fs.delete, fs.create_dir
+        self.fs = fs
+
+
+def _medir(alvo: _Alvo, operation: str, nomes: list, dados: str) -> int:
+    """Roda a operação sobre todos os arquivos e devolve quantas chamadas fez."""
+    if operation == 'write':
+        for nome in nomes:
+            alvo.write(nome, dados)
+        return len(nomes)
+    if operation == 'append':
+        pedacos = [dados[i:i + TAMANHO_ANEXO] for i in range(0, len(dados), TAMANHO_ANEXO)]
+        for nome in nomes:
+            for pedaco in pedacos:
+                alvo.append(nome, pedaco)
+        return len(nomes) * len(pedacos)
+    if operation == 'read':
+        for nome in nomes:
+            with alvo.open(nome) as handle:
+                handle.read()
+        return len(nomes)
+    if operation == 'move':
+        for nome in nomes:
+            alvo.move(nome, "destino")
+        return len(nomes)
+    if operation == 'delete':
+        for nome in nomes:
+            alvo.delete(nome)
+        return len(nomes)
+    raise ValueError(f"Operação desconhecida: {operation}")
+
+
+def run_cell(cell: dict) -> dict:
+    """
+    Roda uma célula da matriz num sistema de arquivos próprio, com o disco
+    dimensionado para ela (e não o de 1M blocos padrão). Só a operação é
+    cronometrada: para read, move e delete os arquivos são escritos antes.
+    Um erro vira a coluna 'error' da célula em vez de derrubar a varredura.
+    """
+    resultado = dict(cell, ops=0, seconds=0.0, ops_per_s=0.0, mb_per_s=0.0, error='')
+    tamanho, quantidade = cell['file_size'], cell['file_count']
+    try:
+        blocos_por_arquivo = max(1, math.ceil(tamanho / BLOCK_SIZE))
+        alvo = _Alvo(cell['backend'], 2 * blocos_por_arquivo * quantidade + 1024, cell['allocator'])
+        rng = random.Random(cell.get('seed', 0))
+        dados = payload(tamanho, rng)
+        nomes = [f"f{i}" for i in range(quantidade)]
+        if cell['operation'] in ('read', 'move', 'delete'):
+            for nome in nomes:
+                alvo.write(nome, dados)
+        if cell['operation'] == 'move':
+            alvo.create_dir("destino")
+        inicio = time.perf_counter()
+        ops = _medir(alvo, cell['operation'], nomes, dados)
+        segundos = time.perf_counter() - inicio
+    except Exception as e:
+        resultado['error'] = f"{type(e).__name__}: {e}"
+        return resultado
+    resultado.update(ops=ops, seconds=segundos, ops_per_s=ops / segundos if segundos else 0.0,
+                     mb_per_s=tamanho * quantidade / segundos / 1e6 if segundos else 0.0)
+    return resultado
+
+
+def run_sweep(matriz: dict = None, workers: int = None, seed: int = 0, progress=None) -> list:
+    """
+    Expande a matriz e roda as células em paralelo num ProcessPoolExecutor
+    (`workers` processos, por padrão um por núcleo); cada processo monta os
+    seus próprios sistemas de arquivos. `progress(feitas, total, resultado)`,
+    se dado, é chamado a cada célula concluída. Devolve os resultados na
+    ordem da matriz.
+    """
+    cells = expand(matriz, seed)
+    resultados = [None] * len(cells)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = {pool.submit(run_cell, cell): i for i, cell in enumerate(cells)}
+        for feitas, futuro in enumerate(as_completed(futuros), 1):
+            resultados[futuros[futuro]] = futuro.result()
+            if progress is not None:
+                progress(feitas, len(cells), resultados[futuros[futuro]])
+    return resultados
+
+
+def write_csv(resultados: list, caminho: str):
+    with open(caminho, 'w', newline='') as f:
+        escritor = csv.DictWriter(f, fieldnames=COLUNAS)
+        escritor.writeheader()
+        escritor.writerows(resultados)
+
+
+def write_json(resultados: list, caminho: str):
+    with open(caminho, 'w') as f:
+        json.dump(resultados, f, indent=2)
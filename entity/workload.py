@@ -0,0 +1,286 @@
+import math
+import random
+import time
+from contextlib import suppress
+from entity.errors import FileSystemError, AlreadyExistsError
+
+# Alfabeto dos dados gerados: 64 símbolos, para cada byte aleatório virar um
+# símbolo sem viés (256 = 4 * 64).
+ALFABETO = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+_TABELA = bytes.maketrans(bytes(range(256)), ALFABETO * 4)
+
+# Misturas de tamanho de arquivo: (peso, menor, maior) em bytes, com tamanho
+# log-uniforme dentro de cada faixa. 'mixed' segue o formato típico de um
+# sistema de arquivos: a maioria dos arquivos é pequena e a maior parte dos
+# bytes está nos poucos grandes.
+SIZE_MIXES = {
+    'small': ((1.0, 64, 4096),),
+    'mixed': ((0.70, 64, 4096), (0.25, 4096, 65536), (0.05, 65536, 1 << 20)),
+    'large': ((1.0, 65536, 1 << 20),),
+}
+# Misturas de operações: fração de cada uma no fluxo.
+OP_MIXES = {
+    'balanced': {'create': 0.2, 'write': 0.2, 'append': 0.1, 'read': 0.4, 'delete': 0.1},
+    'read-heavy': {'create': 0.05, 'write': 0.05, 'append': 0.05, 'read': 0.8, 'delete': 0.05},
+    'write-heavy': {'create': 0.3, 'write': 0.35, 'append': 0.15, 'read': 0.1, 'delete': 0.1},
+    'churn': {'create': 0.4, 'write': 0.1, 'append': 0.05, 'read': 0.05, 'delete': 0.4},
+    # A mistura de _age/_envelhecer: com max_bytes, mantém o disco perto de cheio.
+    'aging': {'create': 0.6, 'append': 0.25, 'delete': 0.15},
+}
+OPERACOES = ('create', 'write', 'append', 'read', 'delete')
+# Tamanho (bytes) de cada append, log-uniforme.
+APPEND_SIZES = (16, 1024)
+
+
+def payload(size: int, rng: random.Random = None) -> str:
+    """
+    `size` caracteres ASCII aleatórios de ALFABETO, sorteados de `rng` (por
+    padrão random.Random(0), então a mesma chamada dá sempre o mesmo texto).
+    Os bytes saem de uma vez de randbytes e viram texto com translate, em
+    vez de um random.choice por caractere.
+    """
+    rng = rng if rng is not None else random.Random(0)
+    return rng.randbytes(size).translate(_TABELA).decode('ascii')
+
+
+def _zipf(u: float, n: int, s: float) -> int:
+    """
+    Posição em [0, n) com P(k) ~ 1 / (k + 1)^s para u uniforme em [0, 1):
+    a inversa da densidade contínua 1 / x^s em [1, n + 1), em O(1) mesmo
+    com n mudando a cada sorteio.
+    """
+    if s == 0:
+        return int(u * n)
+    if s == 1:
+        return min(int((n + 1) ** u) - 1, n - 1)
+    a = 1 - s
+    return min(int((((n + 1) ** a - 1) * u + 1) ** (1 / a)) - 1, n - 1)
+
+
+class Workload:
+    """
+    Gerador semeado de cargas sintéticas: uma árvore de diretórios com
+    `fanout` subdiretórios por nível até `depth` níveis, um povoamento
+    inicial de `files` arquivos e um fluxo de operações ('create', 'write',
+    'append', 'read', 'delete') na proporção de `mix`, com tamanhos tirados
+    de `sizes` (nomes de OP_MIXES e SIZE_MIXES, ou os próprios valores).
+
+    Os acessos (write, append, read) seguem uma Zipf de expoente `skew`
+    sobre os arquivos vivos, do mais novo ao mais antigo: os criados há
+    pouco são os quentes. skew = 0 é uniforme. Remoções sorteiam qualquer
+    arquivo. Com `max_bytes`, remoções entram antes de uma escrita que
+    passaria desse total de bytes vivos, como num disco envelhecido.
+
+    O gerador só modela o estado, sem tocar num sistema de arquivos: a mesma
+    semente dá as mesmas operações, que replay() executa em qualquer backend.
+    Os dados são fatias de um bloco aleatório gerado uma vez, então produzir
+    o fluxo custa pouco mesmo com arquivos grandes.
+    """
+
+    def __init__(self, seed: int = 0, mix='balanced', sizes='mixed', fanout: int = 4, depth: int = 2,
+                 skew: float = 1.0, files: int = 100, max_bytes: int = None):
+        mix = OP_MIXES[mix] if isinstance(mix, str) else mix
+        sizes = SIZE_MIXES[sizes] if isinstance(sizes, str) else sizes
+        desconhecidas = set(mix) - set(OPERACOES)
+        if desconhecidas:
+            raise ValueError(f"Operações desconhecidas: {', '.join(sorted(desconhecidas))}")
+        self.seed = seed
+        self.mix = mix
+        self.sizes = sizes
+        self.skew = skew
+        self.files = files
+        self.max_bytes = max_bytes
+        self._rng = random.Random(seed)
+        self._ops = list(mix)
+        self._pesos_ops = list(mix.values())
+        self._pesos_tamanhos = [peso for peso, _, _ in sizes]
+        self._maior = max(maior for _, _, maior in sizes)
+        self._bloco = payload(2 * self._maior, self._rng)
+
+        # Diretórios em ordem de criação (pais antes dos filhos); os arquivos ficam nas folhas.
+        self.directories = ["/"]
+        nivel = ["/"]
+        for _ in range(depth):
+            nivel = [pai.rstrip("/") + f"/d{i}" for pai in nivel for i in range(fanout)]
+            self.directories.extend(nivel)
+        self._folhas = list(range(len(self.directories) - len(nivel), len(self.directories)))
+
+        # Arquivos vivos, do mais antigo ao mais novo: [diretório, nome, tamanho].
+        self._vivos = []
+        self._bytes = 0
+        self._proximo = 0
+        self._povoado = False
+
+    def _tamanho(self) -> int:
+        _, menor, maior = self._rng.choices(self.sizes, self._pesos_tamanhos)[0]
+        return int(math.exp(self._rng.uniform(math.log(menor), math.log(maior))))
+
+    def _dados(self, tamanho: int) -> str:
+        inicio = self._rng.randrange(len(self._bloco) - tamanho + 1)
+        return self._bloco[inicio:inicio + tamanho]
+
+    def _quente(self) -> int:
+        n = len(self._vivos)
+        return n - 1 - _zipf(self._rng.random(), n, self.skew)
+
+    def _abrir_espaco(self, saida: list, tamanho: int):
+        while self.max_bytes is not None and self._vivos and self._bytes + tamanho > self.max_bytes:
+            self._remover(saida, self._rng.randrange(len(self._vivos)))
+
+    def _remover(self, saida: list, i: int):
+        diretorio, nome, tamanho = self._vivos.pop(i)
+        self._bytes -= tamanho
+        saida.append(('delete', diretorio, nome, None))
+
+    def _criar(self, saida: list):
+        tamanho = self._tamanho()
+        self._abrir_espaco(saida, tamanho)
+        diretorio = self._rng.choice(self._folhas)
+        nome = f"w{self._proximo}"
+        self._proximo += 1
+        self._vivos.append([diretorio, nome, tamanho])
+        self._bytes += tamanho
+        saida.append(('create', diretorio, nome, self._dados(tamanho)))
+
+    def prefill(self) -> list:
+        """Operações do povoamento inicial: `files` creates (uma vez só, antes de operations)."""
+        saida = []
+        if not self._povoado:
+            self._povoado = True
+            for _ in range(self.files):
+                self._criar(saida)
+        return saida
+
+    def operations(self, n: int) -> list:
+        """
+        As próximas `n` operações sorteadas, como (op, índice em directories,
+        nome, dados ou None). Operações sobre arquivos viram create enquanto
+        não houver nenhum vivo; as remoções de max_bytes vêm a mais.
+        """
+        saida = self.prefill()
+        rng = self._rng
+        for op in rng.choices(self._ops, self._pesos_ops, k=n):
+            if op == 'create' or not self._vivos:
+                self._criar(saida)
+            elif op == 'delete':
+                self._remover(saida, rng.randrange(len(self._vivos)))
+            elif op == 'read':
+                diretorio, nome, _ = self._vivos[self._quente()]
+                saida.append(('read', diretorio, nome, None))
+            else:
+                if op == 'write':
+                    tamanho = self._tamanho()
+                else:
+                    tamanho = int(math.exp(rng.uniform(*map(math.log, APPEND_SIZES))))
+                i = self._quente()
+                arquivo = self._vivos[i]
+                crescimento = tamanho - arquivo[2] if op == 'write' else tamanho
+                if self.max_bytes is not None and self._bytes + crescimento > self.max_bytes:
+                    # Tira o arquivo da lista enquanto abre espaço, para ele não ser o
+                    # removido; ele volta como o mais novo, já que acabou de ser usado.
+                    del self._vivos[i]
+                    self._abrir_espaco(saida, crescimento)
+                    self._vivos.append(arquivo)
+                arquivo[2] = tamanho if op == 'write' else arquivo[2] + tamanho
+                self._bytes += crescimento
+                saida.append((op, arquivo[0], arquivo[1], self._dados(tamanho)))
+        return saida
+
+    def live_bytes(self) -> int:
+        """Bytes vivos no modelo depois das operações já geradas."""
+        return self._bytes
+
+
+def _acoes(fs) -> tuple:
+    """(sessão, criar diretório, mudar diretório, {operação: função(nome, dados)}) do backend de `fs`."""
+    from entity.file_system_linked import SistemaArquivos
+
+    if isinstance(fs, SistemaArquivos):
+        def ler(nome, _):
+            with fs.abrir(nome) as handle:
+                handle.read()
+        return fs.sessao, fs.criar_diretorio, fs.mudar_diretorio, {
+            'create': fs.escrever_arquivo, 'write': fs.escrever_arquivo, 'append': fs.anexar,
+            'read': ler, 'delete': lambda nome, _: fs.deletar(nome),
+        }
+
+    def ler(nome, _):
+        with fs.open(nome) as handle:
+            handle.read()
+    return fs.session, fs.create_dir, fs.cd, {
+        'create': fs.write_file, 'write': fs.write_file, 'append': fs.append,
+        'read': ler, 'delete': lambda nome, _: fs.delete(nome),
+    }
+
+
+def replay(fs, workload: Workload, operations: list) -> dict:
+    """
+    Executa `operations` (de workload.prefill/operations) em `fs`, um
+    FileSystem ou SistemaArquivos, criando antes os diretórios que faltarem.
+    Só o laço das operações é cronometrado; a troca de diretório entre elas é
+    uma atribuição na sessão, sem cd. Um erro (ex.: disco cheio) é contado e
+    a execução segue.
+
+    Returns:
+        {'ops', 'seconds', 'ops_per_s', 'bytes_written', 'mb_per_s', 'errors',
+        'by_op': {operação: quantidade}}
+    """
+    sessao_de, criar_diretorio, mudar_diretorio, acoes = _acoes(fs)
+    with sessao_de() as sessao:
+        lugares = []
+        for caminho in workload.directories:
+            for nome in caminho.strip("/").split("/") if caminho != "/" else ():
+                with suppress(AlreadyExistsError):
+                    criar_diretorio(nome)
+                mudar_diretorio(nome)
+            lugares.append((sessao.cwd, sessao.path))
+            sessao.cwd, sessao.path = lugares[0]
+
+        erros = escritos = 0
+        por_op = dict.fromkeys(OPERACOES, 0)
+        inicio = time.perf_counter()
+        for op, diretorio, nome, dados in operations:
+            sessao.cwd, sessao.path = lugares[diretorio]
+            try:
+                acoes[op](nome, dados)
+            except FileSystemError:
+                erros += 1
+        segundos = time.perf_counter() - inicio
+    for op, _, _, dados in operations:
+        por_op[op] += 1
+        if dados is not None:
+            escritos += len(dados)
+    return {
+        'ops': len(operations),
+        'seconds': segundos,
+        'ops_per_s': len(operations) / segundos if segundos else 0.0,
+        'bytes_written': escritos,
+        'mb_per_s': escritos / segundos / 1e6 if segundos else 0.0,
+        'errors': erros,
+        'by_op': por_op,
+    }
+
+
+def benchmark_workloads(mixes=tuple(OP_MIXES), sizes='small', operations: int = 20000, files: int = 1000,
+                        fill: float = 0.8, seed: int = 0) -> dict:
+    """
+    Vazão dos dois backends em cada mistura de `mixes`: o povoamento de
+    `files` arquivos roda fora da medição e as `operations` operações
+    seguintes, as mesmas nos dois backends, são cronometradas. Os bytes vivos
+    ficam abaixo de `fill` do disco padrão, para 'aging' não o encher.
+
+    Returns:
+        {'inode'|'linked': {mistura: resultado de replay}}
+    """
+    from entity.file_system import FileSystem, BLOCK_SIZE, TOTAL_BLOCKS
+    from entity.file_system_linked import SistemaArquivos
+
+    max_bytes = int(fill * TOTAL_BLOCKS * BLOCK_SIZE)
+    resultados = {'inode': {}, 'linked': {}}
+    for mix in mixes:
+        for backend, classe in (('inode', FileSystem), ('linked', SistemaArquivos)):
+            workload = Workload(seed=seed, mix=mix, sizes=sizes, files=files, max_bytes=max_bytes)
+            fs = classe()
+            replay(fs, workload, workload.prefill())
+            resultados[backend][mix] = replay(fs, workload, workload.operations(operations))
+    return resultados
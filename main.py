@@ -1,11 +1,34 @@
 from entity.file_system import FileSystem, benchmark_inode_delete
 from entity.file_system import benchmark_inode_access, benchmark_move_inode, benchmark_write_file
+from entity.file_system import benchmark_move_scaling, benchmark_memory_per_file, benchmark_extent_metadata
+from entity.file_system import benchmark_append, benchmark_journal, benchmark_concurrency, benchmark_allocation
+from entity.file_system import benchmark_defrag, benchmark_metrics
 from entity.file_system_linked import SistemaArquivos, benchmark_linked_delete
 from entity.file_system_linked import benchmark_inode_access_linked_list
-from entity.file_system_linked import benchmark_move_linked_list
+from entity.file_system_linked import benchmark_move_linked_list, benchmark_memoria_por_arquivo
+from entity.file_system_linked import benchmark_anexar_linked_list, benchmark_diario, benchmark_concorrencia
+from entity.file_system_linked import benchmark_alocacao, benchmark_desfragmentar, benchmark_metricas
+from entity.manifest import read_manifest
+from entity.load_client import benchmark_server
+from entity.bench import describe
+from entity.scaling import SIZES, run_scaling, regressions
+from entity.workload import benchmark_workloads
+from entity.metrics import TraceWriter, format_stats
+from entity.errors import FileSystemError
+from entity.report import format_status, format_details, format_listing, format_defrag
+import json
+import os
+
+COMANDOS = ('create', 'ls', 'cd', 'move', 'write', 'append', 'pwrite', 'truncate', 'read', 'delete',
+            'detalhes', 'status', 'bulk-load', 'sync', 'defrag', 'stats', 'trace', 'mount', 'unmount',
+            'benchmark-access', 'benchmark-device', 'benchmark-write', 'benchmark-delete', 'benchmark-move',
+            'benchmark-move-scaling', 'benchmark-memory', 'benchmark-append', 'benchmark-journal',
+            'benchmark-concurrency', 'benchmark-server', 'benchmark-allocation', 'benchmark-defrag',
+            'benchmark-metrics', 'benchmark-workload', 'benchmark-scaling', 'benchmark-extents', 'exit')
 
 def main():
     fs = FileSystem()
+    tracer = None
     print("Sistema de Arquivos Simulado (digite 'exit' para sair)")
     while True:
         print(f"\n{fs.current_path}$ ", end="")
@@ -15,117 +38,343 @@ def main():
         cmd = command[0].lower()
         args = command[1:] if len(command) > 1 else []
         
-        if cmd == "exit":
-            break
-        elif cmd == "create":
-            if len(args) < 2:
-                print("Uso: create [file|dir] <nome>")
-            elif args[0] == "file":
-                fs.create_file(args[1])
-            elif args[0] == "dir":
-                fs.create_dir(args[1])
-            else:
-                print("Uso: create [file|dir] <nome>")
-        elif cmd == "ls":
-            fs.ls()
-        elif cmd == "cd":
-            if len(args) != 1:
-                print("Uso: cd <nome>")
-            else:
-                fs.cd(args[0])
-        elif cmd == "move":
-            if len(args) != 2:
-                print("Uso: move <nome_arquivo> <novo_diretorio>")
-            else:
-                fs.move(args[0], args[1])
-        elif cmd == "write":
-            if len(args) < 2:
-                print("Uso: write <arquivo> <texto>")
-            else:
-                nome_arquivo = args[0]
-                texto = ' '.join(args[1:])
-                fs.write_file(nome_arquivo, texto)
-        elif cmd == "read":
-            if len(args) != 1:
-                print("Uso: read <arquivo>")
-            else:
-                fs.read_file(args[0])
-        elif cmd == "delete":
-            if len(args) != 1:
-                print("Uso: delete <nome>")
-            else:
-                fs.delete(args[0])
-        elif cmd == "detalhes":
-            if len(args) != 1:
-                print("Uso: detalhes <arquivo|diretorio>")
-            else:
-                fs.detalhes(args[0])
-        elif cmd == "status":
-            fs.status()
-        elif cmd == 'benchmark-access':
-            fs = FileSystem()
-            fs_linked = SistemaArquivos()
-            fs.write_file("teste.txt", "abcdefghij" * 10000)
-            fs_linked.escrever_arquivo("teste.txt", "abcdefghij" * 10000)
-            for k in [5, 10, 50, 900, 1000, 5000]:
-                tempo_inode = benchmark_inode_access(fs, "teste.txt", k)
-                tempo_linked_list = benchmark_inode_access_linked_list(fs_linked, "teste.txt", k)
-                print(f"Bloco {k}: INODE = {tempo_inode:.6f} ms | LINKED LIST = {tempo_linked_list:.6f} ms")  
-        elif cmd == 'benchmark-write':
-            print("\n=== Benchmark de Escrita ===")
-            sizes = [10, 100, 1000]
-            for size in sizes:
-                result = benchmark_write_file(fs, f"bench_{size}.txt", size, 1)
-                print(f"Tamanho: {size} bytes | "
-                      f"Tempo médio: {result['average_time']:.4f} ms |") 
-        elif cmd == 'benchmark-delete':
-            fs_inode = FileSystem()  
-            fs_linked = SistemaArquivos() 
+        try:
+            if cmd == "exit":
+                if fs.image is not None:
+                    fs.unmount()
+                if tracer is not None:
+                    tracer.close()
+                break
+            elif cmd == "create":
+                if len(args) < 2:
+                    print("Uso: create [file|dir] <nome>")
+                elif args[0] == "file":
+                    fs.create_file(args[1])
+                    print(f"Arquivo '{args[1]}' criado com sucesso.")
+                elif args[0] == "dir":
+                    fs.create_dir(args[1])
+                    print(f"Diretório '{args[1]}' criado com sucesso.")
+                else:
+                    print("Uso: create [file|dir] <nome>")
+            elif cmd == "ls":
+                print(format_listing(fs.ls()))
+            elif cmd == "cd":
+                if len(args) != 1:
+                    print("Uso: cd <nome>")
+                else:
+                    fs.cd(args[0])
+            elif cmd == "move":
+                if len(args) != 2:
+                    print("Uso: move <nome_arquivo> <novo_diretorio>")
+                else:
+                    fs.move(args[0], args[1])
+                    print(f"Arquivo '{args[0]}' movido para '{args[1]}' com sucesso.")
+            elif cmd == "write":
+                if len(args) < 2:
+                    print("Uso: write <arquivo> <texto>")
+                else:
+                    nome_arquivo = args[0]
+                    texto = ' '.join(args[1:])
+                    tamanho = fs.write_file(nome_arquivo, texto)
+                    print(f"Dados escritos em '{nome_arquivo}' ({tamanho} bytes).")
+            elif cmd == "append":
+                if len(args) < 2:
+                    print("Uso: append <arquivo> <texto>")
+                else:
+                    escritos = fs.append(args[0], ' '.join(args[1:]))
+                    print(f"Dados anexados a '{args[0]}' ({escritos} bytes).")
+            elif cmd == "pwrite":
+                if len(args) < 3 or not args[1].isdigit():
+                    print("Uso: pwrite <arquivo> <offset> <texto>")
+                else:
+                    escritos = fs.pwrite(args[0], int(args[1]), ' '.join(args[2:]))
+                    print(f"Dados escritos em '{args[0]}' a partir do byte {args[1]} ({escritos} bytes).")
+            elif cmd == "truncate":
+                if len(args) != 2 or not args[1].isdigit():
+                    print("Uso: truncate <arquivo> <tamanho>")
+                else:
+                    fs.truncate(args[0], int(args[1]))
+                    print(f"Arquivo '{args[0]}' truncado para {args[1]} bytes.")
+            elif cmd == "read":
+                if len(args) != 1:
+                    print("Uso: read <arquivo>")
+                else:
+                    with fs.open(args[0]) as handle:
+                        print(f"Conteúdo de '{args[0]}' ({handle.size} bytes):")
+                        for texto in handle.iter_text():
+                            print(texto, end='')
+                    print()
+            elif cmd == "delete":
+                if len(args) != 1:
+                    print("Uso: delete <nome>")
+                else:
+                    fs.delete(args[0])
+                    print(f"'{args[0]}' excluído com sucesso.")
+            elif cmd == "detalhes":
+                if len(args) != 1:
+                    print("Uso: detalhes <arquivo|diretorio>")
+                else:
+                    print(format_details(fs.detalhes(args[0])))
+            elif cmd == "status":
+                print()
+                print(format_status(fs.status()))
+            elif cmd == "bulk-load":
+                if len(args) != 1:
+                    print("Uso: bulk-load <manifesto>")
+                else:
+                    try:
+                        resultado = fs.write_many(read_manifest(args[0]))
+                    except (OSError, ValueError) as e:
+                        print(f"Erro: {e}")
+                    else:
+                        print(f"Lote gravado: {resultado['files']} arquivos, {resultado['bytes']} bytes "
+                              f"em {resultado['extents']} extents.")
+                        for caminho, mensagem in resultado['errors']:
+                            print(f"  {caminho}: {mensagem}")
+            elif cmd == "sync":
+                paginas = fs.sync()
+                if paginas is not None:
+                    print(f"Imagem '{fs.image.path}' sincronizada ({paginas} páginas de dados gravadas).")
+            elif cmd == "defrag":
+                if len(args) > 1 or not all(a.isdigit() for a in args):
+                    print("Uso: defrag [max_blocos]")
+                else:
+                    print(format_defrag(fs.defrag(int(args[0]) if args else None)))
+            elif cmd == "stats":
+                if args[:1] == ["json"] and len(args) <= 2:
+                    texto = json.dumps(fs.metrics_snapshot(), indent=2)
+                    if len(args) == 1:
+                        print(texto)
+                    else:
+                        try:
+                            with open(args[1], 'w') as f:
+                                f.write(texto + "\n")
+                        except OSError as e:
+                            print(f"Erro: {e}")
+                        else:
+                            print(f"Métricas gravadas em '{args[1]}'.")
+                elif args:
+                    print("Uso: stats [json [arquivo]]")
+                else:
+                    print("\n=== MÉTRICAS POR OPERAÇÃO (i-nodes) ===")
+                    print(format_stats(fs.metrics_snapshot()))
+            elif cmd == "trace":
+                if len(args) != 1:
+                    print("Uso: trace <arquivo>|off")
+                elif args[0] == "off":
+                    if tracer is None:
+                        print("Erro: Nenhum trace ativo.")
+                    else:
+                        fs.metrics.tracer = None
+                        tracer.close()
+                        print(f"Trace em '{tracer.path}' encerrado.")
+                        tracer = None
+                else:
+                    try:
+                        novo = TraceWriter(args[0])
+                    except OSError as e:
+                        print(f"Erro: {e}")
+                    else:
+                        if tracer is not None:
+                            tracer.close()
+                        tracer = fs.metrics.tracer = novo
+                        print(f"Cada operação será registrada em '{args[0]}'.")
+            elif cmd == "mount":
+                if len(args) not in (1, 2):
+                    print("Uso: mount <imagem> [off|per-op|group]")
+                else:
+                    # A imagem atual só é desmontada depois que a nova montou,
+                    # a não ser que seja a mesma: ela não pode ficar aberta duas vezes.
+                    if fs.image is not None and os.path.realpath(args[0]) == os.path.realpath(fs.image.path):
+                        fs.unmount()
+                        fs = FileSystem()
+                        fs.metrics.tracer = tracer
+                    try:
+                        novo = FileSystem.mount(args[0], journal=args[1] if len(args) == 2 else 'off')
+                    except (OSError, ValueError) as e:
+                        print(f"Erro: {e}")
+                    else:
+                        if fs.image is not None:
+                            fs.unmount()
+                        fs = novo
+                        fs.metrics.tracer = tracer
+                        if fs.replayed:
+                            print(f"Diário: {fs.replayed} operações reaplicadas.")
+                        print(f"Imagem '{args[0]}' montada.")
+            elif cmd == "unmount":
+                fs.unmount()
+                fs = FileSystem()
+                fs.metrics.tracer = tracer
+            elif cmd == 'benchmark-access':
+                fs_inode = FileSystem()
+                fs_linked = SistemaArquivos()
+                fs_indexado = SistemaArquivos(modo_acesso='indexado')
+                fs_inode.write_file("teste.txt", "abcdefghij" * 10000)
+                fs_linked.escrever_arquivo("teste.txt", "abcdefghij" * 10000)
+                fs_indexado.escrever_arquivo("teste.txt", "abcdefghij" * 10000)
+                for k in [5, 10, 50, 900, 1000, 5000]:
+                    tempo_inode = benchmark_inode_access(fs_inode, "teste.txt", k)
+                    tempo_linked_list = benchmark_inode_access_linked_list(fs_linked, "teste.txt", k)
+                    tempo_indexado = benchmark_inode_access_linked_list(fs_indexado, "teste.txt", k)
+                    print(f"Bloco {k}:")
+                    for rotulo, r in (("INODE", tempo_inode), ("LINKED LIST", tempo_linked_list),
+                                      ("LINKED LIST INDEXADA", tempo_indexado)):
+                        print(f"  {rotulo}: {describe(r)}")
+            elif cmd == 'benchmark-device':
+                print("\n=== Acesso ao bloco k com cache frio (50 us por acesso, 200 us por busca) ===")
+                fs_dev = FileSystem(cache_lines=16, access_us=50, seek_us=200)
+                linked_dev = SistemaArquivos(linhas_cache=16, latencia_us=50, busca_us=200)
+                indexado_dev = SistemaArquivos(modo_acesso='indexado', linhas_cache=16, latencia_us=50, busca_us=200)
+                fs_dev.write_file("teste.txt", "abcdefghij" * 10000)
+                linked_dev.escrever_arquivo("teste.txt", "abcdefghij" * 10000)
+                indexado_dev.escrever_arquivo("teste.txt", "abcdefghij" * 10000)
+                for k in [5, 1000, 5000, 12000]:
+                    tempo_inode = benchmark_inode_access(fs_dev, "teste.txt", k, cold=True)
+                    tempo_linked_list = benchmark_inode_access_linked_list(linked_dev, "teste.txt", k, cold=True)
+                    tempo_indexado = benchmark_inode_access_linked_list(indexado_dev, "teste.txt", k, cold=True)
+                    print(f"Bloco {k}:")
+                    for rotulo, r in (("INODE", tempo_inode), ("LINKED LIST", tempo_linked_list),
+                                      ("LINKED LIST INDEXADA", tempo_indexado)):
+                        print(f"  {rotulo}: {describe(r, 3)}")
+                for rotulo, sistema in (("INODE", fs_dev.disk), ("LINKED LIST", linked_dev.disco),
+                                        ("LINKED LIST INDEXADA", indexado_dev.disco)):
+                    r = sistema.stats()
+                    print(f"{rotulo}: {r['misses']} faltas | {r['device_reads']} leituras | "
+                          f"{r['simulated_ms']:.3f} ms simulados")
+            elif cmd == 'benchmark-write':
+                print("\n=== Benchmark de Escrita ===")
+                sizes = [10, 100, 1000]
+                for size in sizes:
+                    result = benchmark_write_file(fs, f"bench_{size}.txt", size)
+                    print(f"Tamanho: {size} bytes | {describe(result, 4)}")
+            elif cmd == 'benchmark-delete':
+                fs_inode = FileSystem()  
+                fs_linked = SistemaArquivos() 
             
-            file_sizes = [100, 1000] 
-            file_names = ["teste1.txt", "teste2.txt"]
+                file_sizes = [100, 1000] 
+                file_names = ["teste1.txt", "teste2.txt"]
 
-            print("\n=== Benchmark de Exclusão com Inode ===")
-            for name, size in zip(file_names, file_sizes):
-                fs_inode.write_file(name, "abcdefghij" * (size // 10))  
-                inode_id = fs_inode.current_dir.entries.get(name)
-                if inode_id is not None:
-                    blocks = len(fs_inode.inodes[inode_id].data_blocks) if hasattr(fs_inode.inodes[inode_id], 'data_blocks') else 'N/A'
-                    print(f"Arquivo '{name}' criado com {size} bytes (blocos: {blocks}).")
+                print("\n=== Benchmark de Exclusão com Inode ===")
+                for name, size in zip(file_names, file_sizes):
+                    fs_inode.write_file(name, "abcdefghij" * (size // 10))  
+                    inode_id = fs_inode.current_dir.entries.get(name)
+                    if inode_id is not None:
+                        blocks = len(fs_inode.inodes[inode_id].data_blocks) if hasattr(fs_inode.inodes[inode_id], 'data_blocks') else 'N/A'
+                        print(f"Arquivo '{name}' criado com {size} bytes (blocos: {blocks}).")
 
-            for name in file_names:
-                tempo_delete = benchmark_inode_delete(fs_inode, name)
-                if tempo_delete >= 0:
-                    print(f"INODE: Exclusão do arquivo '{name}': {tempo_delete:.8f} milisegundos")
+                for name in file_names:
+                    tempo_delete = benchmark_inode_delete(fs_inode, name)
+                    print(f"INODE: Exclusão do arquivo '{name}': {describe(tempo_delete)}")
             
-            print("\n=== Benchmark de Exclusão com Alocação Encadeada ===")
-            for name, size in zip(file_names, file_sizes):
-                fs_linked.escrever_arquivo(name, "abcdefghij" * (size // 10))  
+                print("\n=== Benchmark de Exclusão com Alocação Encadeada ===")
+                for name, size in zip(file_names, file_sizes):
+                    fs_linked.escrever_arquivo(name, "abcdefghij" * (size // 10))  
 
-                inode_id = fs_linked.diretorio_atual.entries.get(name)
-                if inode_id is not None:
-                    blocks = 'Encadeado' if hasattr(fs_linked.nos[inode_id], 'first_block') else 'N/A'
-                    print(f"Arquivo '{name}' criado com {size} bytes (blocos: {blocks}).")
+                    inode_id = fs_linked.diretorio_atual.entries.get(name)
+                    if inode_id is not None:
+                        blocks = 'Encadeado' if hasattr(fs_linked.nos[inode_id], 'first_block') else 'N/A'
+                        print(f"Arquivo '{name}' criado com {size} bytes (blocos: {blocks}).")
 
-            for name in file_names:
-                tempo_delete = benchmark_linked_delete(fs_linked, name)
-                if tempo_delete >= 0:
-                    print(f"ENC: Exclusão do arquivo '{name}': {tempo_delete:.8f} milisegundos")
-            print("\n=== Fim do Benchmark ===")
-        elif cmd == 'benchmark-move':
-            fs_linked = SistemaArquivos()
-            fs_linked.escrever_arquivo("arquivo2.txt", "abcdefghij")
-            fs_linked.criar_diretorio('destino_linked')
-            fs.write_file("arquivo1.txt", "abcdefghij")
-            fs.create_dir('destino')
-            tempo_inode = benchmark_move_inode(fs, "arquivo1.txt", "destino")
-            tempo_linked = benchmark_move_linked_list(fs_linked, "arquivo2.txt", "destino_linked")
-            if tempo_inode >= 0:
-                print(f"Tempo para mover i-node: {tempo_inode:.4f} ms")
-            if tempo_linked >= 0:
-                print(f"Tempo para mover lista encadeada: {tempo_linked:.4f} ms")
-        else:
-            print("Comando inválido. Comandos disponíveis: create, ls, cd, move, exit")
+                for name in file_names:
+                    tempo_delete = benchmark_linked_delete(fs_linked, name)
+                    print(f"ENC: Exclusão do arquivo '{name}': {describe(tempo_delete)}")
+                print("\n=== Fim do Benchmark ===")
+            elif cmd == 'benchmark-move':
+                fs_inode = FileSystem()
+                fs_linked = SistemaArquivos()
+                fs_linked.escrever_arquivo("arquivo2.txt", "abcdefghij")
+                fs_linked.criar_diretorio('destino_linked')
+                fs_inode.write_file("arquivo1.txt", "abcdefghij")
+                fs_inode.create_dir('destino')
+                tempo_inode = benchmark_move_inode(fs_inode, "arquivo1.txt", "destino")
+                tempo_linked = benchmark_move_linked_list(fs_linked, "arquivo2.txt", "destino_linked")
+                print(f"Tempo para mover i-node: {describe(tempo_inode, 4)}")
+                print(f"Tempo para mover lista encadeada: {describe(tempo_linked, 4)}")
+            elif cmd == 'benchmark-move-scaling':
+                print("\n=== Benchmark de move x número de arquivos (i-node) ===")
+                for quantidade, r in benchmark_move_scaling().items():
+                    print(f"Arquivos: {quantidade:7} | move: {describe(r)}")
+            elif cmd == 'benchmark-memory':
+                print("\n=== Memória por arquivo (bytes) ===")
+                for rotulo, resultado in (("INODE", benchmark_memory_per_file()),
+                                          ("LINKED LIST", benchmark_memoria_por_arquivo())):
+                    print(f"{rotulo}: antes = {resultado['before']:.1f} | depois = {resultado['after']:.1f} "
+                          f"({resultado['files']} arquivos)")
+            elif cmd == 'benchmark-append':
+                print("\n=== Custo de append conforme o arquivo cresce ===")
+                inode = benchmark_append(FileSystem(), "log.txt")
+                linked = benchmark_anexar_linked_list(SistemaArquivos(), "log.txt")
+                for (tamanho, t_inode), t_linked in zip(inode.items(), linked.values()):
+                    print(f"Tamanho: {tamanho:8} bytes | INODE = {t_inode['median_ms']:.6f} ms "
+                          f"(p99 {t_inode['p99_ms']:.6f}) | LINKED LIST = {t_linked['median_ms']:.6f} ms "
+                          f"(p99 {t_linked['p99_ms']:.6f})")
+            elif cmd == 'benchmark-journal':
+                print("\n=== Vazão de create + delete por modo de diário ===")
+                for rotulo, resultado in (("INODE", benchmark_journal()), ("LINKED LIST", benchmark_diario())):
+                    for modo, r in resultado.items():
+                        print(f"{rotulo} [{modo}]: {r['ops_per_s']:.0f} ops/s | {describe(r, 4)} por par | "
+                              f"{r['commits']} commits")
+            elif cmd == 'benchmark-concurrency':
+                print("\n=== Vazão com N threads num único sistema (modo concorrente) ===")
+                for rotulo, resultado in (("INODE", benchmark_concurrency()), ("LINKED LIST", benchmark_concorrencia())):
+                    for threads, r in resultado.items():
+                        estado = "ok" if not r['problems'] else f"{len(r['problems'])} problemas"
+                        print(f"{rotulo} [{threads} threads]: {r['ops_per_s']:.0f} ops/s | "
+                              f"{r['torn_reads']} leituras inconsistentes | invariantes: {estado}")
+            elif cmd == 'benchmark-server':
+                print("\n=== Servidor asyncio: 200 conexões simultâneas num sistema concorrente ===")
+                for rotulo, alvo in (("INODE", FileSystem(concurrent=True)), ("LINKED LIST", SistemaArquivos(concorrente=True))):
+                    r = benchmark_server(alvo)
+                    print(f"{rotulo}: {r['rps']:.0f} pedidos/s | p50 = {r['p50_ms']:.3f} ms | "
+                          f"p99 = {r['p99_ms']:.3f} ms | {r['errors']} erros")
+            elif cmd == 'benchmark-allocation':
+                print("\n=== Políticas de alocação num disco envelhecido (80% cheio) ===")
+                for rotulo, resultado in (("INODE", benchmark_allocation()), ("LINKED LIST", benchmark_alocacao())):
+                    for politica, r in resultado.items():
+                        print(f"{rotulo} [{politica}]: {r['ops_per_s']:.0f} ops/s | "
+                              f"{r['extents_per_file']:.2f} extents/arquivo | salto médio {r['average_gap']:.0f} | "
+                              f"maior livre {r['largest_free']} em {r['free_extents']} trechos | "
+                              f"{r['seeks_per_file']:.2f} buscas/arquivo")
+            elif cmd == 'benchmark-defrag':
+                print("\n=== Leitura fria de um disco envelhecido antes e depois da desfragmentação ===")
+                for rotulo, r in (("INODE", benchmark_defrag()), ("LINKED LIST", benchmark_desfragmentar())):
+                    for momento, chave in (("antes", 'before'), ("depois", 'after')):
+                        f = r[chave]
+                        print(f"{rotulo} [{momento}]: {f['read_mb_per_s']:.2f} MB/s | "
+                              f"{f['seeks_per_file']:.2f} buscas/arquivo | {f['extents_per_file']:.2f} extents/arquivo | "
+                              f"maior livre {f['largest_free']} em {f['free_extents']} trechos")
+                    estado = "ok" if not r['problems'] else f"{len(r['problems'])} problemas"
+                    print(f"{rotulo}: {r['calls']} chamadas | {r['moved_blocks']} blocos copiados | "
+                          f"pausa máxima {r['max_pause_ms']:.1f} ms | invariantes: {estado}")
+            elif cmd == 'benchmark-metrics':
+                print("\n=== Custo das métricas: a mesma mistura de operações com e sem elas ===")
+                for rotulo, r in (("INODE", benchmark_metrics()), ("LINKED LIST", benchmark_metricas())):
+                    print(f"{rotulo}: ligadas {r['on']['median_ms'] * 1000:.2f} us | "
+                          f"desligadas {r['off']['median_ms'] * 1000:.2f} us | custo {r['overhead_pct']:+.1f}%")
+            elif cmd == 'benchmark-workload':
+                print("\n=== Carga sintética semeada (1000 arquivos de 64 B a 4 KiB, 20000 operações, Zipf 1.0, até 80% do disco) ===")
+                for backend, resultado in benchmark_workloads().items():
+                    for mix, r in resultado.items():
+                        print(f"{backend.upper()} [{mix}]: {r['ops_per_s']:.0f} ops/s | {r['mb_per_s']:.1f} MB/s escritos | "
+                              f"{r['errors']} erros")
+            elif cmd == 'benchmark-scaling':
+                print("\n=== Crescimento da latência com o número de entradas (10^2 a 10^4; 10^6 em scaling.py) ===")
+                resultados = run_scaling(sizes=SIZES[:3])
+                for backend, formas in resultados.items():
+                    for forma, operacoes in formas.items():
+                        medidas = " | ".join(f"{op} ~n^{r['exponent']:.2f}" for op, r in operacoes.items())
+                        print(f"{backend.upper()} [{forma}]: {medidas}")
+                for falha in regressions(resultados):
+                    print(f"Regressão: {falha}")
+            elif cmd == 'benchmark-extents':
+                print("\n=== Metadados por arquivo: extents x lista de blocos ===")
+                for layout, r in benchmark_extent_metadata().items():
+                    print(f"{layout}: {r['extents']} extents | extents = {r['extent_bytes']} bytes | "
+                          f"lista = {r['list_bytes']} bytes")
+            else:
+                print(f"Comando inválido. Comandos disponíveis: {', '.join(COMANDOS)}")
+        except FileSystemError as e:
+            print(f"Erro: {e}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
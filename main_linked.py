@@ -1,7 +1,19 @@
 from entity.file_system_linked import SistemaArquivos, benchmark_inode_access_linked_list, benchmark_move_linked_list, benchmark_write_file_linked_list
+from entity.manifest import read_manifest
+from entity.bench import describe
+from entity.metrics import TraceWriter, format_stats
+from entity.errors import FileSystemError
+from entity.report import format_status, format_details, format_listing, format_defrag
+import json
+import os
+
+COMANDOS = ('create', 'ls', 'cd', 'move', 'write', 'append', 'pwrite', 'truncate', 'read', 'delete',
+            'detalhes', 'status', 'bulk-load', 'sync', 'defrag', 'stats', 'trace', 'mount', 'unmount',
+            'benchmark', 'benchmark-move', 'exit')
 
 def main():
     fs = SistemaArquivos()
+    tracer = None
     print("Sistema de Arquivos com Alocação por Lista Encadeada (digite 'exit' para sair)")
     
     while True:
@@ -13,78 +25,204 @@ def main():
         cmd = comando[0].lower()
         args = comando[1:] if len(comando) > 1 else []
 
-        if cmd == "exit":
-            break
-        elif cmd == "create":
-            if len(args) < 2:
-                print("Uso: create [file|dir] <nome>")
-            elif args[0] == "file":
-                fs.criar_arquivo(args[1])
-            elif args[0] == "dir":
-                fs.criar_diretorio(args[1])
-            else:
-                print("Uso: create [file|dir] <nome>")
-        elif cmd == "ls":
-            fs.listar()
-        elif cmd == "cd":
-            if len(args) != 1:
-                print("Uso: cd <nome>")
-            else:
-                fs.mudar_diretorio(args[0])
-        elif cmd == "move":
-            if len(args) != 2:
-                print("Uso: move <nome_arquivo> <novo_diretorio>")
-            else:
-                fs.mover(args[0], args[1])
-        elif cmd == "write":
-            if len(args) < 2:
-                print("Uso: write <arquivo> <texto>")
-            else:
-                nome_arquivo = args[0]
-                texto = ' '.join(args[1:])
-                fs.escrever_arquivo(nome_arquivo, texto)
-        elif cmd == "read":
-            if len(args) != 1:
-                print("Uso: read <arquivo>")
-            else:
-                fs.ler_arquivo(args[0])
-        elif cmd == "delete":
-            if len(args) != 1:
-                print("Uso: delete <nome>")
-            else:
-                fs.deletar(args[0])
-        elif cmd == "status":
-            fs.status()
-        elif cmd == 'benchmark':
-            fs.escrever_arquivo("teste.txt", "abcdefghij" * 100)
+        try:
+            if cmd == "exit":
+                if fs.imagem is not None:
+                    fs.desmontar()
+                if tracer is not None:
+                    tracer.close()
+                break
+            elif cmd == "create":
+                if len(args) < 2:
+                    print("Uso: create [file|dir] <nome>")
+                elif args[0] == "file":
+                    fs.criar_arquivo(args[1])
+                    print(f"Arquivo '{args[1]}' criado com sucesso.")
+                elif args[0] == "dir":
+                    fs.criar_diretorio(args[1])
+                    print(f"Diretório '{args[1]}' criado com sucesso.")
+                else:
+                    print("Uso: create [file|dir] <nome>")
+            elif cmd == "ls":
+                print(format_listing(fs.listar()))
+            elif cmd == "cd":
+                if len(args) != 1:
+                    print("Uso: cd <nome>")
+                else:
+                    fs.mudar_diretorio(args[0])
+            elif cmd == "move":
+                if len(args) != 2:
+                    print("Uso: move <nome_arquivo> <novo_diretorio>")
+                else:
+                    fs.mover(args[0], args[1])
+                    print(f"Arquivo '{args[0]}' movido para '{args[1]}' com sucesso.")
+            elif cmd == "write":
+                if len(args) < 2:
+                    print("Uso: write <arquivo> <texto>")
+                else:
+                    nome_arquivo = args[0]
+                    texto = ' '.join(args[1:])
+                    tamanho = fs.escrever_arquivo(nome_arquivo, texto)
+                    print(f"Dados escritos em '{nome_arquivo}' ({tamanho} bytes).")
+            elif cmd == "append":
+                if len(args) < 2:
+                    print("Uso: append <arquivo> <texto>")
+                else:
+                    escritos = fs.anexar(args[0], ' '.join(args[1:]))
+                    print(f"Dados anexados a '{args[0]}' ({escritos} bytes).")
+            elif cmd == "pwrite":
+                if len(args) < 3 or not args[1].isdigit():
+                    print("Uso: pwrite <arquivo> <offset> <texto>")
+                else:
+                    escritos = fs.escrever_em(args[0], int(args[1]), ' '.join(args[2:]))
+                    print(f"Dados escritos em '{args[0]}' a partir do byte {args[1]} ({escritos} bytes).")
+            elif cmd == "truncate":
+                if len(args) != 2 or not args[1].isdigit():
+                    print("Uso: truncate <arquivo> <tamanho>")
+                else:
+                    fs.truncar(args[0], int(args[1]))
+                    print(f"Arquivo '{args[0]}' truncado para {args[1]} bytes.")
+            elif cmd == "read":
+                if len(args) != 1:
+                    print("Uso: read <arquivo>")
+                else:
+                    with fs.abrir(args[0]) as handle:
+                        print(f"Conteúdo de '{args[0]}' ({handle.size} bytes):")
+                        for texto in handle.iter_text():
+                            print(texto, end='')
+                    print()
+            elif cmd == "delete":
+                if len(args) != 1:
+                    print("Uso: delete <nome>")
+                else:
+                    fs.deletar(args[0])
+                    print(f"'{args[0]}' excluído com sucesso.")
+            elif cmd == "status":
+                print()
+                print(format_status(fs.status()))
+            elif cmd == "bulk-load":
+                if len(args) != 1:
+                    print("Uso: bulk-load <manifesto>")
+                else:
+                    try:
+                        resultado = fs.escrever_varios(read_manifest(args[0]))
+                    except (OSError, ValueError) as e:
+                        print(f"Erro: {e}")
+                    else:
+                        print(f"Lote gravado: {resultado['files']} arquivos, {resultado['bytes']} bytes "
+                              f"em {resultado['extents']} extents.")
+                        for caminho, mensagem in resultado['errors']:
+                            print(f"  {caminho}: {mensagem}")
+            elif cmd == "sync":
+                paginas = fs.sincronizar()
+                if paginas is not None:
+                    print(f"Imagem '{fs.imagem.path}' sincronizada ({paginas} páginas de dados gravadas).")
+            elif cmd == "defrag":
+                if len(args) > 1 or not all(a.isdigit() for a in args):
+                    print("Uso: defrag [max_blocos]")
+                else:
+                    print(format_defrag(fs.desfragmentar(int(args[0]) if args else None)))
+            elif cmd == "stats":
+                if args[:1] == ["json"] and len(args) <= 2:
+                    texto = json.dumps(fs.metricas(), indent=2)
+                    if len(args) == 1:
+                        print(texto)
+                    else:
+                        try:
+                            with open(args[1], 'w') as f:
+                                f.write(texto + "\n")
+                        except OSError as e:
+                            print(f"Erro: {e}")
+                        else:
+                            print(f"Métricas gravadas em '{args[1]}'.")
+                elif args:
+                    print("Uso: stats [json [arquivo]]")
+                else:
+                    print("\n=== MÉTRICAS POR OPERAÇÃO (lista encadeada) ===")
+                    print(format_stats(fs.metricas()))
+            elif cmd == "trace":
+                if len(args) != 1:
+                    print("Uso: trace <arquivo>|off")
+                elif args[0] == "off":
+                    if tracer is None:
+                        print("Erro: Nenhum trace ativo.")
+                    else:
+                        fs.metrics.tracer = None
+                        tracer.close()
+                        print(f"Trace em '{tracer.path}' encerrado.")
+                        tracer = None
+                else:
+                    try:
+                        novo = TraceWriter(args[0])
+                    except OSError as e:
+                        print(f"Erro: {e}")
+                    else:
+                        if tracer is not None:
+                            tracer.close()
+                        tracer = fs.metrics.tracer = novo
+                        print(f"Cada operação será registrada em '{args[0]}'.")
+            elif cmd == "mount":
+                if len(args) not in (1, 2):
+                    print("Uso: mount <imagem> [off|per-op|group]")
+                else:
+                    # A imagem atual só é desmontada depois que a nova montou,
+                    # a não ser que seja a mesma: ela não pode ficar aberta duas vezes.
+                    if fs.imagem is not None and os.path.realpath(args[0]) == os.path.realpath(fs.imagem.path):
+                        fs.desmontar()
+                        fs = SistemaArquivos()
+                        fs.metrics.tracer = tracer
+                    try:
+                        novo = SistemaArquivos.montar(args[0], diario=args[1] if len(args) == 2 else 'off')
+                    except (OSError, ValueError) as e:
+                        print(f"Erro: {e}")
+                    else:
+                        if fs.imagem is not None:
+                            fs.desmontar()
+                        fs = novo
+                        fs.metrics.tracer = tracer
+                        if fs.reaplicadas:
+                            print(f"Diário: {fs.reaplicadas} operações reaplicadas.")
+                        print(f"Imagem '{args[0]}' montada.")
+            elif cmd == "unmount":
+                fs.desmontar()
+                fs = SistemaArquivos()
+                fs.metrics.tracer = tracer
+            elif cmd == 'benchmark':
+                fs.escrever_arquivo("teste.txt", "abcdefghij" * 100)
 
-            for k in [0, 1, 5, 9, 1000, 5000]:
-                tempo_inode = benchmark_inode_access_linked_list(fs, "teste.txt", k)
-                print(f"LINKED-LIST: Acesso ao bloco {k}: {tempo_inode:.8f} milisegundos")
+                for k in [0, 1, 5, 9, 1000, 5000]:
+                    try:
+                        tempo_inode = benchmark_inode_access_linked_list(fs, "teste.txt", k)
+                    except FileSystemError as e:
+                        print(f"Erro: {e}")
+                        continue
+                    print(f"LINKED-LIST: Acesso ao bloco {k}: {describe(tempo_inode, 8)}")
             
-            print("\n=== Benchmark de Escrita (Lista Encadeada) ===")
-            tamanhos = [10, 100, 1000, 10000]
+                print("\n=== Benchmark de Escrita (Lista Encadeada) ===")
+                tamanhos = [10, 100, 1000, 10000]
             
-            for tamanho in tamanhos:
-                resultado = benchmark_write_file_linked_list(fs, f"bench_{tamanho}.txt", tamanho, 1)
-                print(f"Tamanho: {tamanho:6} bytes | "
-                f"Tempo: {resultado['average_time']:7.3f} ms | "
-                f"Blocos: {resultado['blocks_used']:4}")
-        elif cmd == "detalhes":
-            if len(args) != 1:
-                print("Uso: detalhes <arquivo|diretorio>")
-            else:
-                fs.detalhes(args[0])
+                for tamanho in tamanhos:
+                    resultado = benchmark_write_file_linked_list(fs, f"bench_{tamanho}.txt", tamanho)
+                    print(f"Tamanho: {tamanho:6} bytes | "
+                    f"{describe(resultado, 3)} | "
+                    f"Blocos: {resultado['blocks_used']:4}")
+            elif cmd == "detalhes":
+                if len(args) != 1:
+                    print("Uso: detalhes <arquivo|diretorio>")
+                else:
+                    print(format_details(fs.detalhes(args[0])))
 
-        elif cmd == 'benchmark-move':
-            fs.escrever_arquivo("arquivo1.txt", "abcdefghij")
-            fs.criar_diretorio('destino')
-            tempo_ms = benchmark_move_linked_list(fs, "arquivo1.txt", "destino")
-            if tempo_ms >= 0:
-                print(f"Tempo para mover: {tempo_ms:.4f} ms")
+            elif cmd == 'benchmark-move':
+                fs_bench = SistemaArquivos()
+                fs_bench.escrever_arquivo("arquivo1.txt", "abcdefghij")
+                fs_bench.criar_diretorio('destino')
+                tempo_ms = benchmark_move_linked_list(fs_bench, "arquivo1.txt", "destino")
+                print(f"Tempo para mover: {describe(tempo_ms, 4)}")
 
-        else:
-            print("Comando inválido. Comandos disponíveis: create, ls, cd, move, write, read, delete, exit")
+            else:
+                print(f"Comando inválido. Comandos disponíveis: {', '.join(COMANDOS)}")
+        except FileSystemError as e:
+            print(f"Erro: {e}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,41 @@
+import argparse
+import json
+import sys
+from entity.scaling import SIZES, SHAPES, run_scaling, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Suíte de escalabilidade: mede cada operação em árvores de 10^2 a 10^6 entradas e "
+                    "falha (código 1) se uma operação O(1)/O(profundidade) crescer com n.")
+    parser.add_argument('--backends', default="inode,linked")
+    parser.add_argument('--max-size', type=int, default=SIZES[-1], help="maior número de entradas")
+    parser.add_argument('--shapes', default=",".join(SHAPES), help=f"disponíveis: {', '.join(SHAPES)}")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', help="grava os resultados completos neste arquivo")
+    args = parser.parse_args()
+
+    shapes = {nome: SHAPES[nome] for nome in args.shapes.split(',')}
+    sizes = tuple(n for n in SIZES if n <= args.max_size)
+    results = run_scaling(tuple(args.backends.split(',')), sizes, shapes, args.repeat)
+
+    for backend, formas in results.items():
+        for shape, operacoes in formas.items():
+            print(f"\n=== {backend} / {shape} (profundidade {shapes[shape][0]}, {shapes[shape][1]} por nível) ===")
+            for op, r in operacoes.items():
+                latencias = " | ".join(f"{n}: {t:.4f}" for n, t in r['latency_ms'].items())
+                estado = "ok" if r['ok'] else "REGRESSÃO"
+                print(f"{op:14} ~n^{r['exponent']:5.2f} {r['order']:9} (esperado {r['expected']:8}) {estado:9} "
+                      f"ms: {latencias}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    falhas = regressions(results)
+    for falha in falhas:
+        print(f"Regressão: {falha}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
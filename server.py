@@ -0,0 +1,54 @@
+import asyncio
+import sys
+from entity.file_system import FileSystem
+from entity.file_system_linked import SistemaArquivos
+from entity.server import FileServer, COMANDOS
+from entity.load_client import run_load
+
+USO = ("Uso: python server.py [inode|linked] [porta|caminho.sock]\n"
+       "     python server.py load <porta|caminho.sock> [conexoes] [pedidos_por_conexao]")
+
+
+def _endereco(alvo: str) -> dict:
+    if alvo.isdigit():
+        return {'port': int(alvo)}
+    return {'path': alvo}
+
+
+async def servir(tipo: str, alvo: str):
+    fs = SistemaArquivos(concorrente=True) if tipo == "linked" else FileSystem(concurrent=True)
+    server = FileServer(fs)
+    endereco = await server.start(**_endereco(alvo))
+    print(f"Servidor ({tipo}) ouvindo em {endereco}. Comandos: {', '.join(COMANDOS)}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == "load":
+        if len(args) not in (2, 3, 4) or not all(a.isdigit() for a in args[2:]):
+            print(USO)
+            return
+        numeros = [int(a) for a in args[2:]]
+        opcoes = dict(zip(('connections', 'requests_per_connection'), numeros))
+        r = asyncio.run(run_load(**_endereco(args[1]), **opcoes))
+        print(f"{r['connections']} conexões | {r['requests']} pedidos em {r['seconds']:.2f} s | "
+              f"{r['rps']:.0f} pedidos/s | p50 = {r['p50_ms']:.3f} ms | p99 = {r['p99_ms']:.3f} ms | "
+              f"{r['errors']} erros")
+        return
+    tipo = args[0] if args else "inode"
+    alvo = args[1] if len(args) > 1 else "8765"
+    if tipo not in ("inode", "linked") or len(args) > 2:
+        print(USO)
+        return
+    try:
+        asyncio.run(servir(tipo, alvo))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import os
+import time
+from entity.sweep import MATRIZ, ALOCADORES, run_sweep, write_csv, write_json
+
+
+def _lista(tipo):
+    return lambda texto: tuple(tipo(v) for v in texto.split(','))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Varredura de benchmarks: backend x tamanho x quantidade x operação x alocador, "
+                    "com as células rodando em paralelo, uma por processo.")
+    parser.add_argument('--backends', type=_lista(str), default=MATRIZ['backend'])
+    parser.add_argument('--sizes', type=_lista(int), default=MATRIZ['file_size'], help="bytes por arquivo")
+    parser.add_argument('--counts', type=_lista(int), default=MATRIZ['file_count'], help="arquivos por célula")
+    parser.add_argument('--ops', type=_lista(str), default=MATRIZ['operation'])
+    parser.add_argument('--allocators', type=_lista(str), default=MATRIZ['allocator'],
+                        help=f"disponíveis: {', '.join(ALOCADORES)}")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--csv', default="sweep.csv")
+    parser.add_argument('--json', default="sweep.json")
+    args = parser.parse_args()
+
+    matriz = {'backend': args.backends, 'file_size': args.sizes, 'file_count': args.counts,
+              'operation': args.ops, 'allocator': args.allocators}
+
+    def progresso(feitas, total, r):
+        estado = r['error'] or f"{r['ops_per_s']:.0f} ops/s"
+        print(f"[{feitas}/{total}] {r['backend']} {r['operation']} {r['file_count']} x {r['file_size']} B "
+              f"({r['allocator']}): {estado}")
+
+    inicio = time.perf_counter()
+    resultados = run_sweep(matriz, workers=args.workers, seed=args.seed, progress=progresso)
+    write_csv(resultados, args.csv)
+    write_json(resultados, args.json)
+    erros = sum(1 for r in resultados if r['error'])
+    print(f"{len(resultados)} células em {time.perf_counter() - inicio:.1f} s com {args.workers} processos "
+          f"({erros} com erro). Resultados em {args.csv} e {args.json}.")
+
+
+if __name__ == "__main__":
+    main()
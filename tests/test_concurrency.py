@@ -0,0 +1,43 @@
+import threading
+import unittest
+from contextlib import suppress
+
+from entity.errors import NoSpaceError
+from entity.file_system import FileSystem
+
+
+class ConcurrentOverwriteTest(unittest.TestCase):
+    """Outro escritor não pode tomar o espaço entre a verificação e a alocação de write_file."""
+
+    def test_no_shared_blocks(self):
+        fs = FileSystem(total_blocks=40, concurrent=True)
+        fs.write_file('a', 'a' * 80)
+        fs.write_file('b', 'b' * 80)
+        b_terminou = threading.Event()
+        registrar = fs._log
+
+        def registrar_devagar(*args):
+            # 'A' já passou pela verificação de espaço: dá a vez a 'B', que
+            # deve esperar pela trava do alocador em vez de tomar os blocos.
+            if threading.current_thread().name == 'A':
+                b_terminou.wait(1)
+            return registrar(*args)
+        fs._log = registrar_devagar
+
+        def escrever(nome, dados):
+            with suppress(NoSpaceError):
+                fs.write_file(nome, dados)
+            if nome == 'b':
+                b_terminou.set()
+
+        threads = [threading.Thread(target=escrever, args=('a', 'x' * 240), name='A'),
+                   threading.Thread(target=escrever, args=('b', 'y' * 240), name='B')]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(fs.check_invariants(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
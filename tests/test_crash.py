@@ -0,0 +1,129 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from entity.file_system import FileSystem
+from entity.file_system_linked import SistemaArquivos
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONTEUDO = "abc" * 100
+
+# Monta em modo 'group', grava e sincroniza 'x', altera 'x' e morre sem
+# desmontar: o registro da alteração fica pendente, nunca chega ao diário.
+FILHO = r'''
+import os, sys
+sys.path.insert(0, sys.argv[1])
+from entity.file_system import FileSystem
+from entity.file_system_linked import SistemaArquivos
+caminho, backend, acao = sys.argv[2:5]
+if backend == 'inode':
+    fs = FileSystem.mount(caminho, total_blocks=4096, journal='group')
+    escrever, deletar, sincronizar = fs.write_file, fs.delete, fs.sync
+else:
+    fs = SistemaArquivos.montar(caminho, total_blocos=4096, diario='group')
+    escrever, deletar, sincronizar = fs.escrever_arquivo, fs.deletar, fs.sincronizar
+escrever('x', %r)
+sincronizar()
+if acao == 'delete':
+    deletar('x')
+else:
+    escrever('x', 'zz')
+os._exit(0)
+''' % CONTEUDO
+
+
+class CrashAfterCheckpointTest(unittest.TestCase):
+    """Blocos liberados não podem ser zerados na imagem antes do registro que os libera ser durável."""
+
+    def _depois_da_queda(self, backend: str, acao: str):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'c.img')
+            subprocess.run([sys.executable, '-c', FILHO, RAIZ, caminho, backend, acao], check=True)
+            if backend == 'inode':
+                fs = FileSystem.mount(caminho)
+                resultado = fs.replayed, [n for n, _ in fs.ls()], fs.read_file('x'), fs.check_invariants()
+                fs.unmount()
+            else:
+                fs = SistemaArquivos.montar(caminho)
+                resultado = fs.reaplicadas, [n for n, _ in fs.listar()], fs.ler_arquivo('x'), \
+                    fs.verificar_invariantes()
+                fs.desmontar()
+            return resultado
+
+    def test_checkpointed_file_survives(self):
+        for backend in ('inode', 'linked'):
+            for acao in ('delete', 'overwrite'):
+                with self.subTest(backend=backend, acao=acao):
+                    reaplicadas, nomes, dados, problemas = self._depois_da_queda(backend, acao)
+                    self.assertEqual(reaplicadas, 0)
+                    self.assertEqual(nomes, ['x'])
+                    self.assertEqual(dados, CONTEUDO)
+                    self.assertEqual(problemas, [])
+
+
+GRANDE = "0123456789" * 1300
+
+# Fragmenta o disco (1000 arquivos pequenos, metade apagada e 'big' nos
+# buracos), sincroniza e morre no checkpoint do fim da desfragmentação: com
+# um cache de 4 linhas, os blocos movidos e zerados já chegaram à imagem.
+FILHO_DESFRAG = r'''
+import os, sys
+sys.path.insert(0, sys.argv[1])
+from entity.file_system import FileSystem
+from entity.file_system_linked import SistemaArquivos
+caminho, backend = sys.argv[2:4]
+if backend == 'inode':
+    fs = FileSystem.mount(caminho, total_blocks=4096, journal='group', cache_lines=4)
+    escrever, deletar, sincronizar, desfragmentar = fs.write_file, fs.delete, fs.sync, fs.defrag
+else:
+    fs = SistemaArquivos.montar(caminho, total_blocos=4096, diario='group', linhas_cache=4)
+    escrever, deletar, sincronizar, desfragmentar = fs.escrever_arquivo, fs.deletar, fs.sincronizar, fs.desfragmentar
+for i in range(1000):
+    escrever(f"s{i}", f"{i:04d}" * 6)
+for i in range(0, 1000, 2):
+    deletar(f"s{i}")
+escrever('big', %r)
+sincronizar()
+fs._checkpoint = lambda: os._exit(0)
+desfragmentar()
+os._exit(1)
+''' % GRANDE
+
+
+class CrashDuringDefragTest(unittest.TestCase):
+    """Uma queda no meio da desfragmentação não pode corromper arquivos já sincronizados."""
+
+    def _depois_da_queda(self, backend: str):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'd.img')
+            subprocess.run([sys.executable, '-c', FILHO_DESFRAG, RAIZ, caminho, backend], check=True)
+            if backend == 'inode':
+                fs = FileSystem.mount(caminho)
+                ler, problemas = fs.read_file, fs.check_invariants
+                reaplicadas = fs.replayed
+            else:
+                fs = SistemaArquivos.montar(caminho)
+                ler, problemas = fs.ler_arquivo, fs.verificar_invariantes
+                reaplicadas = fs.reaplicadas
+            errados = [i for i in range(1, 1000, 2) if ler(f"s{i}") != f"{i:04d}" * 6]
+            resultado = reaplicadas, ler('big') == GRANDE, errados, problemas()
+            if backend == 'inode':
+                fs.unmount()
+            else:
+                fs.desmontar()
+            return resultado
+
+    def test_files_survive(self):
+        for backend in ('inode', 'linked'):
+            with self.subTest(backend=backend):
+                reaplicadas, grande, errados, problemas = self._depois_da_queda(backend)
+                self.assertGreater(reaplicadas, 0)
+                self.assertTrue(grande)
+                self.assertEqual(errados, [])
+                self.assertEqual(problemas, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from entity.disk_image import DiskImage
+from entity.errors import NotMountedError
+from entity.file_system import FileSystem
+from entity.file_system_linked import SistemaArquivos
+
+
+class InterruptedSyncTest(unittest.TestCase):
+    """Um sync interrompido antes do cabeçalho não pode estragar os metadados anteriores."""
+
+    def test_previous_metadata_survives(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'i.img')
+            imagem = DiskImage(caminho, b'IN', 8, 4096)
+            imagem.sync(b'primeira' * 10, lsn=1)
+            imagem.sync(b'segunda' * 20, lsn=2)
+            # A queda acontece depois de a cópia nova estar no arquivo, antes
+            # de o cabeçalho apontar para ela.
+            with mock.patch.object(DiskImage, '_write_header', side_effect=OSError("queda")):
+                with self.assertRaises(OSError):
+                    imagem.sync(b'terceira' * 1000, lsn=3)
+            imagem.close()
+
+            imagem = DiskImage(caminho, b'IN', 8, 4096)
+            self.assertEqual(imagem.read_metadata(), b'segunda' * 20)
+            self.assertEqual(imagem.lsn, 2)
+            imagem.sync(b'quarta', lsn=4)
+            imagem.close()
+            imagem = DiskImage(caminho, b'IN', 8, 4096)
+            self.assertEqual(imagem.read_metadata(), b'quarta')
+            imagem.close()
+
+
+class UnmountedTest(unittest.TestCase):
+    """Depois de desmontado, o objeto recusa acessos a dados com NotMountedError."""
+
+    def test_data_access_raises(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            fs = FileSystem.mount(os.path.join(pasta, 'i.img'), total_blocks=4096, journal='group')
+            fs.write_file('x', 'abc')
+            fs.unmount()
+            with self.assertRaises(NotMountedError):
+                fs.read_file('x')
+            with self.assertRaises(NotMountedError):
+                fs.write_file('x', 'def')
+
+            fs = SistemaArquivos.montar(os.path.join(pasta, 'l.img'), total_blocos=4096, diario='group')
+            fs.escrever_arquivo('x', 'abc')
+            fs.desmontar()
+            with self.assertRaises(NotMountedError):
+                fs.ler_arquivo('x')
+            with self.assertRaises(NotMountedError):
+                fs.escrever_arquivo('x', 'def')
+
+
+if __name__ == '__main__':
+    unittest.main()
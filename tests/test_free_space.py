@@ -0,0 +1,67 @@
+import random
+import unittest
+
+from entity.allocation import POLICIES
+from entity.free_space import FreeSpaceManager, BITMAP_PAGE, to_extents
+
+# Duas páginas e meia de bitmap, para que extents e varreduras cruzem páginas.
+TOTAL = 2 * BITMAP_PAGE + BITMAP_PAGE // 2
+
+
+class FreeSpaceConsistencyTest(unittest.TestCase):
+    """O índice de extents livres, a contagem e o bitmap contam a mesma história, em qualquer política."""
+
+    def _conferir(self, livre: FreeSpaceManager):
+        varredura = to_extents(b for b in range(livre.total_blocks) if livre.is_free(b))
+        self.assertEqual(sorted(livre._by_start.items()), varredura)
+        self.assertEqual(livre._by_end, {inicio + tamanho: inicio for inicio, tamanho in varredura})
+        self.assertEqual(livre.free_count, sum(tamanho for _, tamanho in varredura))
+        self.assertEqual(livre.largest_free(), max((tamanho for _, tamanho in varredura), default=0))
+
+    def _misturar(self, livre: FreeSpaceManager, rng: random.Random, operacoes: int = 400):
+        """Aloca, reserva e libera uma mistura aleatória; devolve os extents ainda alocados."""
+        alocados = []
+        for i in range(operacoes):
+            sorteio = rng.random()
+            if sorteio < 0.5 and livre.free_count:
+                alocados.extend(livre.allocate(min(livre.free_count, rng.randint(1, 3000))))
+            elif sorteio < 0.6 and livre.free_count:
+                inicio, tamanho = rng.choice(sorted(livre._by_start.items()))
+                deslocamento = rng.randrange(tamanho)
+                quantidade = rng.randint(1, tamanho - deslocamento)
+                livre.reserve(inicio + deslocamento, quantidade)
+                alocados.append((inicio + deslocamento, quantidade))
+            elif alocados:
+                inicio, tamanho = alocados.pop(rng.randrange(len(alocados)))
+                # Libera às vezes só uma parte, para a coalescência ver vizinhos dos dois lados.
+                corte = rng.randint(1, tamanho)
+                livre.free(inicio, corte)
+                if corte < tamanho:
+                    alocados.append((inicio + corte, tamanho - corte))
+            if i % 100 == 99:
+                self._conferir(livre)
+        return alocados
+
+    def test_policies_stay_consistent(self):
+        for nome in POLICIES:
+            with self.subTest(policy=nome):
+                livre = FreeSpaceManager(TOTAL, nome)
+                alocados = self._misturar(livre, random.Random(nome))
+                self._conferir(livre)
+                with self.assertRaises(ValueError):
+                    livre.reserve(*alocados[0])
+                with self.assertRaises(ValueError):
+                    livre.free(*min(livre._by_start.items()))
+
+                copia = FreeSpaceManager(TOTAL, nome)
+                self.assertEqual(copia.load(livre.tobytes()), len(livre.tobytes()))
+                self._conferir(copia)
+                self.assertEqual(copia._by_start, livre._by_start)
+                self.assertEqual(copia.free_count, livre.free_count)
+                # O índice da política foi refeito: dá para alocar todo o espaço livre.
+                self.assertEqual(sum(t for _, t in copia.allocate(copia.free_count)), livre.free_count)
+                self._conferir(copia)
+
+
+if __name__ == '__main__':
+    unittest.main()
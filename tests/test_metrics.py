@@ -0,0 +1,31 @@
+import unittest
+
+from entity.file_system import FileSystem
+from entity.file_system_linked import SistemaArquivos
+
+
+class OperationCountTest(unittest.TestCase):
+    """Cada chamada do usuário conta uma vez, mesmo quando usa outra operação por dentro."""
+
+    def _contagens(self, fs) -> dict:
+        return {nome: r['count'] for nome, r in fs.metrics.snapshot().items()}
+
+    def test_inode(self):
+        fs = FileSystem()
+        fs.append('x', 'ab')
+        fs.append('x', 'cd')
+        fs.write_file('y', 'ef')
+        fs.read_file('x')
+        self.assertEqual(self._contagens(fs), {'append': 2, 'write_file': 1, 'read_file': 1})
+
+    def test_linked(self):
+        fs = SistemaArquivos()
+        fs.anexar('x', 'ab')
+        fs.anexar('x', 'cd')
+        fs.escrever_arquivo('y', 'ef')
+        fs.ler_arquivo('x')
+        self.assertEqual(self._contagens(fs), {'anexar': 2, 'escrever_arquivo': 1, 'ler_arquivo': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from entity.errors import NoSpaceError
+from entity.file_system import FileSystem
+from entity.file_system_linked import SistemaArquivos
+
+
+class FailedOverwriteTest(unittest.TestCase):
+    """Uma sobrescrita sem espaço não pode alterar o arquivo nem vazar blocos."""
+
+    def test_inode_file_unchanged(self):
+        fs = FileSystem(total_blocks=16)
+        fs.write_file('x', 'a' * 24)
+        fs.write_file('y', 'b' * 80)
+        with self.assertRaises(NoSpaceError):
+            fs.write_file('x', 'c' * 100)
+        self.assertEqual(fs.read_file('x'), 'a' * 24)
+        self.assertEqual(fs.free_space.free_count, 3)
+        self.assertEqual(fs.check_invariants(), [])
+        # Os blocos do próprio arquivo contam como livres para a sobrescrita.
+        self.assertEqual(fs.write_file('x', 'd' * 48), 48)
+        self.assertEqual(fs.check_invariants(), [])
+
+    def test_linked_file_unchanged(self):
+        fs = SistemaArquivos(total_blocos=16)
+        fs.escrever_arquivo('x', 'a' * 24)
+        fs.escrever_arquivo('y', 'b' * 80)
+        with self.assertRaises(NoSpaceError):
+            fs.escrever_arquivo('x', 'c' * 100)
+        self.assertEqual(fs.ler_arquivo('x'), 'a' * 24)
+        self.assertEqual(fs.verificar_invariantes(), [])
+        # Os blocos do próprio arquivo contam como livres para a sobrescrita.
+        self.assertEqual(fs.escrever_arquivo('x', 'd' * 48), 48)
+        self.assertEqual(fs.verificar_invariantes(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
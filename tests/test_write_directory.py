@@ -0,0 +1,33 @@
+import unittest
+
+from entity.errors import IsDirectoryError
+from entity.file_system import FileSystem
+from entity.file_system_linked import SistemaArquivos
+
+
+class WriteDirectoryTest(unittest.TestCase):
+    """Gravar sobre um diretório falha antes de alocar, sem deixar blocos presos nele."""
+
+    def test_inode_rejects_directory(self):
+        fs = FileSystem(total_blocks=1024)
+        livres = fs.free_space.free_count
+        fs.create_dir('d')
+        with self.assertRaises(IsDirectoryError):
+            fs.write_file('d', 'x' * 5000)
+        fs.delete('d')
+        self.assertEqual(fs.free_space.free_count, livres)
+        self.assertEqual(fs.check_invariants(), [])
+
+    def test_linked_rejects_directory(self):
+        fs = SistemaArquivos(total_blocos=1024)
+        livres = fs.espaco_livre.free_count
+        fs.criar_diretorio('d')
+        with self.assertRaises(IsDirectoryError):
+            fs.escrever_arquivo('d', 'x' * 5000)
+        fs.deletar('d')
+        self.assertEqual(fs.espaco_livre.free_count, livres)
+        self.assertEqual(fs.verificar_invariantes(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()